@@ -26,4 +26,7 @@ build_test(test_dict, path='example_queries/test.yaml')
 
 # queries = Query(config_path, verbose = True)
 
-# output_dict = queries.queries(query_path = query_path, log = True)
\ No newline at end of file
+# output_dict = queries.queries(query_path = query_path, log = True)
+
+# the test dict can also be run directly as a sweep spec, without writing example_queries/test.yaml
+# output_dict = queries.sweep(test_dict, log = True)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from query.query_api import Query
 
 config_dir = 'checkpoints/'
-config_file = 'checkpoint_0.pkl'
+config_file = 'checkpoint_0.ckpt'
 config_path = config_dir + config_file
 
 query_dir = 'example_queries/'
@@ -1,5 +1,6 @@
 import math
-from query.query_interface import SubQueryList
+from query.query_interface import SubQueryList, read_quantile, quantile
+from collections import OrderedDict
 
 class HardwareComparison:
     """
@@ -87,6 +88,23 @@ class HardwareComparisonList(SubQueryList):
             'acc': max([item.get_year() for item in self.hardware_comparison_list if item.get_chip_type() == 'acc']),
             'wse': max([item.get_year() for item in self.hardware_comparison_list if item.get_chip_type() == 'wse'])
         }
+        self.tflops_groups = self.sort_tflops_groups()
+
+    def sort_tflops_groups(self) -> OrderedDict:
+        """
+        Sorts the tflops of each chip type, year and numerical format once, so any quantile is an index lookup
+        Returns:
+            OrderedDict of (chip_type, year, numerical_format) to the sorted tflops list
+        """
+        tflops_groups = OrderedDict()
+        for item in self.hardware_comparison_list:
+            for numerical_format in [4, 8, 16, 32]:
+                tflops = item.get_tflops(numerical_format)
+                if not isinstance(tflops, type(None)):
+                    tflops_groups.setdefault((item.get_chip_type(), item.get_year(), numerical_format), []).append(tflops)
+        for tflops_list in tflops_groups.values():
+            tflops_list.sort()
+        return tflops_groups
 
     def query(self, query_year: int, query_chip_type: str  = 'gpu', query_numerical_format = None, function = 'mean'):
         """
@@ -95,16 +113,36 @@ class HardwareComparisonList(SubQueryList):
             query_year: year to query
             query_chip_type: chip type to query ['gpu', 'acc', 'wse']
             query_numerical_format: numerical format to query [4, 8, 16, 32]
-            function: function to apply to tflops list ['mean', 'median', 'geomean']
+            function: function to apply to tflops list ['mean', 'median', 'geomean'] or a quantile such as 'p90'
         Returns:
             average tflops
         """
         tflops_list = []
-        hardware_year = 0
         
         if query_chip_type == None:
             query_chip_type = 'gpu'
 
+        hardware_year = self.get_hardware_year(query_year, query_chip_type)
+
+        if read_quantile(function) is not None:
+            if getattr(self, 'tflops_groups', None) is None:
+                self.tflops_groups = self.sort_tflops_groups()
+            tflops_list = self.tflops_groups.get((query_chip_type, hardware_year, query_numerical_format))
+            return round(quantile(tflops_list, read_quantile(function)), 6) if tflops_list else None
+
+        for item in self.hardware_comparison_list:
+            if query_chip_type == item.get_chip_type() and item.get_year() == hardware_year:
+                tflops = item.get_tflops(query_numerical_format)
+                if not isinstance(tflops, type(None)):
+                    tflops_list.append(tflops)
+
+        return self.average(tflops_list, function) if tflops_list else None
+
+    def get_hardware_year(self, query_year: int, query_chip_type: str = 'gpu') -> int:
+        """
+        Returns the year of the hardware a query year is answered with, the latest year with hardware of the chip type up to the query year, clamped to the years of the chip type
+        """
+        hardware_year = 0
         if query_chip_type in self.min_year and query_year <= self.min_year[query_chip_type]:
             hardware_year = self.min_year[query_chip_type]
         elif query_chip_type in self.max_year and query_year >= self.max_year[query_chip_type]:
@@ -113,11 +151,17 @@ class HardwareComparisonList(SubQueryList):
             for item in self.hardware_comparison_list:
                 if query_chip_type == item.get_chip_type() and item.get_year() <= query_year and hardware_year < item.get_year():
                         hardware_year = item.get_year()
+        return hardware_year
 
-        for item in self.hardware_comparison_list:
-            if query_chip_type == item.get_chip_type() and item.get_year() == hardware_year:
-                tflops = item.get_tflops(query_numerical_format)
-                if not isinstance(tflops, type(None)):
-                    tflops_list.append(tflops)
-
-        return self.average(tflops_list, function) if tflops_list else None 
\ No newline at end of file
+    def query_groups(self, query_year: int, query_chip_type: str = 'gpu', query_numerical_format = None) -> list[list[float]]:
+        """
+        Returns the tflops list that query averages, as a single group
+        Returns:
+            list containing the tflops list, None if query returns None
+        """
+        if query_chip_type == None:
+            query_chip_type = 'gpu'
+        hardware_year = self.get_hardware_year(query_year, query_chip_type)
+        tflops_list = [item.get_tflops(query_numerical_format) for item in self.hardware_comparison_list if query_chip_type == item.get_chip_type() and item.get_year() == hardware_year]
+        tflops_list = [tflops for tflops in tflops_list if not isinstance(tflops, type(None))]
+        return [tflops_list] if tflops_list else None 
\ No newline at end of file
@@ -1 +1 @@
-from .model_size import ModelSizeList, ModelSize, math
\ No newline at end of file
+from .model_size import ModelSizeList, ModelSize, get_model_max_size_arrays, math
\ No newline at end of file
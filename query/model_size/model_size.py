@@ -1,5 +1,7 @@
-from query.query_interface import SubQueryList
+from query.query_interface import SubQueryList, YearAggregate, read_quantile, quantile
+from query.utils.utils import instance_lock
 from collections import OrderedDict
+import numpy as np
 import math
 import statistics
 
@@ -37,10 +39,10 @@ class ModelSize:
         self.max_kv_cache = max_kv_cache
         self.training_flops = training_flops
         self.paper = paper
-        self.inference_max_memory = self.get_model_max_size('inference')
+        self.optimizers = optimizers
+        # maximum memory sizes are computed on first use, most processes only query a few phase and optimizer combinations
+        self.inference_max_memory = None
         self.training_max_memory = OrderedDict({})
-        for optimizer, value in optimizers.items():
-            self.training_max_memory[optimizer] = self.get_model_max_size('training', value)
 
     # region Getters
     def get_model(self):
@@ -71,9 +73,13 @@ class ModelSize:
         return self.max_kv_cache
     
     def get_inference_max_memory(self):
+        if self.inference_max_memory is None:
+            self.inference_max_memory = self.get_model_max_size('inference')
         return self.inference_max_memory
     
     def get_training_max_memory(self, optimizer: str):
+        if optimizer not in self.training_max_memory:
+            self.training_max_memory[optimizer] = self.get_model_max_size('training', self.optimizers[optimizer])
         return self.training_max_memory[optimizer]
     # endregion
     
@@ -92,41 +98,9 @@ class ModelSize:
         Returns:
             dictionary containing the maximum memory size of the model for activation, parameters, and optimizer
         """
-        d_model_per_head = self.d_model / self.n_head
-
-        #region ACTIVATIONS
         seq_len = self.seq_length if phase == 'training' or self.max_kv_cache == 0 else 1
-        # projection layer
-        initial_activation = seq_len * self.d_model
-        attention_norm = seq_len * self.d_model
-        q_prj = seq_len * self.d_model
-        k_prj = seq_len * self.d_model * self.n_kv_head / self.n_head
-        v_prj = seq_len * self.d_model * self.n_kv_head / self.n_head
-        prj_output = attention_norm + q_prj + k_prj + v_prj
-        prj_layer = max(initial_activation + attention_norm, prj_output)
-
-        # self attention mechanism
-        q = self.n_head * seq_len * d_model_per_head
-        qkt = self.n_head * seq_len * self.seq_length
-        softmax = self.n_head * seq_len * self.seq_length
-        attn_v = seq_len * self.d_model
-        proj_a = seq_len * self.d_model
-        attn_output = qkt + softmax + attn_v + proj_a
-        attn_layer = max(q + qkt, qkt + softmax, softmax + attn_v, attn_v + proj_a)
-
-        # feed forward network
-        ffn_input = seq_len * self.d_model
-        ffn_norm = seq_len * self.d_model
-        gate_proj = seq_len * self.d_ff
-        up_proj = seq_len * self.d_ff
-        ffn_actv = seq_len * self.d_ff
-        down_proj = seq_len * self.d_model
-        ffn_output = ffn_norm + gate_proj + up_proj + ffn_actv + down_proj
-        ffn_layer = max(ffn_input + + ffn_norm, ffn_norm + gate_proj + up_proj, gate_proj + ffn_actv, ffn_actv + down_proj)
-        max_inference_activations = max(prj_layer, attn_layer, ffn_layer) / 10**9
-        training_activations = math.sqrt((prj_output + attn_output + ffn_output) * self.layers) / 10**9
-        #endregion
-  
+        max_inference_activations, training_activations = (float(size) for size in get_activation_sizes(seq_len, self.seq_length, self.layers, self.d_model, self.d_ff, self.n_head, self.n_kv_head))
+
         parameters = self.params 
         if phase == 'inference':
             return_dict = OrderedDict({'activation_size': max_inference_activations, 'weight_size': self.max_kv_cache + parameters, 'optimizer_size': 0, 'parameters': parameters, 'seq_length': self.seq_length})
@@ -145,6 +119,7 @@ class ModelSizeList(SubQueryList):
     def __init__(self, input_dict: dict, year_ranges: list[tuple], optimizer_dict: dict):
         self.model_size_list = []
         self.year_ranges = year_ranges
+        self.year_aggregates = OrderedDict()
         for sub_dict in input_dict.values():
             self.model_size_list.append(ModelSize(**sub_dict, optimizers=optimizer_dict))
 
@@ -162,23 +137,19 @@ class ModelSizeList(SubQueryList):
             query_year: year to query
             query_phase: phase to query ['inference', 'training']
             query_optimizer: optimizer to query ['adam', 'rmsprop', 'sgd']
-            function: function to apply to model size list ['mean', 'median', 'geomean']
+            function: function to apply to model size list ['mean', 'median', 'geomean'] or a quantile such as 'p90'
         Returns:
             list of dictionaries containing the average model size (Billions)
         """
         if query_optimizer == None:
             query_optimizer = 'adam'
 
-        model_size_list = []
-
         year_lower, year_upper = self.select_year_index(query_year, self.year_ranges)
+        if read_quantile(function) is not None:
+            year_bounds = (year_lower, year_upper) if query_year is not None else (float('-inf'), float('inf'))
+            return self.quantile('inference' if query_phase == 'inference' else query_optimizer, *year_bounds, read_quantile(function))
 
-        for model_size_object in self.model_size_list:
-            if year_lower <= model_size_object.get_year() <= year_upper or query_year is None:
-                if query_phase == 'inference':
-                    model_size_list.append(model_size_object.get_inference_max_memory())
-                else:
-                    model_size_list.append(model_size_object.get_training_max_memory(query_optimizer))
+        model_size_list = self.query_rows(query_year, query_phase, query_optimizer)
         if not model_size_list:
             return None
         
@@ -192,6 +163,31 @@ class ModelSizeList(SubQueryList):
 
         return self.average(model_size_list, function)
 
+    def query_rows(self, query_year: int = None, query_phase: str = 'inference', query_optimizer: str = 'adam') -> list[OrderedDict]:
+        """
+        Returns the maximum memory of every model that query averages
+        Args:
+            query_year: year to query
+            query_phase: phase to query ['inference', 'training']
+            query_optimizer: optimizer to query ['adam', 'rmsprop', 'sgd']
+        Returns:
+            list of dictionaries containing the maximum memory size of each model
+        """
+        if query_optimizer == None:
+            query_optimizer = 'adam'
+
+        model_size_list = []
+
+        year_lower, year_upper = self.select_year_index(query_year, self.year_ranges)
+
+        for model_size_object in self.model_size_list:
+            if year_lower <= model_size_object.get_year() <= year_upper or query_year is None:
+                if query_phase == 'inference':
+                    model_size_list.append(model_size_object.get_inference_max_memory())
+                else:
+                    model_size_list.append(model_size_object.get_training_max_memory(query_optimizer))
+        return model_size_list
+
     def average(self, model_size_list: list[float], function: str):
         model_size_dict = OrderedDict({
             'activation_size': 0,
@@ -242,3 +238,139 @@ class ModelSizeList(SubQueryList):
             model_size_dict['seq_length'] = statistics.geometric_mean(seq_length_list)
 
         return model_size_dict
+
+    def _get_year_aggregates(self, key: str) -> OrderedDict:
+        """
+        Builds the year prefix sums of every model size field on first use, under the lock of the list
+        Args:
+            key: 'inference' or the training optimizer
+        Returns:
+            OrderedDict of model size field to YearAggregate
+        """
+        if key not in getattr(self, 'year_aggregates', ()):
+            with instance_lock(self):
+                # lists pickled before the aggregates were memoized have no year_aggregates
+                if not hasattr(self, 'year_aggregates'):
+                    self.year_aggregates = OrderedDict()
+                if key not in self.year_aggregates:
+                    years = [model_size_object.get_year() for model_size_object in self.model_size_list]
+                    if key == 'inference':
+                        model_size_list = [model_size_object.get_inference_max_memory() for model_size_object in self.model_size_list]
+                    else:
+                        model_size_list = [model_size_object.get_training_max_memory(key) for model_size_object in self.model_size_list]
+                    # the aggregates of a key are published whole, the year range views of the list share this dictionary
+                    self.year_aggregates[key] = OrderedDict(
+                        (field, YearAggregate(years, [ms[field] for ms in model_size_list])) for field in ['activation_size', 'weight_size', 'optimizer_size', 'parameters', 'seq_length']
+                    )
+        return self.year_aggregates[key]
+
+    def quantile(self, key: str, year_lower: float, year_upper: float, q: float) -> OrderedDict:
+        """
+        Quantile of every model size field over the models in [year_lower, year_upper]. The sorted values of each field are merged once per group
+        by its YearAggregate, so a quantile is an index lookup after the first query of the group
+        Args:
+            key: 'inference' or the training optimizer
+            year_lower: first year of the group, can be -inf
+            year_upper: last year of the group, can be inf
+            q: quantile between 0 and 1
+        Returns:
+            dictionary containing the model size quantiles (Billions), None if the group has no models
+        """
+        year_aggregates = self._get_year_aggregates(key)
+        if not year_aggregates['parameters'].count(year_lower, year_upper):
+            return None
+        return OrderedDict((field, quantile(year_aggregate.sorted_values(year_lower, year_upper), q)) for field, year_aggregate in year_aggregates.items())
+
+    def query_window(self, query_year: int = None, query_phase: str = 'inference', query_optimizer: str = 'adam', function = 'median', year_ranges: list[tuple] = None):
+        """
+        Queries the average model size as if the list was built with year_ranges, using prefix sums instead of filtering the list
+        Args:
+            query_year: year to query
+            query_phase: phase to query ['inference', 'training']
+            query_optimizer: optimizer to query ['adam', 'rmsprop', 'sgd']
+            function: function to apply to model size list ['mean', 'median', 'geomean'] or a quantile such as 'p90'
+            year_ranges: list of (start, end) year windows, defaults to the configured year ranges
+        Returns:
+            dictionary containing the average model size (Billions)
+        """
+        if query_year is None or not year_ranges:
+            return self.query(query_year, query_phase, query_optimizer, function)
+        if query_optimizer == None:
+            query_optimizer = 'adam'
+
+        year_lower, year_upper = self.select_year_index(query_year, year_ranges)
+        year_aggregates = self._get_year_aggregates('inference' if query_phase == 'inference' else query_optimizer)
+        if not year_aggregates['parameters'].count(year_lower, year_upper):
+            return None
+        if read_quantile(function) is not None:
+            return self.quantile('inference' if query_phase == 'inference' else query_optimizer, year_lower, year_upper, read_quantile(function))
+        if function not in ['mean', 'median', 'geomean']:
+            return self.average([], function)
+
+        return OrderedDict((field, year_aggregate.aggregate(year_lower, year_upper, function)) for field, year_aggregate in year_aggregates.items())
+
+
+def get_activation_sizes(seq_len, seq_length, layers, d_model, d_ff, n_head, n_kv_head) -> tuple:
+    """
+    Activation memory of a model, shared by ModelSize.get_model_max_size and get_model_max_size_arrays. Every argument can be a number or an array of models
+    Args:
+        seq_len: tokens processed at once, the sequence length in training and 1 in inference with a kv cache
+        seq_length, layers, d_model, d_ff, n_head, n_kv_head: architecture of the model
+    Returns:
+        (largest inference activations, training activations) in billions
+    """
+    d_model_per_head = d_model / n_head
+
+    # projection layer
+    initial_activation = seq_len * d_model
+    attention_norm = seq_len * d_model
+    q_prj = seq_len * d_model
+    k_prj = seq_len * d_model * n_kv_head / n_head
+    v_prj = seq_len * d_model * n_kv_head / n_head
+    prj_output = attention_norm + q_prj + k_prj + v_prj
+    prj_layer = np.maximum(initial_activation + attention_norm, prj_output)
+
+    # self attention mechanism
+    q = n_head * seq_len * d_model_per_head
+    qkt = n_head * seq_len * seq_length
+    softmax = n_head * seq_len * seq_length
+    attn_v = seq_len * d_model
+    proj_a = seq_len * d_model
+    attn_output = qkt + softmax + attn_v + proj_a
+    attn_layer = np.maximum(np.maximum(q + qkt, qkt + softmax), np.maximum(softmax + attn_v, attn_v + proj_a))
+
+    # feed forward network
+    ffn_input = seq_len * d_model
+    ffn_norm = seq_len * d_model
+    gate_proj = seq_len * d_ff
+    up_proj = seq_len * d_ff
+    ffn_actv = seq_len * d_ff
+    down_proj = seq_len * d_model
+    ffn_output = ffn_norm + gate_proj + up_proj + ffn_actv + down_proj
+    ffn_layer = np.maximum(np.maximum(ffn_input + ffn_norm, ffn_norm + gate_proj + up_proj), np.maximum(gate_proj + ffn_actv, ffn_actv + down_proj))
+    max_inference_activations = np.maximum(np.maximum(prj_layer, attn_layer), ffn_layer) / 10**9
+    training_activations = np.sqrt((prj_output + attn_output + ffn_output) * layers) / 10**9
+    return max_inference_activations, training_activations
+
+def get_model_max_size_arrays(architecture_columns: OrderedDict, phase: np.ndarray, optimizer: np.ndarray) -> OrderedDict:
+    """
+    Array form of ModelSize.get_model_max_size, computes the maximum memory of many architectures in one pass with the same operation order
+    Args:
+        architecture_columns: dictionary of params, seq_length, layers, d_model, d_ff, n_head, n_kv_head and max_kv_cache arrays
+        phase: array of phases, rows that are not 'inference' use the training formula like ModelSizeList.query
+        optimizer: array of optimizer ratios of parameters, only used for training rows
+    Returns:
+        dictionary of activation_size, weight_size, optimizer_size, parameters and seq_length arrays
+    """
+    params, seq_length, layers, d_model, d_ff, n_head, n_kv_head, max_kv_cache = (np.asarray(architecture_columns[key], dtype=float) for key in ['params', 'seq_length', 'layers', 'd_model', 'd_ff', 'n_head', 'n_kv_head', 'max_kv_cache'])
+    is_inference = np.asarray(phase) == 'inference'
+    seq_len = np.where(~is_inference | (max_kv_cache == 0), seq_length, 1)
+    max_inference_activations, training_activations = get_activation_sizes(seq_len, seq_length, layers, d_model, d_ff, n_head, n_kv_head)
+
+    return OrderedDict({
+        'activation_size': np.where(is_inference, max_inference_activations, training_activations),
+        'weight_size': np.where(is_inference, max_kv_cache + params, params * 2),
+        'optimizer_size': np.where(is_inference, 0, optimizer * params),
+        'parameters': params,
+        'seq_length': seq_length,
+    })
\ No newline at end of file
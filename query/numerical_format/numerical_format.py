@@ -1,4 +1,5 @@
-from query.query_interface import SubQueryList
+from query.query_interface import SubQueryList, YearAggregate
+from query.utils.utils import instance_lock
 from collections import OrderedDict
 
 class NumericalFormat:
@@ -59,6 +60,8 @@ class NumericalFormatList(SubQueryList):
         self.numerical_format_list = []
         self.year_ranges = [tuple(year_range) for year_range in year_ranges]
         self.numerical_format_set = set()
+        self.function = function
+        self.year_aggregate = None
 
         for sub_dict in input_dict.values():
             self.numerical_format_set.add(sub_dict['numerical_format'])
@@ -182,4 +185,140 @@ class NumericalFormatList(SubQueryList):
                 'weight_numerical_format': weight_format
             })
 
-        return None
\ No newline at end of file
+        return None
+
+    def query_groups(self, query_year: int = None, numerical_format: str = None, phase: str = 'inference') -> list[list[float]]:
+        """
+        Returns the speedup lists whose averages query multiplies into its speedup, in compounding order
+        Args:
+            query_year: Year to query for
+            numerical_format: Specific format to query (e.g. '8-16')
+            phase: phase to determine numerical format
+        Returns:
+            list of speedup lists, empty if the speedup is 1, None if query returns None
+        """
+        phase = 'inference' if phase == None else phase
+
+        if numerical_format:
+            if phase == 'training':
+                matches = [nf for nf in self.numerical_format_set if numerical_format.split('-')[0] == nf.split('-')[1]]
+                if not matches:
+                    return []
+                numerical_format = matches[0]
+            elif phase != 'inference':
+                return None
+            if numerical_format not in self.numerical_format_dict['format_grouping']:
+                raise KeyError(numerical_format)
+            groupings = list(self.numerical_format_dict['format_grouping'].values())
+            index = list(self.numerical_format_dict['format_grouping']).index(numerical_format)
+        elif query_year:
+            year_range_tuple = self.get_year_range_tuple(query_year)
+            if not year_range_tuple:
+                return None
+            groupings = list(self.numerical_format_dict['year_grouping'].values())
+            if phase == 'training':
+                index = -1 if query_year <= self.year_ranges[0][1] else 0
+            elif phase == 'inference':
+                index = list(self.numerical_format_dict['year_grouping']).index(year_range_tuple)
+            else:
+                return None
+        else:
+            return None
+
+        return [[obj.get_speedup() for obj in grouping['speedup_list']] for grouping in groupings[:index + 1]]
+
+    def _get_year_aggregate(self) -> YearAggregate:
+        """
+        Builds the year prefix sums of the speedups and the smallest weight format of each year on first use, under the lock of the list
+        """
+        if getattr(self, 'year_aggregate', None) is None:
+            with instance_lock(self):
+                if getattr(self, 'year_aggregate', None) is None:
+                    year_aggregate = YearAggregate(
+                        [obj.get_year() for obj in self.numerical_format_list],
+                        [obj.get_speedup() for obj in self.numerical_format_list]
+                    )
+                    # first object with the smallest weight format of each year, the index keeps the input order of _get_numerical_formats
+                    year_formats = OrderedDict()
+                    for i, obj in enumerate(self.numerical_format_list):
+                        if obj.get_year() not in year_formats or year_formats[obj.get_year()][0] > obj.weight_format:
+                            year_formats[obj.get_year()] = (obj.weight_format, i, obj.activation_format)
+                    # year_aggregate is checked without the lock, so it is published last
+                    self.year_formats = year_formats
+                    self.year_aggregate = year_aggregate
+        return self.year_aggregate
+
+    def _get_window_speedups(self, year_ranges: list[tuple]) -> OrderedDict:
+        """
+        Compounds the average speedup of each year window like the configured year grouping
+        Args:
+            year_ranges: list of (start, end) year windows
+        Returns:
+            OrderedDict of year window to compounded speedup
+        """
+        year_aggregate = self._get_year_aggregate()
+        speedup_dict = OrderedDict()
+        prev_speedup = 1
+        for year_range in year_ranges:
+            average_speedup = year_aggregate.aggregate(year_range[0], year_range[1], self.function)
+            if average_speedup is None:
+                raise ValueError(f'No numerical format data in year window {year_range}')
+            speedup_dict[year_range] = round(average_speedup, 6) * prev_speedup
+            prev_speedup = speedup_dict[year_range]
+        return speedup_dict
+
+    def _get_window_numerical_formats(self, year_range_tuple: tuple):
+        """
+        Get the activation and weight numerical formats for a year window, same as _get_numerical_formats
+        """
+        self._get_year_aggregate()
+        activation_format = 32
+        weight_format = 32
+        year_formats = [self.year_formats[year] for year in self.year_formats if year_range_tuple[0] <= year <= year_range_tuple[1]]
+        if year_formats:
+            min_weight_format, _, min_activation_format = min(year_formats)
+            if weight_format > min_weight_format:
+                weight_format = min_weight_format
+                activation_format = min_activation_format
+        return activation_format, weight_format
+
+    def query_window(self, query_year: int = None, numerical_format: str = None, phase: str = 'inference', year_ranges: list[tuple] = None):
+        """
+        Queries the numerical format speedup as if the list was built with year_ranges, using prefix sums instead of regrouping the data
+        Args:
+            query_year: Year to query for
+            numerical_format: Specific format to query (e.g. '8-16'), does not depend on the year ranges
+            phase: phase to determine numerical format
+            year_ranges: list of (start, end) year windows, defaults to the configured year ranges
+        Returns:
+            OrderedDict with speedup and format information
+        """
+        phase = 'inference' if phase == None else phase
+
+        if numerical_format or not query_year or not year_ranges:
+            return self.query(query_year, numerical_format, phase)
+
+        year_ranges = [tuple(year_range) for year_range in year_ranges]
+        speedup_dict = self._get_window_speedups(year_ranges)
+        if phase == 'training':
+            for year_range in year_ranges:
+                if query_year <= year_range[1]:
+                    speedup = 1
+                    break
+                if query_year >= year_range[0]:
+                    speedup = speedup_dict[year_range]
+                    break
+
+        year_range_tuple = self.get_year_range_tuple(query_year, year_ranges)
+        if not year_range_tuple:
+            return None
+
+        if phase == 'inference':
+            speedup = speedup_dict[year_range_tuple]
+        activation_format, weight_format = self._get_window_numerical_formats(year_range_tuple)
+
+        return OrderedDict({
+            'speedup': speedup,
+            'activation_numerical_format': activation_format,
+            'weight_numerical_format': weight_format
+        })
\ No newline at end of file
@@ -1,4 +1,5 @@
-from query.query_interface import SubQueryList
+from query.query_interface import SubQueryList, YearAggregate
+from query.utils.utils import instance_lock
 from collections import OrderedDict
 
 class ParallelStrategy:
@@ -57,6 +58,8 @@ class ParallelStrategyList(SubQueryList):
         self.parallel_strategy_list = []
         self.year_ranges = year_ranges
         self.parallel_strategy_set = set()
+        self.function = function
+        self.year_aggregate = None
 
         self.preprocess(input_dict)    
         self.compute_speedups(function)
@@ -95,6 +98,38 @@ class ParallelStrategyList(SubQueryList):
                 previous_speedup = parallel_strategy_dict[speedup_string]['average_speedup']
             return None
         
+    def query_groups(self, query_year: int = None, query_parallel_strategy: str = None, query_phase: str = None) -> list[list[float]]:
+        """
+        Returns the speedup lists whose averages query multiplies into its speedup, in compounding order
+        Args:
+            query_year: year to query
+            query_parallel_strategy: parallel strategy to query (pipeline, tensor, data, automated search)
+            query_phase: phase to query (inference or training)
+        Returns:
+            list of speedup lists, None if query returns None
+        """
+        speedup_string = f'{query_phase}_speedup' if query_phase else 'speedup'
+
+        if query_parallel_strategy:
+            if query_parallel_strategy not in self.parallel_strategy_dict:
+                raise KeyError(query_parallel_strategy)
+            parallel_strategies = list(self.parallel_strategy_dict)
+            index = parallel_strategies.index(query_parallel_strategy)
+            objects = self.parallel_strategy_dict[query_parallel_strategy][speedup_string]['parallel_structure_objects']
+            if not objects:
+                return None
+            groups = [self.parallel_strategy_dict[parallel_strategy]['speedup']['parallel_structure_objects'] for parallel_strategy in parallel_strategies[:index]] + [objects]
+        elif query_year:
+            year_range = tuple(self.get_year_range_tuple(query_year))
+            year_ranges = list(self.parallel_strategy_year_dict['year_ranges'])
+            if year_range not in self.parallel_strategy_year_dict['year_ranges']:
+                raise KeyError(year_range)
+            groups = [self.parallel_strategy_year_dict['year_ranges'][year_range]['parallel_structure_objects'] for year_range in year_ranges[:year_ranges.index(year_range) + 1]]
+        else:
+            return None
+
+        return [[obj.get_speedup() for obj in objects] for objects in groups]
+
     def preprocess(self, input_dict: dict):
         """
         Preprocesses the input dictionary remove invalid keys
@@ -193,4 +228,48 @@ class ParallelStrategyList(SubQueryList):
                 parallel_strategy_dict['training_speedup']['average_speedup'] *= compounding_speedup
             if parallel_strategy_dict['inference_speedup']['average_speedup']:
                 parallel_strategy_dict['inference_speedup']['average_speedup'] *= compounding_speedup
-            compounding_speedup = parallel_strategy_dict['speedup']['average_speedup']
\ No newline at end of file
+            compounding_speedup = parallel_strategy_dict['speedup']['average_speedup']
+
+    def _get_year_aggregate(self) -> YearAggregate:
+        """
+        Builds the year prefix sums of the speedups kept by preprocess on first use, under the lock of the list
+        """
+        if getattr(self, 'year_aggregate', None) is None:
+            with instance_lock(self):
+                if getattr(self, 'year_aggregate', None) is None:
+                    objects = [obj for year_range_dict in self.parallel_strategy_year_dict['year_ranges'].values() for obj in year_range_dict['parallel_structure_objects']]
+                    self.year_aggregate = YearAggregate([obj.get_year() for obj in objects], [obj.get_speedup() for obj in objects])
+        return self.year_aggregate
+
+    def query_window(self, query_year: int = None, query_parallel_strategy: str = None, query_phase: str = None, year_ranges: list[tuple] = None):
+        """
+        Queries the parallel strategy speedup as if the list was built with year_ranges, using prefix sums instead of regrouping the data
+        Args:
+            query_year: year to query
+            query_parallel_strategy: parallel strategy to query, does not depend on the year ranges
+            query_phase: phase to query (inference or training)
+            year_ranges: list of (start, end) year windows, defaults to the configured year ranges
+        """
+        if query_parallel_strategy or not query_year or not year_ranges:
+            return self.query(query_year, query_parallel_strategy, query_phase)
+
+        year_ranges = [tuple(year_range) for year_range in year_ranges]
+        year_aggregate = self._get_year_aggregate()
+
+        # preprocess assigns every item to a range with get_year_range_tuple, so a window also covers
+        # the years before the first window, after the last window, and in the gap up to the next window
+        speedup_dict = OrderedDict()
+        compounding_speedup = 1
+        for i, year_range in enumerate(year_ranges):
+            year_lower = year_range[0] if i > 0 else float('-inf')
+            year_upper = year_ranges[i + 1][0] - 1 if i < len(year_ranges) - 1 else float('inf')
+            average_speedup = year_aggregate.aggregate(year_lower, year_upper, self.function)
+            if average_speedup is None:
+                continue
+            speedup_dict[year_range] = round(average_speedup, 6) * compounding_speedup
+            compounding_speedup = speedup_dict[year_range]
+
+        year_range = self.get_year_range_tuple(query_year, year_ranges)
+        if year_range not in speedup_dict:
+            raise ValueError(f'No parallel strategy data in year window {year_range}')
+        return speedup_dict[year_range]
\ No newline at end of file
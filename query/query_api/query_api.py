@@ -1,28 +1,55 @@
-from query.hardware_configuration import hardware_comparison
-from query.model_size import model_size
-from query.numerical_format import numerical_format
-from query.parallel_strategy import parallel_strategy
-from query.utils.utils import clean_dictionary_keys, create_log, create_checkpoint
-from query.utils.utils import read_csv_dir, read_yaml, write_yaml, write_txt, write_pkl, read_pkl
+from query.query_batch import query_batch
+from query.query_cube import query_cube
+from query.query_checkpoint import query_checkpoint
+from query.query_dataset import QueryDataset, LazyAttribute, read_dataset, read_csv_dataset, merge_configuration
+from query.query_snapshot import QuerySnapshot, SNAPSHOT_LISTS, required_tables
+from query.query_watch import QueryWatcher
+from query.query_solve import query_solve
+from query.query_simulate import query_simulate
+from query.query_sensitivity import query_sensitivity
+from query.query_pareto import query_pareto
+from query.query_search import query_search
+from query.utils.utils import create_log, create_checkpoint
+from query.utils.utils import read_yaml, write_yaml, write_txt, read_pkl
+from query.utils.utils import iter_jsonl_queries, iter_yaml_queries, iter_sweep_queries, read_year_windows, read_fields, read_architecture, read_quantiles, read_statistics
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+
+MIN_QUERIES_PER_WORKER = 2000 # below this, starting a worker process costs more than the queries it would run
+CHUNKS_PER_WORKER = 4
 
 class Query: 
     """
-    Initializes a Query object from a yaml file or a checkpoint file. Query object creates query database and controls interation with the database.
+    Initializes a Query object from a yaml file, a checkpoint file or a QueryDataset. Query object creates query database and controls interation with the database.
     Args:
-        path: Path to yaml file or checkpoint file
+        path: Path to yaml file or checkpoint file, or a QueryDataset to create a view of already parsed data
         verbose: Enables logging
         function: Used for interal averaging.
+        cache_size: Maximum number of cached query results, 0 disables caching
+        cube: Precomputes every combination of query parameters into a query cube, which is saved next to and loaded with checkpoints
+        configuration: overrides of the dataset configuration (year_ranges, optimizers, baseline_model) when path is a QueryDataset
+        statistics: average functions to evaluate side by side with every query by default, e.g. ['mean', 'median', 'geomean'], see query
+        allow_pickle: allows loading a pkl checkpoint written by an earlier version, which unpickles it and can run code from the file. Only enable it for files you trust
     """
-    def __init__(self, path: str, verbose: bool = False, function = None):
+    def __init__(self, path, verbose: bool = False, function = None, cache_size: int = 1024, cube: bool = False, configuration: OrderedDict = None, statistics: list[str] = None, allow_pickle: bool = False):
         self.path = path
         self.function = function
-        if self.path.endswith('.yaml'):
+        self.statistics = read_statistics(statistics)
+        self.cache_size = cache_size
+        self.cube = cube
+        self.snapshot = None
+        if isinstance(path, QueryDataset):
+            if verbose: print('Loading query object from dataset')
+            self.path = path.path or ''
+            self.load_dataset(path, configuration)
+        elif self.path.endswith('.yaml'):
             if verbose: print('Loading query object from csv file path ' + path)
-            self.load_excel(**read_yaml(path)['configuration'])
+            self.load_dataset(read_dataset(path))
         else:
             if verbose: print('Loading query object from checkpoint path ' + path)
-            self.load_pkl(path)
+            self.load_pkl(path, allow_pickle)
 
     def load_excel(self, path: str, year_ranges: OrderedDict, optimizers: OrderedDict = None, baseline_model: OrderedDict = None):
         """
@@ -33,43 +60,205 @@ class Query:
             optimizers: Dictionary of optimizers
             baseline_model: Dictionary of baseline model parameters
         """
-        self.input_dict = clean_dictionary_keys(read_csv_dir(path))
-        self.year_ranges_dict = year_ranges
-        self.optimizer_dict = optimizers
-        self.baseline_model = baseline_model
-        self.model_size_list = model_size.ModelSizeList(self.input_dict['model_size'], self.year_ranges_dict['model_size'], optimizer_dict=self.optimizer_dict)
-        if self.function:
-            self.numerical_format_list = numerical_format.NumericalFormatList(self.input_dict['numerical_format'], self.year_ranges_dict['numerical_format'], self.function)
-            self.parallel_strategy_list = parallel_strategy.ParallelStrategyList(self.input_dict['parallel_strategy'], self.year_ranges_dict['parallel_strategy'], self.function)
-        else:
-            self.numerical_format_list = numerical_format.NumericalFormatList(self.input_dict['numerical_format'], self.year_ranges_dict['numerical_format'])
-            self.parallel_strategy_list = parallel_strategy.ParallelStrategyList(self.input_dict['parallel_strategy'], self.year_ranges_dict['parallel_strategy'])
-        self.hardware_comparison_list = hardware_comparison.HardwareComparisonList(self.input_dict['hardware_comparison'])
-        self.log_file = create_log()
+        configuration = OrderedDict({'year_ranges': year_ranges, 'optimizers': optimizers, 'baseline_model': baseline_model})
+        self.load_dataset(read_csv_dataset(path, configuration))
 
-    def save_pkl(self, path: str = None):
+    def load_dataset(self, dataset: QueryDataset, configuration: OrderedDict = None):
         """
-        Saves checkpoint to a pkl file
+        Attaches to a parsed dataset, only the internal lists that the configuration changes are built, the rest are shared with other views of the dataset
         Args:
-            path: path to save checkpoint
+            dataset: parsed QueryDataset
+            configuration: overrides of the dataset configuration (year_ranges, optimizers, baseline_model)
         """
-        if path is None and not self.path.endswith('.pkl'):
-            path = create_checkpoint()
-        else:
-            path = self.path
-        write_pkl(content=self, file=path)
+        snapshot = QuerySnapshot(dataset, dataset.get_configuration(configuration), self.function, self.cache_size)
+        if self.cube:
+            snapshot = snapshot.replace(query_cube = query_cube.compile_cube(snapshot))
+        self.publish(snapshot)
+
+    def refresh(self) -> list[str]:
+        """
+        Reloads the csv files that changed since they were read. Only the internal lists built from the changed files are rebuilt,
+        only cached results computed from them are dropped, and the query cube is recompiled if there is one
+        Returns:
+            names of the tables that changed, empty if nothing changed
+        """
+        snapshot = self.snapshot
+        dataset, changed = snapshot.dataset.refresh()
+        if dataset is snapshot.dataset:
+            return []
+        lists = OrderedDict((name, value) for name, value in snapshot.get_lists().items() if name[:-len('_list')] not in changed)
+        new_snapshot = snapshot.replace(dataset = dataset, lists = lists, query_cache = snapshot.query_cache.copy(changed) if changed else snapshot.query_cache)
+        if changed and snapshot.query_cube is not None:
+            new_snapshot = new_snapshot.replace(query_cube = query_cube.compile_cube(new_snapshot))
+        self.publish(new_snapshot)
+        return changed
+
+    def watch(self, interval: float = 1.0, callback = None) -> QueryWatcher:
+        """
+        Polls the csv files in a background thread and calls refresh when one changes
+        Args:
+            interval: seconds between polls
+            callback: called with the list of changed tables after each reload
+        Returns:
+            started QueryWatcher, call stop() on it to stop polling
+        """
+        if self.snapshot.dataset.csv_path is None:
+            raise ValueError('Only a Query loaded from a csv directory can be watched')
+        watcher = QueryWatcher(self, interval, callback)
+        watcher.start()
+        return watcher
+
+    def publish(self, snapshot: QuerySnapshot):
+        """
+        Makes a snapshot the current state with a single reference assignment. Queries that already started keep reading the previous snapshot
+        """
+        self.snapshot = snapshot
+
+    @LazyAttribute
+    def log_file(self):
+        return create_log()
+
+    # the loaded data and internal lists are read from the current snapshot
+    input_dict = property(lambda self: self.snapshot.input_dict)
+    year_ranges_dict = property(lambda self: self.snapshot.year_ranges_dict)
+    optimizer_dict = property(lambda self: self.snapshot.optimizer_dict)
+    baseline_model = property(lambda self: self.snapshot.baseline_model)
+    dataset = property(lambda self: self.snapshot.dataset)
+    model_size_list = property(lambda self: self.snapshot.model_size_list)
+    numerical_format_list = property(lambda self: self.snapshot.numerical_format_list)
+    parallel_strategy_list = property(lambda self: self.snapshot.parallel_strategy_list)
+    hardware_comparison_list = property(lambda self: self.snapshot.hardware_comparison_list)
+    query_cube = property(lambda self: self.snapshot.query_cube)
+    query_cache = property(lambda self: self.snapshot.query_cache)
+
+    def get_configuration(self) -> OrderedDict:
+        """
+        Returns the year ranges, optimizers and baseline model of this Query
+        """
+        return self.snapshot.get_configuration()
+
+    def view(self, configuration: OrderedDict = None, function = None, cache_size: int = 1024, cube: bool = False):
+        """
+        Creates a lightweight Query over the same parsed data with some configuration keys changed. The csv data is not parsed again,
+        and internal lists are shared with this Query unless the configuration changes them
+        Args:
+            configuration: dictionary with any of year_ranges, optimizers and baseline_model, year_ranges and baseline_model can be partial, e.g. {'year_ranges': {'model_size': [[2017, 2024]]}}
+            function: internal average function of the view, defaults to the function of this Query
+            cache_size: maximum number of cached query results of the view
+            cube: precomputes a query cube for the view
+        Returns:
+            Query
+        """
+        snapshot = self.snapshot
+        return Query(snapshot.dataset, function = function or self.function, cache_size = cache_size, cube = cube, configuration = merge_configuration(snapshot.get_configuration(), configuration), statistics = self.statistics)
+
+    def query_matrix(self, query_columns, configurations: list[OrderedDict], numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise') -> OrderedDict:
+        """
+        Evaluates the same batch of queries against several configurations of the same data, see view and query_batch
+        Args:
+            query_columns: DataFrame or dictionary of equal length arrays keyed by query parameter, year is required
+            configurations: list of configuration overrides, one view is created for each
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+            errors: 'raise' or 'coerce', see query_batch
+        Returns:
+            output_dict: dictionary of NumPy arrays keyed like the output of query_batch, of shape (number of configurations, number of queries)
+        """
+        if not configurations:
+            raise ValueError('At least one configuration is required')
+        columns = query_batch.read_columns(query_columns)
+        output_list = [
+            self.view(configuration, cache_size = 0).snapshot.query_columns(columns, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, errors)
+            for configuration in configurations
+        ]
+        return OrderedDict((key, np.stack([output_dict[key] for output_dict in output_list])) for key in output_list[0])
 
-    def load_pkl(self, path: str):
+    def save_pkl(self, path: str = None) -> str:
         """
-        loads checkpoint from a pkl file
+        Saves a checkpoint, see query_checkpoint.write_checkpoint. The parsed tables, the configuration and the query cube are stored, the internal lists are rebuilt
+        from the tables when the checkpoint is queried
+        Args:
+            path: path to save checkpoint, defaults to the checkpoint this Query was loaded from, or a new checkpoint in the checkpoints directory
+        Returns:
+            path of the saved checkpoint
+        """
+        if path is None:
+            path = self.path if self.path.endswith(('.ckpt', '.pkl')) else create_checkpoint()
+        snapshot = self.snapshot
+        # the log file is only stored once a query logged to it, reading the attribute would create the runs directory
+        settings = OrderedDict({'path': self.path, 'function': self.function, 'statistics': self.statistics, 'cache_size': self.cache_size, 'log_file': self.__dict__.get('log_file')})
+        query_checkpoint.write_checkpoint(path, settings, snapshot.get_configuration(), snapshot.input_dict, snapshot.query_cube)
+        # the cube is stored in the checkpoint, a cube saved next to it by an earlier version would be stale
+        query_cube.remove_cube(path)
+        return path
+
+    def load_pkl(self, path: str, allow_pickle: bool = False):
+        """
+        loads checkpoint from a ckpt file, or from a pkl file written by an earlier version. Checkpoints are memory mapped and never unpickled,
+        pkl files are unpickled, which can run code from the file, so they are only loaded with allow_pickle
         Args:
             path: path to load checkpoint
+            allow_pickle: allows loading a pkl file, only enable it for files you trust
         """
-        loaded_obj = read_pkl(path)
-        self.__dict__.update(loaded_obj.__dict__)
+        if query_checkpoint.is_checkpoint(path):
+            checkpoint = query_checkpoint.read_checkpoint(path)
+            settings = checkpoint['query']
+            configuration = checkpoint['configuration']
+            dataset = QueryDataset(checkpoint['input_dict'], configuration, settings['path'])
+            snapshot = QuerySnapshot(dataset, configuration, settings['function'], self.cache_size, query_cube = checkpoint['query_cube'])
+            self.function = settings['function']
+            if settings['log_file'] is not None:
+                self.log_file = settings['log_file']
+        elif not allow_pickle:
+            raise ValueError(f'{path} is not a checkpoint. If it is a pkl checkpoint written by an earlier version and you trust it, load it with allow_pickle=True')
+        else:
+            loaded_obj = read_pkl(path)
+            snapshot = loaded_obj.snapshot.replace(self.cache_size, query_cube.load_cube(path))
+            self.function = loaded_obj.function
+            if 'log_file' in loaded_obj.__dict__:
+                self.log_file = loaded_obj.log_file
+        if snapshot.query_cube is None and self.cube:
+            snapshot = snapshot.replace(query_cube = query_cube.compile_cube(snapshot))
         self.path = path
+        self.publish(snapshot)
+
+    def __getstate__(self):
+        # checkpoints keep the flat layout of earlier versions: the data and internal lists of the current snapshot next to the Query settings.
+        # The result cache, query cube and shared dataset are not part of the pickled checkpoint, the cube is saved next to it instead
+        snapshot = self.snapshot
+        state = OrderedDict((key, value) for key, value in self.__dict__.items() if key not in ('snapshot', 'cube'))
+        state.update(input_dict = snapshot.input_dict, year_ranges_dict = snapshot.year_ranges_dict, optimizer_dict = snapshot.optimizer_dict, baseline_model = snapshot.baseline_model)
+        # internal lists are built first, since the dataset they are built from is not pickled
+        for name in SNAPSHOT_LISTS:
+            state[name] = getattr(snapshot, name)
+        return dict(state)
+
+    def __setstate__(self, state: dict):
+        state = dict(state)
+        lists = OrderedDict((name, state.pop(name)) for name in SNAPSHOT_LISTS)
+        configuration = OrderedDict({'year_ranges': state.pop('year_ranges_dict'), 'optimizers': state.pop('optimizer_dict'), 'baseline_model': state.pop('baseline_model')})
+        input_dict = state.pop('input_dict')
+        for key in ('query_cache', 'query_cube', 'cube', 'dataset'):
+            state.pop(key, None)
+        self.__dict__.update(state)
+        self.cache_size = state.get('cache_size', 1024)
+        self.statistics = state.get('statistics')
+        self.cube = False
+        # lists pickled before they stored their average function were built with the function of the Query, or their geomean default
+        for name in ('numerical_format_list', 'parallel_strategy_list'):
+            if 'function' not in lists[name].__dict__:
+                lists[name].function = self.function or 'geomean'
+        self.snapshot = QuerySnapshot(QueryDataset(input_dict, configuration, self.path), configuration, self.function, self.cache_size, lists)
+
+    def compile_cube(self):
+        """
+        Precomputes every combination of query parameters into a query cube, so covered queries are answered with a single array lookup
+        """
+        snapshot = self.snapshot
+        self.publish(snapshot.replace(query_cube = query_cube.compile_cube(snapshot)))
 
-    def query(self, query_path: str = None, query_dict: OrderedDict = None, log: bool = False, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+    def query(self, query_path: str = None, query_dict: OrderedDict = None, log: bool = False, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, year_windows: OrderedDict = None, fields: list[str] = None, architecture: OrderedDict = None, quantiles: list[float] = None, statistics: list[str] = None) -> OrderedDict:
         """
         queries each internal list for model paramaters and speedup calculations to approximate runtime
         Args:
@@ -79,9 +268,73 @@ class Query:
             numerical_format_scaling: enables numerical format speedup
             parallel_strategy_scaling: enables parallel strategy speedup
             hardware_configuration_scaling: enables hardware configuration speedup
+            year_windows: dictionary of internal list name to a (start, end) year window or list of windows that replaces its configured year ranges for this query,
+                e.g. {'model_size': (2020, 2023)}. Averages are read from year prefix sums, so no list is rebuilt
+            fields: list of output keys to return, e.g. ['hardware (TFLOPS)']. Internal lists that the fields and scaling flags do not need are not queried (or built)
+            architecture: explicit model architecture to estimate instead of the average surveyed model of the year, a dictionary of params (B), seq_length, layers, d_model, d_ff,
+                n_head, n_kv_head (defaults to n_head) and max_kv_cache (defaults to 0). Its memory is computed with the same formula as the surveyed models
+            quantiles: list of quantiles of the surveyed data to return with the averages, e.g. [0.1, 0.5, 0.9]. Adds a 'quantiles' dictionary of 'p10', 'p50', 'p90' to results
+                keyed like the output, with each factor at its quantile and the runtime at the quantile reached when all factors move together
+            statistics: average functions to evaluate side by side, e.g. ['mean', 'median', 'geomean'], defaults to the statistics of this Query. Adds a 'statistics' dictionary of
+                average function to results keyed like the output. Every function is computed from the same parsed data, as if the Query was created with that function
         Returns:
             output_dict: dictionary of query results
         """
+        query_params_dict = self._read_query_params(query_path, query_dict)
+
+        year = query_params_dict.get('year')
+        if year is None:
+            raise ValueError('year is a required input')
+
+        phase = query_params_dict.get('phase')
+        numerical_format = query_params_dict.get('numerical_format')
+        parallel_strategy = query_params_dict.get('parallel_strategy')
+        optimizer = query_params_dict.get('optimizer')
+        chip_type = query_params_dict.get('chip_type')
+        year_windows = read_year_windows(year_windows)
+        fields = read_fields(fields)
+        architecture = read_architecture(architecture)
+        quantiles = read_quantiles(quantiles)
+        statistics = self.statistics if statistics is None else read_statistics(statistics)
+
+        snapshot = self.snapshot
+        cache_key = self._cache_key(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+        if year_windows:
+            cache_key += tuple(year_windows.items())
+        if fields is not None:
+            cache_key += (fields,)
+        if architecture is not None:
+            cache_key += (('architecture', architecture),)
+        if quantiles is not None:
+            cache_key += (('quantiles', quantiles),)
+        if statistics is not None:
+            cache_key += (('statistics', statistics),)
+        output_dict = snapshot.query_cache.get(cache_key)
+        cached = output_dict is not None
+        if output_dict is None and snapshot.query_cube is not None and not year_windows and architecture is None:
+            cube_index = snapshot.query_cube.index(year, phase, numerical_format, parallel_strategy, optimizer, chip_type)
+            if cube_index is not None:
+                output_dict = snapshot.query_cube.query(cube_index, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+                if output_dict is not None and fields is not None:
+                    output_dict = OrderedDict((field, output_dict[field]) for field in fields)
+        if output_dict is None:
+            output_dict = snapshot.compute_query(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, year_windows, fields, architecture)
+        if quantiles is not None and not cached:
+            output_dict['quantiles'] = snapshot.compute_quantiles(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, quantiles, year_windows, fields, architecture)
+        if statistics is not None and not cached:
+            output_dict['statistics'] = snapshot.compute_statistics(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, statistics, year_windows, fields, architecture)
+        dependencies = required_tables(fields, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+        snapshot.query_cache.put(cache_key, output_dict, dependencies - {'model_size'} if architecture is not None else dependencies)
+
+        if log:
+            write_txt(self.log_file, query_params_dict, output_dict)
+
+        return output_dict
+
+    def _read_query_params(self, query_path: str = None, query_dict: OrderedDict = None) -> OrderedDict:
+        """
+        Reads the query parameters from a query yaml file or a query dictionary
+        """
         if query_path is None and query_dict is None:
             raise ValueError('Either query_path or query_dict is required')
         elif query_dict is None:
@@ -91,70 +344,194 @@ class Query:
         else:
             query_params_dict = query_dict
             if query_params_dict.get('queries') is not None: raise ValueError('Invalid query.yaml configuration. Did you mean to call self.queries() instead?')
+        return query_params_dict
 
-        year = query_params_dict.get('year')
-        if year is None:
+    def query_batch(self, query_columns = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise') -> OrderedDict:
+        """
+        Vectorized form of query over columns of query parameters. Each internal list is queried once per distinct combination of its own inputs, and the results are combined with array operations
+        Args:
+            query_columns: DataFrame or dictionary of equal length arrays keyed by query parameter, year is required. Architecture columns (params, seq_length, layers, d_model, d_ff,
+                n_head, n_kv_head, max_kv_cache) score an explicit architecture per row like the architecture argument of query, in one array pass over all rows
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+            errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to return NaN for those rows and flag them in an 'error' array
+        Returns:
+            output_dict: dictionary of NumPy arrays keyed like the output of query. Runtime is NaN where query returns None, and 'mask' is True for those rows
+        """
+        columns = query_batch.read_columns(query_columns)
+        return self.snapshot.query_columns(columns, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, errors, query_batch.read_architecture_columns(query_columns))
+
+    def sweep_product(self, axes: OrderedDict, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise') -> OrderedDict:
+        """
+        Evaluates every combination of the values in axes, the same combinations build_test writes out. Each internal list is queried once per combination of its own inputs and the results are broadcast,
+        so the cost grows with the sum of the axis sizes instead of their product
+        Args:
+            axes: sweep spec dictionary of query key to a list, range or 'start..end' string of values, year is required, keys that are not given are None
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+            errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to return NaN for those combinations and flag them in an 'error' array
+        Returns:
+            output_dict: dictionary of NumPy arrays keyed like the output of query, with one dimension per key of axes in the order given
+        """
+        return self.snapshot.sweep_product(axes, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, errors)
+
+    def simulate(self, query_dict: OrderedDict, n_samples: int = 10000, method: str = 'bootstrap', seed: int = None, confidence: float = 0.95, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+        """
+        Monte Carlo estimate of the uncertainty of a query. Every average the query takes over survey rows is resampled, and the samples are propagated
+        through the runtime and model size formulas as arrays
+        Args:
+            query_dict: dictionary of query parameters
+            n_samples: number of samples
+            method: 'bootstrap' resamples the survey rows with replacement, 'lognormal' samples each average from a log-normal fitted to its rows
+            seed: seed of the random generator for reproducible samples, None for a random seed
+            confidence: coverage of the confidence intervals
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            output_dict: 'samples' (dictionary of sample arrays keyed like the output of query), and 'mean', 'median' and 'confidence interval' ((low, high) tuples) of the samples
+        """
+        query_params_dict = self._read_query_params(None, query_dict)
+        if query_params_dict.get('year') is None:
             raise ValueError('year is a required input')
+        return query_simulate.simulate(
+            self.snapshot, *(query_params_dict.get(key) for key in ['year', 'phase', 'numerical_format', 'parallel_strategy', 'optimizer', 'chip_type']),
+            n_samples, method, seed, confidence, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling
+        )
 
-        phase = query_params_dict.get('phase')
-        numerical_format = query_params_dict.get('numerical_format')
-        parallel_strategy = query_params_dict.get('parallel_strategy')
-        optimizer = query_params_dict.get('optimizer')
-        chip_type = query_params_dict.get('chip_type')
+    def sensitivity(self, grid: OrderedDict, errors: str = 'raise'):
+        """
+        Runtime sensitivity to each factor (numerical format, parallel strategy, hardware configuration and model growth) at every point of a grid.
+        Every scaling flag is toggled from one evaluation of the internal lists, instead of querying each point once per flag combination
+        Args:
+            grid: sweep spec dictionary of query key to a list, range or 'start..end' string of values, year is required, keys that are not given are None
+            errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to return NaN for those grid points
+        Returns:
+            DataFrame with one row per grid point and factor: the grid keys, factor, runtime (GPUH), runtime without factor (GPUH), elasticity (ln(runtime / runtime without factor))
+            and share (fraction of the absolute elasticities of the grid point)
+        """
+        return query_sensitivity.sensitivity(self.snapshot, grid, errors)
 
+    def pareto(self, year: int, phase: str, objectives = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True):
+        """
+        Configurations of a year and phase that are not dominated on the objectives, from one batch evaluation of every chip type, numerical format, parallel strategy and optimizer
+        Args:
+            year: query year
+            phase: 'inference' or 'training'
+            objectives: list of output keys to minimize, or dictionary of output key to 'min' or 'max', default runtime (GPUH) and average model size (TB)
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            DataFrame of the non-dominated configurations (chip_type, numerical_format, parallel_strategy, optimizer) and their outputs, sorted by the objectives
+        """
+        return query_pareto.pareto(self.snapshot, year, phase, objectives, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
 
-        numerical_format_query = self.numerical_format_list.query(year, numerical_format, phase)
-        parallel_strategy_query = self.parallel_strategy_list.query(year, parallel_strategy, phase)
-        if self.function:
-            model_size_query = self.model_size_list.query(year, phase, optimizer, self.function)
-            hardware_comparison_query = self.hardware_comparison_list.query(year, chip_type, numerical_format_query['activation_numerical_format'], self.function)
-        else:
-            model_size_query = self.model_size_list.query(year, phase, optimizer)
-            hardware_comparison_query = self.hardware_comparison_list.query(year, chip_type, numerical_format_query['activation_numerical_format'])
-
-        if phase == 'inference': 
-            baseline_runtime = (self.baseline_model['inference_runtime'] / (1000 * 60 * 60)) * (model_size_query['seq_length'] / self.baseline_model['sequence_length'])
-            baseline_tflops = self.baseline_model['inference_tflops']  
-        elif phase == 'training':
-            baseline_runtime = self.baseline_model['training_runtime']
-            baseline_tflops = self.baseline_model['training_tflops']
-
-        try:
-            runtime = baseline_runtime * (model_size_query['parameters'] / self.baseline_model['parameters'])
-            runtime *= (baseline_tflops / hardware_comparison_query) if hardware_configuration_scaling else 1
-            runtime *= (1 / numerical_format_query['speedup']) if numerical_format_scaling else 1
-            runtime *= (1 / parallel_strategy_query) if parallel_strategy_scaling else 1
-        except:
-            runtime = None
-
-        if not (isinstance(runtime, float) or isinstance(runtime, int)):
-            runtime = None
-
-        billion = 10**9 # Billion
-        terabyte = 2**43 # Terabyte
-        conversion = billion/terabyte 
-
-        model_size_query['activation_size'] *= numerical_format_query['activation_numerical_format'] * conversion
-        model_size_query['weight_size'] *= numerical_format_query['weight_numerical_format'] * conversion if phase == 'inference' else numerical_format_query['activation_numerical_format'] * conversion
-        model_size_query['optimizer_size'] = model_size_query['optimizer_size'] * 32 * conversion # assume optimizer is always in fp32
-
-        #runtime = (models_params/baseline_params) * (baseline_tflops/chip_tflops) * (1/numerical_format_speedup) * (1/parallel_strategy_speedup) * baseline_runtime
-
-        output_dict = OrderedDict({
-            'average model size (TB)': model_size_query['activation_size'] + model_size_query['weight_size'] + model_size_query['optimizer_size'],
-            'numerical format speedup': numerical_format_query['speedup'],
-            'parallel strategy speedup': parallel_strategy_query,
-            'hardware (TFLOPS)': hardware_comparison_query,
-            'runtime (GPUH)': runtime,
-            'parameters': model_size_query['parameters'],
-        })
+    def search(self, where: OrderedDict = None, sort_by: str = 'runtime (GPUH)', ascending: bool = True, top_k: int = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True):
+        """
+        Configurations of the whole parameter space that satisfy a predicate, without writing out the product of the parameters
+        Args:
+            where: dictionary of query key to the accepted values (value, list, range or 'start..end' string), and of output key to conditions
+                (('<', 500), '< 500' or a list of them), None matches every configuration with a runtime
+            sort_by: output key to sort the matches by, None keeps the enumeration order
+            ascending: sort order
+            top_k: number of matches to return, None for all
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            DataFrame of the matching configurations, the query keys and the outputs
+        """
+        return query_search.search(self.snapshot, where, sort_by, ascending, top_k, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
 
-        if log:
-            write_txt(self.log_file, query_params_dict, output_dict)
+    def solve(self, query_dict: OrderedDict, runtime_budget: float = None, memory_budget: float = None, parameters: float = None, tolerance: float = 1e-9, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+        """
+        Inverse query. Without parameters, finds the largest model (B parameters) that fits the budgets in the query year, by bisecting on the runtime and model size,
+        which are monotone in the parameter count. With parameters, finds the earliest year in which a model of that size fits the budgets.
+        A model of a different size is the average architecture of the year scaled to that parameter count
+        Args:
+            query_dict: dictionary of query parameters, year is required when solving for parameters
+            runtime_budget: maximum runtime (GPUH)
+            memory_budget: maximum model size (TB)
+            parameters: fixed parameter count (B) to solve for the earliest year instead
+            tolerance: relative tolerance of the parameter count
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            output_dict: year, parameters, runtime (GPUH) and average model size (TB) of the solution, None if no model or year fits the budgets
+        """
+        if runtime_budget is None and memory_budget is None:
+            raise ValueError('runtime_budget or memory_budget is required')
+        scaling_flags = (numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+
+        def budget_ratio(point: OrderedDict, parameters: float) -> float:
+            scaled_dict = query_solve.scale_parameters(point, parameters)
+            ratios = []
+            if runtime_budget is not None:
+                if scaled_dict['runtime (GPUH)'] is None:
+                    raise ValueError('runtime is not defined for this query, check phase and chip_type')
+                ratios.append(scaled_dict['runtime (GPUH)'] / runtime_budget)
+            if memory_budget is not None:
+                ratios.append(scaled_dict['average model size (TB)'] / memory_budget)
+            return max(ratios)
+
+        if parameters is None:
+            if query_dict.get('year') is None:
+                raise ValueError('year is a required input')
+            point = self._solve_point(query_dict, *scaling_flags)
+            solution = query_solve.bisect_max(lambda parameters: budget_ratio(point, parameters), 1, point['parameters'], tolerance)
+            if solution is None:
+                return None
+            return OrderedDict({'year': query_dict['year'], **query_solve.scale_parameters(point, solution)})
 
+        year_lower, year_upper = self.get_year_bounds()
+        for year in range(year_lower, year_upper + 1):
+            # every year after the last year of the data is the same as the last year
+            point = self._solve_point(OrderedDict(query_dict, year=year), *scaling_flags)
+            # a year without a runtime (e.g. no chip of chip_type yet) cannot meet a runtime budget, later years may
+            if runtime_budget is not None and point['runtime (GPUH)'] is None:
+                continue
+            if budget_ratio(point, parameters) <= 1:
+                return OrderedDict({'year': year, **query_solve.scale_parameters(point, parameters)})
+        return None
+
+    def _solve_point(self, query_dict: OrderedDict, *scaling_flags: bool) -> OrderedDict:
+        """
+        Runs a query and adds the activation memory (TB) needed to scale the result to other parameter counts
+        """
+        output_dict = self.query(query_dict=query_dict, numerical_format_scaling=scaling_flags[0], parallel_strategy_scaling=scaling_flags[1], hardware_configuration_scaling=scaling_flags[2])
+        year, phase = query_dict['year'], query_dict.get('phase')
+        snapshot = self.snapshot
+        numerical_format_query = snapshot._query_numerical_format(year, query_dict.get('numerical_format'), phase)
+        model_size_query = snapshot._query_model_size(year, phase, query_dict.get('optimizer'))
+        output_dict['activation size (TB)'] = model_size_query['activation_size'] * (numerical_format_query['activation_numerical_format'] * (query_batch.BILLION / query_batch.TERABYTE))
         return output_dict
-    
-    def queries(self, query_path: str = None, queries_dict: OrderedDict = None, log: bool = False, function = 'mean') -> list[OrderedDict]:
+
+    def get_year_bounds(self) -> tuple[int, int]:
+        """
+        Returns the first and last year covered by the configured year ranges and the hardware data. Queries outside of these years are clamped to them
+        """
+        return self.snapshot.get_year_bounds()
+
+    def cache_info(self) -> OrderedDict:
+        """
+        Returns the hit, miss and eviction counters and the size of the query result cache
+        """
+        return self.query_cache.info()
+
+    def _cache_key(self, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, *scaling_flags: bool) -> tuple:
+        """
+        Builds a canonical cache key for a query, applying the same defaults the internal lists apply so equivalent queries share a key.
+        Phase is kept as given, since a missing phase only defaults to inference inside the numerical format list and changes the runtime otherwise
+        """
+        chip_type = 'gpu' if chip_type is None else chip_type
+        optimizer = 'adam' if optimizer is None else optimizer
+        return (year, phase, numerical_format, parallel_strategy, optimizer, chip_type) + tuple(bool(flag) for flag in scaling_flags)
+
+    def queries(self, query_path: str = None, queries_dict: OrderedDict = None, log: bool = False, function = 'mean', workers: int = None, statistics: list[str] = None) -> list[OrderedDict]:
         """
         Used to query multiple queries at a time
         Args:
@@ -162,6 +539,8 @@ class Query:
             queries_dict: dictionary of queries
             log: enables logging
             function: function to use for averaging
+            workers: number of worker processes to split the queries across, queries run serially if this is None or there are too few queries to benefit
+            statistics: average functions to evaluate side by side with every query, see query
         Returns:
             return_dict: dictionary of results of multiple queries as sub-dictionaries
         """
@@ -173,8 +552,103 @@ class Query:
         if query_dict.get('query') is not None:
             raise ValueError('Invalid query.yaml configuration. Did you mean to call self.query() instead?')
         return_dict = OrderedDict({'queries': OrderedDict()})
-        for key, value in query_dict['queries'].items():
-            query_result = self.query(query_dict=value, log=log) if isinstance(value, dict) else self.query(query_path=value, log=log)
+        query_items = list(query_dict['queries'].items())
+        workers = min(workers or 1, os.cpu_count() or 1, len(query_items) // MIN_QUERIES_PER_WORKER)
+        if workers > 1:
+            # workers receive a copy of the query object once when they start, and only the main process writes to the log file
+            chunk_size = -(-len(query_items) // (workers * CHUNKS_PER_WORKER))
+            chunks = [query_items[i:i + chunk_size] for i in range(0, len(query_items), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                for chunk_results in executor.map(_query_chunk, chunks, [statistics] * len(chunks)):
+                    for key, query_params_dict, query_result in chunk_results:
+                        if log:
+                            write_txt(self.log_file, query_params_dict, query_result)
+                        return_dict['queries'][key] = query_result
+            return return_dict
+
+        for key, value in query_items:
+            query_result = self.query(query_dict=value, log=log, statistics=statistics) if isinstance(value, dict) else self.query(query_path=value, log=log, statistics=statistics)
             return_dict['queries'][key] = query_result
         return return_dict
-            
\ No newline at end of file
+
+    def iter_queries(self, source, log: bool = False, source_format: str = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> iter:
+        """
+        Streams queries from a JSONL or queries yaml source and yields results as they are computed. Queries are read one at a time when the next result is requested,
+        so memory use does not grow with the size of the source and a slow consumer simply slows down reading
+        Args:
+            source: path to a .jsonl or .yaml file, or a file object
+            log: enables logging
+            source_format: 'jsonl' or 'yaml', inferred from the file extension for paths and defaults to 'jsonl' for file objects
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            iterator of (key, query result) tuples
+        """
+        if isinstance(source, str):
+            if source_format is None:
+                source_format = 'yaml' if source.endswith(('.yaml', '.yml')) else 'jsonl'
+            with open(source) as stream:
+                yield from self.iter_queries(stream, log, source_format, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+            return
+
+        if source_format in (None, 'jsonl'):
+            query_items = iter_jsonl_queries(source)
+        elif source_format == 'yaml':
+            query_items = iter_yaml_queries(source)
+        else:
+            raise ValueError(f'Invalid source format: {source_format}')
+
+        for key, value in query_items:
+            query_kwargs = {'query_dict': value} if isinstance(value, dict) else {'query_path': value}
+            yield key, self.query(**query_kwargs, log=log, numerical_format_scaling=numerical_format_scaling, parallel_strategy_scaling=parallel_strategy_scaling, hardware_configuration_scaling=hardware_configuration_scaling)
+
+    def iter_sweep(self, sweep_spec, log: bool = False, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> iter:
+        """
+        Streams the results of every combination of a sweep spec. Combinations are expanded lazily, so no test yaml is written and the combination list is never built
+        Args:
+            sweep_spec: dictionary of query key to a list, range or 'start..end' string of values, or path to a yaml file with the spec under a 'sweep' key
+            log: enables logging
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            iterator of (key, query result) tuples, keyed like the queries build_test writes
+        """
+        for key, query_params_dict in iter_sweep_queries(sweep_spec):
+            yield key, self.query(query_dict=query_params_dict, log=log, numerical_format_scaling=numerical_format_scaling, parallel_strategy_scaling=parallel_strategy_scaling, hardware_configuration_scaling=hardware_configuration_scaling)
+
+    def sweep(self, sweep_spec, log: bool = False, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+        """
+        Runs every combination of a sweep spec, equivalent to running the output of build_test through queries without the intermediate yaml
+        Args:
+            sweep_spec: sweep spec dictionary or path, see iter_sweep
+            log: enables logging
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            return_dict: dictionary of results of the queries as sub-dictionaries
+        """
+        return OrderedDict({'queries': OrderedDict(self.iter_sweep(sweep_spec, log, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling))})
+
+_worker_query = None
+
+def _init_worker(query_obj: Query):
+    """
+    Stores the query object shipped to a worker process by Query.queries
+    """
+    global _worker_query
+    _worker_query = query_obj
+
+def _query_chunk(chunk: list[tuple], statistics: tuple = None) -> list[tuple]:
+    """
+    Runs a chunk of (key, query) items in a worker process
+    Returns:
+        list of (key, query parameters, query result) tuples
+    """
+    results = []
+    for key, value in chunk:
+        query_params_dict = _worker_query._read_query_params(query_dict=value) if isinstance(value, dict) else _worker_query._read_query_params(query_path=value)
+        results.append((key, query_params_dict, _worker_query.query(query_dict=query_params_dict, statistics=statistics)))
+    return results
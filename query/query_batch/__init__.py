@@ -0,0 +1 @@
+from .query_batch import read_columns, read_architecture_columns, encode_column, group_codes, evaluate_factor, evaluate_grid, expand_dims, map_output, sweep_product, sweep_factors, mask_outputs, factor_outputs, compute_outputs, to_float_array
\ No newline at end of file
@@ -0,0 +1,342 @@
+from query.utils.utils import QUERY_KEYS, OUTPUT_KEYS, ARCHITECTURE_KEYS, validate_query_keys, read_sweep_spec
+from collections import OrderedDict
+from itertools import product
+import numpy as np
+
+BILLION = 10**9 # Billion
+TERABYTE = 2**43 # Terabyte
+
+def read_columns(query_columns) -> OrderedDict:
+    """
+    Reads a DataFrame or a dictionary of equal length arrays into encoded query columns
+    Args:
+        query_columns: DataFrame or dictionary keyed by query parameter, year is required. Architecture columns are accepted and left to read_architecture_columns
+    Returns:
+        dictionary of (codes, categories) tuples for every query key, keys that are not given are encoded as None
+    """
+    if query_columns is None:
+        raise ValueError('query_columns is required')
+    if hasattr(query_columns, 'columns'):
+        query_columns = OrderedDict((key, query_columns[key].to_numpy()) for key in query_columns.columns)
+
+    for key in query_columns:
+        if key not in QUERY_KEYS + ARCHITECTURE_KEYS:
+            raise ValueError(f'Invalid key: {key} query_batch.read_columns()')
+    if query_columns.get('year') is None:
+        raise ValueError('year is a required input')
+
+    length = len(query_columns['year'])
+    for key, values in query_columns.items():
+        if len(values) != length:
+            raise ValueError(f'Column {key} has length {len(values)}, expected {length}')
+
+    try:
+        years = np.asarray(query_columns['year'], dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError('year is a required input')
+    if np.isnan(years).any():
+        raise ValueError('year is a required input')
+
+    encoded_columns = OrderedDict({'year': encode_column(years.astype(int) if (years == years.astype(int)).all() else years)})
+    for key in QUERY_KEYS[1:]:
+        values = query_columns.get(key)
+        encoded_columns[key] = encode_column(values if values is not None else [None] * length)
+    return encoded_columns
+
+def read_architecture_columns(query_columns) -> OrderedDict:
+    """
+    Reads the explicit architecture columns of a DataFrame or a dictionary of equal length arrays, n_kv_head defaults to n_head and max_kv_cache defaults to 0
+    Args:
+        query_columns: DataFrame or dictionary keyed by query parameter and architecture parameter
+    Returns:
+        dictionary of float arrays for every key of ARCHITECTURE_KEYS, None if no architecture column is given
+    """
+    keys = list(query_columns.columns) if hasattr(query_columns, 'columns') else list(query_columns)
+    if not any(key in ARCHITECTURE_KEYS for key in keys):
+        return None
+
+    architecture_columns = OrderedDict((key, np.asarray(query_columns[key], dtype=float)) for key in ARCHITECTURE_KEYS if key in keys)
+    architecture_columns.setdefault('n_kv_head', architecture_columns.get('n_head'))
+    if 'params' in architecture_columns:
+        architecture_columns.setdefault('max_kv_cache', np.zeros_like(architecture_columns['params']))
+    for key in ARCHITECTURE_KEYS:
+        if architecture_columns.get(key) is None:
+            raise ValueError(f'{key} is a required architecture input')
+    return OrderedDict((key, architecture_columns[key]) for key in ARCHITECTURE_KEYS)
+
+def encode_column(values) -> tuple[np.ndarray, list]:
+    """
+    Integer encodes a column of query values. Missing values (None, NaN or empty strings) are encoded as the None category
+    Args:
+        values: list or array of query values
+    Returns:
+        (codes: integer code of every value, categories: list of distinct values indexed by code)
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.number):
+        categories, codes = np.unique(values, return_inverse=True)
+        return codes.reshape(-1), categories.tolist()
+
+    values = values.astype(object)
+    missing = (values == None) | (values != values)
+    filled = np.where(missing, '', values).astype(str)
+    categories, codes = np.unique(filled, return_inverse=True)
+    categories = [category if category != '' else None for category in categories.tolist()]
+    return codes.reshape(-1), categories
+
+def group_codes(codes: list[np.ndarray], sizes: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Groups rows by the combination of several encoded columns
+    Args:
+        codes: list of integer code arrays
+        sizes: number of categories of each code array
+    Returns:
+        (index: first row of every distinct combination, inverse: combination index of every row)
+    """
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    for code, size in zip(codes, sizes):
+        key = key * size + code
+    _, index, inverse = np.unique(key, return_index=True, return_inverse=True)
+    return index, inverse.reshape(-1)
+
+def to_float_array(values: list) -> np.ndarray:
+    """
+    Converts a list of query results to a float array, None is converted to NaN
+    """
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+def call_factor(function, arguments: list, errors: str = 'raise') -> tuple:
+    """
+    Calls a scalar query function
+    Args:
+        function: scalar query function
+        arguments: list of function arguments
+        errors: 'raise' to propagate exceptions from function, 'coerce' to return None instead
+    Returns:
+        (result, failed: True if function raised)
+    """
+    if errors == 'raise':
+        return function(*arguments), False
+    try:
+        return function(*arguments), False
+    except Exception:
+        return None, True
+
+def to_output(results: list, keys: list[str] = None):
+    """
+    Converts a list of query results to a float array, or to a dictionary of float arrays if keys are given
+    """
+    if keys is None:
+        return to_float_array(results)
+    return OrderedDict(
+        (key, to_float_array([result[key] if result is not None else None for result in results])) for key in keys
+    )
+
+def evaluate_factor(function, encoded_columns: list[tuple], keys: list[str] = None, errors: str = 'raise'):
+    """
+    Evaluates a scalar query function once per distinct combination of its inputs and broadcasts the results back to every row
+    Args:
+        function: scalar query function taking one decoded value per encoded column
+        encoded_columns: list of (codes, categories) tuples, one per function argument
+        keys: keys to read from the returned dictionaries, scalar results are expected if this is None
+        errors: 'raise' to propagate exceptions from function, 'coerce' to return NaN for the failing combinations
+    Returns:
+        array of results, or a dictionary of arrays if keys are given. With errors='coerce' a (results, error_mask) tuple is returned
+    """
+    index, inverse = group_codes([codes for codes, _ in encoded_columns], [len(categories) for _, categories in encoded_columns])
+    calls = [call_factor(function, [categories[codes[row]] for codes, categories in encoded_columns], errors) for row in index]
+
+    output = map_output(to_output([result for result, _ in calls], keys), lambda values: values[inverse])
+    return output if errors == 'raise' else (output, np.array([failed for _, failed in calls], dtype=bool)[inverse])
+
+def evaluate_grid(function, value_lists: list[list], keys: list[str] = None, errors: str = 'raise'):
+    """
+    Evaluates a scalar query function once per combination of the distinct values of each argument
+    Args:
+        function: scalar query function taking one value from each list
+        value_lists: list of argument values, one list per function argument
+        keys: keys to read from the returned dictionaries, scalar results are expected if this is None
+        errors: 'raise' to propagate exceptions from function, 'coerce' to return NaN for the failing combinations
+    Returns:
+        array of shape (len(value_lists[0]), len(value_lists[1]), ...), or a dictionary of arrays if keys are given. With errors='coerce' a (results, error_mask) tuple is returned
+    """
+    distinct_lists = [list(OrderedDict.fromkeys(values)) for values in value_lists]
+    calls = [call_factor(function, list(arguments), errors) for arguments in product(*distinct_lists)]
+
+    shape = tuple(len(distinct) for distinct in distinct_lists)
+    positions = [{value: i for i, value in enumerate(distinct)} for distinct in distinct_lists]
+    inverse = np.ix_(*[[position[value] for value in values] for position, values in zip(positions, value_lists)])
+
+    output = map_output(to_output([result for result, _ in calls], keys), lambda values: values.reshape(shape)[inverse])
+    return output if errors == 'raise' else (output, np.array([failed for _, failed in calls], dtype=bool).reshape(shape)[inverse])
+
+def map_output(output, function):
+    """
+    Applies a function to an array, or to every array of a dictionary of arrays
+    """
+    if isinstance(output, dict):
+        return OrderedDict((key, function(values)) for key, values in output.items())
+    return function(output)
+
+def expand_dims(array: np.ndarray, dims: list[int], ndim: int) -> np.ndarray:
+    """
+    Reshapes an array whose axes correspond to dims of an ndim sweep so that it broadcasts against the full sweep
+    Args:
+        array: array with one axis per entry of dims
+        dims: sweep dimension of each array axis
+        ndim: number of sweep dimensions
+    Returns:
+        array with length 1 axes for every sweep dimension not in dims
+    """
+    array = np.transpose(array, np.argsort(dims))
+    shape = [1] * ndim
+    for dim, length in zip(sorted(dims), array.shape):
+        shape[dim] = length
+    return array.reshape(shape)
+
+def sweep_product(query_obj, axes: OrderedDict, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise') -> OrderedDict:
+    """
+    Evaluates the cartesian product of the axes. Each factor is evaluated once per combination of its own inputs, then broadcast against the other factors,
+    so the number of internal list queries grows with the sum of the axis sizes rather than their product
+    Args:
+        query_obj: loaded Query object
+        axes: sweep spec dictionary of query key to the values of that key, see read_sweep_spec, year is required
+        numerical_format_scaling: enables numerical format speedup
+        parallel_strategy_scaling: enables parallel strategy speedup
+        hardware_configuration_scaling: enables hardware configuration speedup
+        errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to return NaN for those combinations and flag them in an 'error' array
+    Returns:
+        output_dict: dictionary of arrays keyed like the output of Query.query, with one dimension per key of axes in the order given
+    """
+    factors, error, shape = sweep_factors(query_obj, axes, errors)
+    output_dict = compute_outputs(query_obj.baseline_model, *factors, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+    return mask_outputs(output_dict, error, shape, errors)
+
+def sweep_factors(query_obj, axes: OrderedDict, errors: str = 'raise') -> tuple:
+    """
+    Evaluates the internal list queries of every combination of the axes, see sweep_product
+    Args:
+        query_obj: loaded Query object
+        axes: sweep spec dictionary of query key to the values of that key, see read_sweep_spec, year is required
+        errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to flag those combinations in the error array instead
+    Returns:
+        (factors: tuple of the phase, numerical format, parallel strategy, model size and hardware arguments of compute_outputs, broadcastable against each other,
+        error: boolean array of the combinations that raised, shape: shape of the sweep)
+    """
+    validate_query_keys(axes, 'query_batch.sweep_product()')
+    axes = read_sweep_spec(axes)
+    if axes.get('year') is None:
+        raise ValueError('year is a required input')
+
+    sweep_axes = OrderedDict((key, list(values)) for key, values in axes.items())
+    for key in QUERY_KEYS:
+        sweep_axes.setdefault(key, [None])
+    dims = OrderedDict((key, i) for i, key in enumerate(sweep_axes))
+    ndim = len(sweep_axes)
+    error = np.zeros([1] * ndim, dtype=bool)
+
+    def evaluate(function, grid_keys: list[str], keys: list[str] = None):
+        nonlocal error
+        output = evaluate_grid(function, [sweep_axes[key] for key in grid_keys], keys, errors)
+        if errors != 'raise':
+            output, failed = output
+            error = error | expand_dims(failed, [dims[key] for key in grid_keys], ndim)
+        return map_output(output, lambda values: expand_dims(values, [dims[key] for key in grid_keys], ndim))
+
+    numerical_format_query = evaluate(query_obj._query_numerical_format, ['year', 'numerical_format', 'phase'], ['speedup', 'activation_numerical_format', 'weight_numerical_format'])
+    parallel_strategy_query = evaluate(query_obj._query_parallel_strategy, ['year', 'parallel_strategy', 'phase'])
+    model_size_query = evaluate(query_obj._query_model_size, ['year', 'phase', 'optimizer'], ['activation_size', 'weight_size', 'optimizer_size', 'parameters', 'seq_length'])
+
+    # hardware depends on the activation format chosen by the numerical format query, so it is evaluated over the distinct formats and gathered
+    activation_format = np.nan_to_num(numerical_format_query['activation_numerical_format']).astype(int)
+    activation_formats = np.unique(activation_format).tolist()
+    hardware_table = evaluate_grid(query_obj._query_hardware_comparison, [sweep_axes['year'], sweep_axes['chip_type'], activation_formats], None, errors)
+    if errors != 'raise':
+        hardware_table, failed = hardware_table
+    year_index = expand_dims(np.arange(len(sweep_axes['year'])), [dims['year']], ndim)
+    chip_type_index = expand_dims(np.arange(len(sweep_axes['chip_type'])), [dims['chip_type']], ndim)
+    format_index = np.searchsorted(activation_formats, activation_format)
+    hardware_comparison_query = hardware_table[year_index, chip_type_index, format_index]
+    if errors != 'raise':
+        error = error | failed[year_index, chip_type_index, format_index]
+
+    phase = expand_dims(np.array(sweep_axes['phase'], dtype=object), [dims['phase']], ndim)
+    shape = tuple(len(values) for values in axes.values())
+    return (phase, numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query), error, shape
+
+def mask_outputs(output_dict: OrderedDict, error: np.ndarray, shape: tuple, errors: str = 'raise') -> OrderedDict:
+    """
+    Sets the outputs of the combinations that raised to NaN, flags them in 'mask' and 'error' (with errors='coerce'), and reshapes the outputs to the sweep shape
+    """
+    if errors != 'raise':
+        error = np.broadcast_to(error, output_dict['mask'].shape)
+        for key in output_dict:
+            if key != 'mask':
+                output_dict[key][error] = np.nan
+        output_dict['mask'] |= error
+        output_dict['error'] = error.copy()
+    return OrderedDict((key, values.reshape(shape)) for key, values in output_dict.items())
+
+def factor_outputs(phase: np.ndarray, numerical_format_query: OrderedDict, parallel_strategy_query: np.ndarray, model_size_query: OrderedDict, hardware_comparison_query: np.ndarray) -> OrderedDict:
+    """
+    Outputs of compute_outputs other than the runtime. They are not broadcast, so each array only spans the dimensions of the factors it is computed from
+    Returns:
+        dictionary of average model size (TB), numerical format speedup, parallel strategy speedup, hardware (TFLOPS) and parameters arrays
+    """
+    is_inference = phase == 'inference'
+    conversion = BILLION / TERABYTE
+    activation_format = numerical_format_query['activation_numerical_format']
+    weight_format = np.where(is_inference, numerical_format_query['weight_numerical_format'], activation_format)
+    activation_size = model_size_query['activation_size'] * (activation_format * conversion)
+    weight_size = model_size_query['weight_size'] * (weight_format * conversion)
+    optimizer_size = model_size_query['optimizer_size'] * 32 * conversion # assume optimizer is always in fp32
+
+    return OrderedDict({
+        'average model size (TB)': activation_size + weight_size + optimizer_size,
+        'numerical format speedup': numerical_format_query['speedup'],
+        'parallel strategy speedup': parallel_strategy_query,
+        'hardware (TFLOPS)': hardware_comparison_query,
+        'parameters': model_size_query['parameters'],
+    })
+
+def compute_outputs(baseline_model: OrderedDict, phase: np.ndarray, numerical_format_query: OrderedDict, parallel_strategy_query: np.ndarray, model_size_query: OrderedDict, hardware_comparison_query: np.ndarray, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+    """
+    Array form of the runtime and model size formulas in Query.query. Inputs only need to be broadcastable against each other
+    Args:
+        baseline_model: dictionary of baseline model parameters
+        phase: array of phases (inference, training or None)
+        numerical_format_query: dictionary of speedup, activation_numerical_format and weight_numerical_format arrays
+        parallel_strategy_query: array of parallel strategy speedups
+        model_size_query: dictionary of activation_size, weight_size, optimizer_size, parameters and seq_length arrays
+        hardware_comparison_query: array of hardware tflops
+        numerical_format_scaling: enables numerical format speedup
+        parallel_strategy_scaling: enables parallel strategy speedup
+        hardware_configuration_scaling: enables hardware configuration speedup
+    Returns:
+        output_dict: dictionary of result arrays keyed like the output of Query.query, runtime is NaN where Query.query returns None
+    """
+    is_inference = phase == 'inference'
+    is_training = phase == 'training'
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inference_runtime = (baseline_model['inference_runtime'] / (1000 * 60 * 60)) * (model_size_query['seq_length'] / baseline_model['sequence_length'])
+        baseline_runtime = np.where(is_inference, inference_runtime, np.where(is_training, baseline_model['training_runtime'], np.nan))
+        baseline_tflops = np.where(is_inference, baseline_model['inference_tflops'], baseline_model['training_tflops'])
+
+        runtime = baseline_runtime * (model_size_query['parameters'] / baseline_model['parameters'])
+        if hardware_configuration_scaling:
+            runtime = runtime * (baseline_tflops / hardware_comparison_query)
+        if numerical_format_scaling:
+            runtime = runtime * (1 / numerical_format_query['speedup'])
+        if parallel_strategy_scaling:
+            runtime = runtime * (1 / parallel_strategy_query)
+        runtime = np.where(np.isfinite(runtime), runtime, np.nan)
+
+    output_dict = factor_outputs(phase, numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query)
+    output_dict = OrderedDict((key, runtime if key == 'runtime (GPUH)' else output_dict[key]) for key in OUTPUT_KEYS)
+    shape = np.broadcast(*output_dict.values()).shape
+    for key, value in output_dict.items():
+        value = np.asarray(value, dtype=float)
+        output_dict[key] = value if value.shape == shape else np.broadcast_to(value, shape).copy()
+    output_dict['mask'] = np.isnan(output_dict['runtime (GPUH)'])
+    return output_dict
@@ -0,0 +1 @@
+from .query_cache import QueryCache
\ No newline at end of file
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import threading
+
+def copy_result(result: OrderedDict) -> OrderedDict:
+    """
+    Copies a query result and the dictionaries nested in it (quantiles, statistics), the values are numbers, strings or None
+    """
+    return OrderedDict((key, copy_result(value) if isinstance(value, dict) else value) for key, value in result.items())
+
+class QueryCache:
+    """
+    Bounded least recently used cache of query results, with hit, miss and eviction counters. A snapshot shares its cache with every thread
+    that queries it, so lookups and updates hold a lock for the few dictionary operations they make
+    Args:
+        max_size: maximum number of cached results, 0 or None disables the cache
+    """
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size or 0
+        self.results = OrderedDict()
+        self.dependencies = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> OrderedDict:
+        """
+        Looks up a cached result and marks it as most recently used
+        Args:
+            key: canonical query key
+        Returns:
+            copy of the cached result and its nested dictionaries, None on a miss
+        """
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.results.move_to_end(key)
+        return copy_result(result)
+
+    def put(self, key: tuple, result: OrderedDict, dependencies: frozenset = None):
+        """
+        Caches a result, evicting the least recently used result if the cache is full
+        Args:
+            key: canonical query key
+            result: query result to cache
+            dependencies: names of the data tables the result was computed from, None if it depends on every table
+        """
+        if self.max_size <= 0:
+            return
+        result = copy_result(result)
+        with self.lock:
+            self.results[key] = result
+            self.dependencies[key] = dependencies
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_size:
+                evicted_key, _ = self.results.popitem(last=False)
+                self.dependencies.pop(evicted_key, None)
+                self.evictions += 1
+
+    def copy(self, invalidated: set = None):
+        """
+        Returns a new cache with the results that do not depend on any of the invalidated tables, counters start at zero
+        Args:
+            invalidated: names of the data tables that changed
+        """
+        invalidated = set(invalidated or ())
+        query_cache = QueryCache(self.max_size)
+        with self.lock:
+            items = [(key, result, self.dependencies.get(key)) for key, result in self.results.items()]
+        for key, result, dependencies in items:
+            if invalidated and (dependencies is None or dependencies & invalidated):
+                continue
+            query_cache.results[key] = result
+            query_cache.dependencies[key] = dependencies
+        return query_cache
+
+    def clear(self):
+        """
+        Invalidates every cached result, counters are kept
+        """
+        with self.lock:
+            self.results.clear()
+            self.dependencies.clear()
+
+    def info(self) -> OrderedDict:
+        with self.lock:
+            return OrderedDict({
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.results),
+                'max_size': self.max_size,
+            })
+
+    def __len__(self):
+        return len(self.results)
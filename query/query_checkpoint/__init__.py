@@ -0,0 +1 @@
+from .query_checkpoint import CheckpointTables, write_checkpoint, read_checkpoint, is_checkpoint, encode_column, decode_column, CHECKPOINT_MAGIC, CHECKPOINT_VERSION
\ No newline at end of file
@@ -0,0 +1,206 @@
+from query.query_cube.query_cube import QueryCube, CUBE_FIELDS
+from query.utils.utils import atomic_write
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+import threading
+import hashlib
+import struct
+import json
+import mmap
+
+CHECKPOINT_MAGIC = b'QRYCKPT\n'
+CHECKPOINT_VERSION = 2 # version 2 stores the sha256 of each section, so every section is verified when it is read
+CHECKPOINT_ALIGNMENT = 64 # sections start on a multiple of this many bytes, so memory mapped arrays are aligned
+CHECKPOINT_DTYPES = ['<f8', '<i8', '|b1'] # only plain numeric arrays are stored, no section can hold python objects
+PYTHON_SCALARS = OrderedDict({float: '<f8', int: '<i8', bool: '|b1'})
+NUMPY_SCALARS = OrderedDict({np.float64: '<f8', np.int64: '<i8', np.bool_: '|b1'})
+JSON_SCALARS = (str, float, int, bool, type(None))
+
+def is_checkpoint(path: str) -> bool:
+    """
+    Checks whether a file starts with CHECKPOINT_MAGIC, checkpoints of earlier versions are pickle files
+    """
+    with open(path, 'rb') as in_file:
+        return in_file.read(len(CHECKPOINT_MAGIC)) == CHECKPOINT_MAGIC
+
+def encode_column(values: list) -> tuple[OrderedDict, bytes]:
+    """
+    Encodes the values of one table column. Columns of a single python or numpy float, int or bool type are stored as a little endian array,
+    other columns of strings, numbers and missing values as a JSON list
+    Args:
+        values: values of the column, in row order
+    Returns:
+        (section header without offset, section bytes)
+    """
+    types = set(type(value) for value in values)
+    if len(types) == 1:
+        value_type = types.pop()
+        if value_type in PYTHON_SCALARS and (value_type is not int or all(-2 ** 63 <= value < 2 ** 63 for value in values)):
+            return OrderedDict({'dtype': PYTHON_SCALARS[value_type], 'scalar': 'python'}), np.asarray(values, dtype=PYTHON_SCALARS[value_type]).tobytes()
+        if value_type in NUMPY_SCALARS:
+            return OrderedDict({'dtype': NUMPY_SCALARS[value_type], 'scalar': 'numpy'}), np.asarray(values, dtype=NUMPY_SCALARS[value_type]).tobytes()
+        types = {value_type}
+    if not all(value_type in JSON_SCALARS for value_type in types):
+        raise TypeError(f'Cannot store values of type {sorted(value_type.__name__ for value_type in types)} in a checkpoint')
+    return OrderedDict({'dtype': 'json'}), json.dumps(values).encode('utf-8')
+
+def decode_column(section: OrderedDict, buffer) -> list:
+    """
+    Decodes a column section written by encode_column
+    Args:
+        section: section header
+        buffer: bytes of the section
+    Returns:
+        list of values, python or numpy scalars like the values that were written
+    """
+    if section['dtype'] == 'json':
+        return json.loads(bytes(buffer).decode('utf-8'))
+    if section['dtype'] not in CHECKPOINT_DTYPES:
+        raise ValueError(f'Invalid checkpoint dtype: {section["dtype"]}')
+    values = np.frombuffer(buffer, dtype=section['dtype'])
+    return values.tolist() if section['scalar'] == 'python' else list(values.astype(values.dtype.newbyteorder('=')))
+
+def write_checkpoint(path: str, settings: OrderedDict, configuration: OrderedDict, input_dict: OrderedDict, query_cube: QueryCube = None) -> str:
+    """
+    Writes a checkpoint atomically (see atomic_write). The file is CHECKPOINT_MAGIC, the length of a JSON header, the header, and the data sections.
+    The header holds the version, the sha256 of the data, the Query settings, the configuration, and the offset and sha256 of every table column and of the query cube.
+    The internal lists are not stored, they are rebuilt from the tables when a query first needs them
+    Args:
+        path: checkpoint path
+        settings: JSON serializable Query settings (path, function, statistics, cache_size, log_file)
+        configuration: year_ranges, optimizers and baseline_model
+        input_dict: cleaned tables, dictionary of table name to a dictionary of row index to row, every row of a table has the same keys
+        query_cube: QueryCube stored as an array section that is memory mapped when the checkpoint is read, None if there is no cube
+    Returns:
+        sha256 hex digest of the data sections
+    """
+    sections = []
+    offset = 0
+
+    def add_section(section: OrderedDict, buffer) -> OrderedDict:
+        nonlocal offset
+        padding = -offset % CHECKPOINT_ALIGNMENT
+        sections.append(b'\0' * padding)
+        sections.append(buffer)
+        offset += padding
+        section.update(offset=offset, length=memoryview(buffer).nbytes, sha256=hashlib.sha256(buffer).hexdigest())
+        offset += section['length']
+        return section
+
+    tables = OrderedDict()
+    for name, rows in input_dict.items():
+        keys = list(next(iter(rows.values()))) if rows else []
+        if any(list(row) != keys for row in rows.values()):
+            raise ValueError(f'Rows of table {name} have different keys and cannot be stored as columns')
+        table = OrderedDict({'rows': len(rows), 'columns': OrderedDict()})
+        if list(rows) != list(range(len(rows))):
+            table['index'] = list(rows)
+        for key in keys:
+            table['columns'][key] = add_section(*encode_column([row[key] for row in rows.values()]))
+        tables[name] = table
+
+    cube = None
+    if query_cube is not None:
+        values = np.ascontiguousarray(query_cube.values, dtype='<f8')
+        cube = add_section(OrderedDict({'fields': CUBE_FIELDS, 'axes': query_cube.axes, 'shape': list(values.shape), 'dtype': '<f8'}), memoryview(values).cast('B'))
+
+    data_hash = hashlib.sha256()
+    for buffer in sections:
+        data_hash.update(buffer)
+    header = OrderedDict({'version': CHECKPOINT_VERSION, 'hash': data_hash.hexdigest(), 'query': settings, 'configuration': configuration, 'tables': tables, 'cube': cube})
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(len(CHECKPOINT_MAGIC) + 8 + len(header_bytes)) % CHECKPOINT_ALIGNMENT)
+
+    with atomic_write(path) as out_file:
+        out_file.write(CHECKPOINT_MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+        for buffer in sections:
+            out_file.write(buffer)
+    return header['hash']
+
+def read_checkpoint(path: str, verify: bool = False) -> OrderedDict:
+    """
+    Reads the header of a checkpoint and memory maps its data. Nothing is unpickled: table columns are decoded from arrays or JSON when a table is first accessed,
+    and the query cube is a read only view of the mapped file. Every section is checked against its sha256 when it is read, so a corrupted section raises instead of loading
+    Args:
+        path: checkpoint path
+        verify: also hash all of the data and compare it to the header now, which reads the whole file. Version 1 checkpoints have no section hashes and are always verified
+    Returns:
+        dictionary of version, hash, query (settings), configuration, input_dict (CheckpointTables) and query_cube (QueryCube or None)
+    """
+    with open(path, 'rb') as in_file:
+        if in_file.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError(f'{path} is not a checkpoint')
+        header_length = struct.unpack('<Q', in_file.read(8))[0]
+        header_bytes = in_file.read(header_length)
+        if len(header_bytes) < header_length:
+            raise ValueError(f'{path} is truncated, its header is incomplete')
+        header = json.loads(header_bytes.decode('utf-8'), object_pairs_hook=OrderedDict)
+        if header['version'] > CHECKPOINT_VERSION:
+            raise ValueError(f'{path} was written by a newer version (checkpoint version {header["version"]}, supported up to {CHECKPOINT_VERSION})')
+        data = memoryview(mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ))[len(CHECKPOINT_MAGIC) + 8 + header_length:]
+
+    if (verify or header['version'] < 2) and hashlib.sha256(data).hexdigest() != header['hash']:
+        raise ValueError(f'{path} is corrupted, its data does not match the hash of its header')
+
+    query_cube = None
+    cube = header['cube']
+    if cube is not None and list(cube['fields']) == CUBE_FIELDS:
+        values = np.frombuffer(read_section(data, cube), dtype=cube['dtype']).reshape(cube['shape'])
+        query_cube = QueryCube(OrderedDict((key, list(categories)) for key, categories in cube['axes'].items()), values)
+
+    return OrderedDict({
+        'version': header['version'],
+        'hash': header['hash'],
+        'query': header['query'],
+        'configuration': header['configuration'],
+        'input_dict': CheckpointTables(header['tables'], data),
+        'query_cube': query_cube,
+    })
+
+def read_section(data: memoryview, section: OrderedDict) -> memoryview:
+    """
+    Returns the bytes of a section, checking that it lies inside the data and matches its sha256
+    """
+    if section['offset'] < 0 or section['offset'] + section['length'] > len(data):
+        raise ValueError('Checkpoint section is out of bounds, the file is truncated or corrupted')
+    buffer = data[section['offset']:section['offset'] + section['length']]
+    if 'sha256' in section and hashlib.sha256(buffer).hexdigest() != section['sha256']:
+        raise ValueError('Checkpoint section is corrupted, its data does not match its hash')
+    return buffer
+
+class CheckpointTables(Mapping):
+    """
+    Read only dictionary of table name to rows over the data of a checkpoint, used as the input_dict of a QueryDataset. Each table is decoded into
+    the rows read_csv_file returns the first time it is accessed, once under a lock. It pickles as a plain OrderedDict of every table
+    Args:
+        tables: table headers of the checkpoint
+        data: memory mapped data sections
+    """
+    def __init__(self, tables: OrderedDict, data: memoryview):
+        self.tables = tables
+        self.data = data
+        self.decoded = OrderedDict()
+        self.lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> OrderedDict:
+        if name not in self.decoded:
+            table = self.tables[name]
+            with self.lock:
+                if name not in self.decoded:
+                    columns = OrderedDict((key, decode_column(section, read_section(self.data, section))) for key, section in table['columns'].items())
+                    index = table.get('index', range(table['rows']))
+                    self.decoded[name] = OrderedDict((row_index, OrderedDict((key, values[position]) for key, values in columns.items())) for position, row_index in enumerate(index))
+        return self.decoded[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self.tables
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __reduce__(self):
+        return (OrderedDict, (list(self.items()),))
\ No newline at end of file
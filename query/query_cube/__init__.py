@@ -0,0 +1 @@
+from .query_cube import QueryCube, CUBE_FIELDS, compile_cube, parameter_space, load_cube, remove_cube, cube_paths
\ No newline at end of file
@@ -0,0 +1,148 @@
+from query.utils.utils import QUERY_KEYS, read_yaml, write_yaml
+from collections import OrderedDict
+import numpy as np
+import os
+
+CUBE_FIELDS = ['average model size (TB)', 'numerical format speedup', 'parallel strategy speedup', 'hardware (TFLOPS)', 'runtime (GPUH)', 'parameters', 'base runtime', 'baseline tflops', 'error']
+
+class QueryCube:
+    """
+    Dense n-dimensional table of query results over every combination of the query parameters, indexed by integer encoded categories
+    Args:
+        axes: dictionary of query key to the list of categories along that axis, the year axis is every year between the first and last year of the data
+        values: array of shape (len(CUBE_FIELDS), *axis lengths)
+    """
+    def __init__(self, axes: OrderedDict, values: np.ndarray):
+        self.axes = axes
+        self.values = values
+        self.year_lower = axes['year'][0]
+        self.year_upper = axes['year'][-1]
+        self.field_index = OrderedDict((field, i) for i, field in enumerate(CUBE_FIELDS))
+        self.category_index = OrderedDict((key, {category: i for i, category in enumerate(categories)}) for key, categories in axes.items() if key != 'year')
+
+    def index(self, year: int, phase: str = None, numerical_format: str = None, parallel_strategy: str = None, optimizer: str = None, chip_type: str = None) -> tuple:
+        """
+        Maps query parameters to a cube index. Years outside of the data are clamped to the first or last year, matching get_year_range_tuple and the hardware year bounds
+        Returns:
+            index tuple, None if the query is not covered by the cube
+        """
+        if not isinstance(year, int) or isinstance(year, bool):
+            return None
+        year = min(max(year, self.year_lower), self.year_upper)
+        optimizer = 'adam' if optimizer is None else optimizer
+        chip_type = 'gpu' if chip_type is None else chip_type
+
+        index = [year - self.year_lower]
+        for key, value in zip(QUERY_KEYS[1:], (phase, numerical_format, parallel_strategy, optimizer, chip_type)):
+            category_index = self.category_index[key].get(value)
+            if category_index is None:
+                return None
+            index.append(category_index)
+        return tuple(index)
+
+    def query(self, index: tuple, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+        """
+        Reads the query result at a cube index
+        Args:
+            index: cube index returned by self.index
+            numerical_format_scaling: enables numerical format speedup
+            parallel_strategy_scaling: enables parallel strategy speedup
+            hardware_configuration_scaling: enables hardware configuration speedup
+        Returns:
+            output_dict: dictionary of query results with NaN converted to None, None if the internal lists raised for this query
+        """
+        cell = OrderedDict((field, float(self.values[(i,) + index])) for field, i in self.field_index.items())
+        if cell['error']:
+            return None
+
+        # same operation order as Query.query so results are identical
+        if not (numerical_format_scaling and parallel_strategy_scaling and hardware_configuration_scaling):
+            try:
+                runtime = cell['base runtime']
+                runtime *= (cell['baseline tflops'] / cell['hardware (TFLOPS)']) if hardware_configuration_scaling else 1
+                runtime *= (1 / cell['numerical format speedup']) if numerical_format_scaling else 1
+                runtime *= (1 / cell['parallel strategy speedup']) if parallel_strategy_scaling else 1
+            except ZeroDivisionError:
+                runtime = float('nan')
+            cell['runtime (GPUH)'] = runtime
+
+        return OrderedDict((field, None if value != value else value) for field, value in cell.items() if field in CUBE_FIELDS[:6])
+
+    def save(self, path: str):
+        """
+        Saves the cube next to a checkpoint as a .npy array and a .yaml header of the axes
+        Args:
+            path: checkpoint path
+        """
+        values_path, header_path = cube_paths(path)
+        np.save(values_path, np.ascontiguousarray(self.values))
+        write_yaml(header_path, OrderedDict({'fields': CUBE_FIELDS, 'axes': self.axes}))
+
+def cube_paths(path: str) -> tuple[str, str]:
+    """
+    Returns the cube array and header paths stored next to a checkpoint
+    """
+    root = os.path.splitext(path)[0]
+    return root + '.cube.npy', root + '.cube.yaml'
+
+def load_cube(path: str, mmap: bool = True) -> QueryCube:
+    """
+    Loads a cube saved next to a checkpoint
+    Args:
+        path: checkpoint path
+        mmap: memory map the cube array instead of reading it into memory
+    Returns:
+        QueryCube, None if no cube was saved for the checkpoint
+    """
+    values_path, header_path = cube_paths(path)
+    if not (os.path.exists(values_path) and os.path.exists(header_path)):
+        return None
+    header = read_yaml(header_path)
+    if list(header['fields']) != CUBE_FIELDS:
+        return None
+    return QueryCube(OrderedDict((key, list(categories)) for key, categories in header['axes'].items()), np.load(values_path, mmap_mode='r' if mmap else None))
+
+def remove_cube(path: str):
+    """
+    Removes a cube saved next to a checkpoint
+    """
+    for cube_path in cube_paths(path):
+        if os.path.exists(cube_path):
+            os.remove(cube_path)
+
+def parameter_space(query_obj) -> OrderedDict:
+    """
+    Every value of each query parameter: the years between the first and last year of the data, and the categories of the internal lists (None included where it is a valid query)
+    Args:
+        query_obj: loaded Query object
+    Returns:
+        dictionary of query key to the list of its values, in QUERY_KEYS order
+    """
+    year_lower, year_upper = query_obj.get_year_bounds()
+    return OrderedDict({
+        'year': list(range(year_lower, year_upper + 1)),
+        'phase': ['inference', 'training', None],
+        'numerical_format': sorted(query_obj.numerical_format_list.numerical_format_set) + [None],
+        'parallel_strategy': list(query_obj.parallel_strategy_list.parallel_strategy_dict) + [None],
+        'optimizer': list(query_obj.optimizer_dict),
+        'chip_type': list(query_obj.hardware_comparison_list.min_year),
+    })
+
+def compile_cube(query_obj) -> QueryCube:
+    """
+    Evaluates every combination of the query parameters with Query.sweep_product
+    Args:
+        query_obj: loaded Query object
+    Returns:
+        QueryCube
+    """
+    axes = parameter_space(query_obj)
+    output_dict = query_obj.sweep_product(axes, errors='coerce')
+    unscaled_dict = query_obj.sweep_product(axes, False, False, False, errors='coerce')
+    phase = np.array(axes['phase'], dtype=object).reshape(1, -1, 1, 1, 1, 1)
+    output_dict['base runtime'] = unscaled_dict['runtime (GPUH)']
+    output_dict['baseline tflops'] = np.where(phase == 'inference', query_obj.baseline_model['inference_tflops'], query_obj.baseline_model['training_tflops'])
+
+    shape = tuple(len(categories) for categories in axes.values())
+    values = np.stack([np.broadcast_to(np.asarray(output_dict[field], dtype=float), shape) for field in CUBE_FIELDS])
+    return QueryCube(axes, values)
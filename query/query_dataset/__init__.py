@@ -0,0 +1 @@
+from .query_dataset import QueryDataset, LazyAttribute, read_dataset, read_csv_dataset, merge_configuration
\ No newline at end of file
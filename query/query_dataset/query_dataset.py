@@ -0,0 +1,183 @@
+from query.hardware_configuration import hardware_comparison
+from query.model_size import model_size
+from query.numerical_format import numerical_format
+from query.parallel_strategy import parallel_strategy
+from query.query_source.query_source import read_table_dir, read_table_file
+from query.utils.utils import replace_key_spaces, list_table_files, read_file_states, read_file_state, read_yaml, instance_lock
+from collections import OrderedDict
+import copy
+import threading
+
+class QueryDataset:
+    """
+    Parsed and cleaned csv data shared by many Query views. The dataset is immutable once loaded, each view only builds the grouping and averaging layer
+    for its own configuration, and internal lists are shared between views whose configuration they do not depend on
+    Args:
+        input_dict: cleaned dictionary of csv data keyed by sheet name
+        configuration: default configuration of the views (year_ranges, optimizers, baseline_model)
+        path: configuration path the dataset was loaded from
+        csv_path: data directory (csv, parquet or feather files) the data was read from, needed by refresh
+        file_states: (mtime, size, hash) of each table file when it was read, see read_file_states
+        list_cache: internal lists to start with, keyed like get_*_list caches them
+    """
+    def __init__(self, input_dict: OrderedDict, configuration: OrderedDict, path: str = None, csv_path: str = None, file_states: OrderedDict = None, list_cache: OrderedDict = None):
+        self.input_dict = input_dict
+        self.configuration = OrderedDict((key, configuration.get(key)) for key in ('year_ranges', 'optimizers', 'baseline_model'))
+        self.path = path
+        self.csv_path = csv_path
+        self.file_states = file_states or OrderedDict()
+        self.list_cache = OrderedDict(list_cache or {})
+        self.lock = threading.RLock()
+        self.frozen = True
+
+    def __setattr__(self, name: str, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f'QueryDataset is immutable, cannot set {name}')
+        super().__setattr__(name, value)
+
+    def get_configuration(self, configuration: OrderedDict = None) -> OrderedDict:
+        """
+        Applies configuration overrides on top of the default configuration, see merge_configuration
+        """
+        return merge_configuration(self.configuration, configuration)
+
+    def refresh(self):
+        """
+        Checks the table files for changes. Files whose mtime and size are unchanged are not read, the others are hashed, and only tables whose content changed are parsed again
+        Returns:
+            (dataset, changed): this dataset and an empty list if nothing changed, otherwise a new dataset that shares the unchanged tables and their internal lists, and the names of the changed tables
+        """
+        if self.csv_path is None:
+            raise ValueError('Dataset was not read from a csv directory and cannot be refreshed')
+        file_paths = list_table_files(self.csv_path)
+        file_states = OrderedDict((name, read_file_state(file_path, self.file_states.get(name))) for name, file_path in file_paths.items())
+        if file_states == self.file_states:
+            return self, []
+
+        changed = [name for name, state in file_states.items() if name not in self.file_states or self.file_states[name][2] != state[2]]
+        changed += [name for name in self.file_states if name not in file_states]
+        input_dict = OrderedDict(self.input_dict)
+        for name in changed:
+            input_dict.pop(name, None)
+            if name in file_paths:
+                input_dict.update(replace_key_spaces(OrderedDict({name: read_table_file(file_paths[name])})))
+        list_cache = OrderedDict((key, value) for key, value in self.list_cache.items() if key[0] not in changed)
+        return QueryDataset(input_dict, self.configuration, self.path, self.csv_path, file_states, list_cache), changed
+
+    def get_model_size_list(self, year_ranges: list[list], optimizer_dict: OrderedDict) -> model_size.ModelSizeList:
+        """
+        Model size objects only depend on the optimizers, so they are built once per optimizer set and views with other year ranges get a shallow copy
+        """
+        base_key = ('model_size', freeze(optimizer_dict))
+        key = base_key + (freeze(year_ranges),)
+        with self.lock:
+            if base_key not in self.list_cache:
+                self.list_cache[base_key] = model_size.ModelSizeList(self.input_dict['model_size'], year_ranges, optimizer_dict=optimizer_dict)
+            if key not in self.list_cache:
+                model_size_list = copy.copy(self.list_cache[base_key])
+                model_size_list.year_ranges = year_ranges
+                self.list_cache[key] = model_size_list
+            return self.list_cache[key]
+
+    def get_numerical_format_list(self, year_ranges: list[list], function: str = None) -> numerical_format.NumericalFormatList:
+        key = ('numerical_format', freeze(year_ranges), function)
+        with self.lock:
+            if key not in self.list_cache:
+                if function:
+                    self.list_cache[key] = numerical_format.NumericalFormatList(self.input_dict['numerical_format'], year_ranges, function)
+                else:
+                    self.list_cache[key] = numerical_format.NumericalFormatList(self.input_dict['numerical_format'], year_ranges)
+            return self.list_cache[key]
+
+    def get_parallel_strategy_list(self, year_ranges: list[list], function: str = None) -> parallel_strategy.ParallelStrategyList:
+        key = ('parallel_strategy', freeze(year_ranges), function)
+        with self.lock:
+            if key not in self.list_cache:
+                if function:
+                    self.list_cache[key] = parallel_strategy.ParallelStrategyList(self.input_dict['parallel_strategy'], year_ranges, function)
+                else:
+                    self.list_cache[key] = parallel_strategy.ParallelStrategyList(self.input_dict['parallel_strategy'], year_ranges)
+            return self.list_cache[key]
+
+    def get_hardware_comparison_list(self) -> hardware_comparison.HardwareComparisonList:
+        key = ('hardware_comparison',)
+        with self.lock:
+            if key not in self.list_cache:
+                self.list_cache[key] = hardware_comparison.HardwareComparisonList(self.input_dict['hardware_comparison'])
+            return self.list_cache[key]
+
+class LazyAttribute:
+    """
+    Decorator for an attribute that is built on first access. Initialization runs once per instance under the lock of that instance (see instance_lock), and the result
+    is stored in the instance dictionary, so later reads skip the descriptor entirely and the attribute pickles like a plain attribute
+    Args:
+        function: method that builds the attribute
+    """
+    def __init__(self, function):
+        self.function = function
+        self.name = function.__name__
+        self.__doc__ = function.__doc__
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+        with instance_lock(obj):
+            if self.name not in obj.__dict__:
+                obj.__dict__[self.name] = self.function(obj)
+            return obj.__dict__[self.name]
+
+def read_dataset(path: str) -> QueryDataset:
+    """
+    Parses the data directory of a configuration yaml once, its path can hold csv, parquet or feather files
+    Args:
+        path: path to a configuration yaml
+    Returns:
+        QueryDataset with the yaml configuration as its default configuration
+    """
+    configuration = read_yaml(path)['configuration']
+    return read_csv_dataset(configuration['path'], configuration, path)
+
+def read_csv_dataset(csv_path: str, configuration: OrderedDict, path: str = None) -> QueryDataset:
+    """
+    Parses a data directory of csv, parquet or feather files once (see read_table_dir), recording the state of each file so the dataset can be refreshed
+    Args:
+        csv_path: data directory
+        configuration: default configuration (year_ranges, optimizers, baseline_model)
+        path: configuration path the data directory came from
+    Returns:
+        QueryDataset
+    """
+    # file states are read first, so an edit made while reading is picked up by the next refresh
+    file_states = read_file_states(csv_path)
+    return QueryDataset(replace_key_spaces(read_table_dir(csv_path)), configuration, path, csv_path, file_states)
+
+def merge_configuration(configuration: OrderedDict, overrides: OrderedDict = None) -> OrderedDict:
+    """
+    Returns a new configuration with overrides applied, year_ranges and baseline_model are overridden per key and optimizers as a whole
+    Args:
+        configuration: base configuration
+        overrides: dictionary with any of year_ranges, optimizers and baseline_model
+    Returns:
+        merged configuration, the base configuration is not modified
+    """
+    overrides = overrides or OrderedDict()
+    for key in overrides:
+        if key not in ('year_ranges', 'optimizers', 'baseline_model'):
+            raise ValueError(f'Invalid configuration key: {key}')
+
+    merged = OrderedDict()
+    for key in ('year_ranges', 'baseline_model'):
+        merged[key] = OrderedDict(configuration.get(key) or {})
+        merged[key].update(overrides.get(key) or {})
+    merged['optimizers'] = overrides.get('optimizers') or configuration.get('optimizers')
+    return OrderedDict((key, merged[key]) for key in ('year_ranges', 'optimizers', 'baseline_model'))
+
+def freeze(value):
+    """
+    Converts nested lists and dictionaries to tuples so they can be used as a cache key
+    """
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
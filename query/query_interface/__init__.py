@@ -1 +1,2 @@
-from .query_class_list import *
\ No newline at end of file
+from .query_class_list import *
+from .year_aggregate import YearAggregate
\ No newline at end of file
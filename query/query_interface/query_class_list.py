@@ -10,21 +10,23 @@ class SubQueryList(ABC):
         """
         pass
 
-    def get_year_range_tuple(self, query_year):
+    def get_year_range_tuple(self, query_year, year_ranges: list[tuple] = None):
         """
         Grabs a year range tuple based on the query year
         Args:
             query_year: the year to query
+            year_ranges: year ranges to search, defaults to the configured year ranges
         Returns:
             year_range: the year range tuple
         """
-        if query_year < self.year_ranges[0][0]:
-            return self.year_ranges[0]
-        elif query_year > self.year_ranges[-1][1]:
-            return self.year_ranges[-1]
+        year_ranges = self.year_ranges if year_ranges is None else year_ranges
+        if query_year < year_ranges[0][0]:
+            return year_ranges[0]
+        elif query_year > year_ranges[-1][1]:
+            return year_ranges[-1]
         
-        previous_range = self.year_ranges[0]
-        for year_range in self.year_ranges:
+        previous_range = year_ranges[0]
+        for year_range in year_ranges:
             if year_range[0] <= query_year <= year_range[1]:
                 return year_range
             elif query_year < year_range[0]:
@@ -37,11 +39,13 @@ class SubQueryList(ABC):
         Calculates the average of a list, defualts to arithmatic mean
         Args:
             value_list: list of speedups
-            function: function to calculate the average
+            function: function to calculate the average, or a quantile such as 'p90' (see read_quantile)
         Returns:
             return_avg: the average of the list
         """
-        if function == 'mean':
+        if read_quantile(function) is not None:
+            return_avg = round(quantile(sorted(value_list), read_quantile(function)), 6) if value_list else None
+        elif function == 'mean':
             return_avg = round(sum(value_list) / len(value_list), 6) if value_list else None
         elif function == 'median':
             return_avg =  round(statistics.median(value_list), 6) if value_list else None
@@ -79,4 +83,38 @@ class SubQueryList(ABC):
             year_lower = year_ranges[year_range_index][0]
             year_upper = year_ranges[year_range_index][1]
 
-        return [year_lower, year_upper]
\ No newline at end of file
+        return [year_lower, year_upper]
+
+def read_quantile(function) -> float:
+    """
+    Reads a quantile average function, 'p' followed by a percentile between 0 and 100, e.g. 'p10' or 'p97.5'
+    Args:
+        function: average function name
+    Returns:
+        quantile between 0 and 1, None if function is not a quantile
+    """
+    if not isinstance(function, str) or not function.startswith('p'):
+        return None
+    try:
+        percentile = float(function[1:])
+    except ValueError:
+        return None
+    return percentile / 100 if 0 <= percentile <= 100 else None
+
+def quantile(sorted_values: list[float], q: float) -> float:
+    """
+    Linearly interpolated quantile of a sorted list, the same definition as numpy.quantile. Takes constant time since the values are already sorted
+    Args:
+        sorted_values: values in ascending order
+        q: quantile between 0 and 1
+    Returns:
+        quantile of the values, None if there are no values
+    """
+    if not sorted_values:
+        return None
+    position = q * (len(sorted_values) - 1)
+    index = int(position)
+    fraction = position - index
+    if fraction == 0:
+        return sorted_values[index]
+    return sorted_values[index] + (sorted_values[index + 1] - sorted_values[index]) * fraction
\ No newline at end of file
@@ -0,0 +1,83 @@
+from .query_class_list import read_quantile, quantile
+from query.utils.utils import instance_lock
+from collections import OrderedDict
+from itertools import accumulate
+import heapq
+import math
+import statistics
+
+class YearAggregate:
+    """
+    Prefix sums of values grouped by year, so the mean and geometric mean over any window of years take constant time.
+    The median and quantiles are taken from the values of each year, which are kept sorted and merged once per window
+    Args:
+        years: year of each value
+        values: values to aggregate
+    """
+    def __init__(self, years: list[int], values: list[float]):
+        years = [int(year) for year in years]
+        self.year_lower = min(years) if years else 0
+        self.year_upper = max(years) if years else -1
+        self.year_values = [[] for _ in range(self.year_upper - self.year_lower + 1)]
+        for year, value in zip(years, values):
+            self.year_values[year - self.year_lower].append(value)
+        for year_value_list in self.year_values:
+            year_value_list.sort()
+
+        self.count_prefix = [0] + list(accumulate(len(year_value_list) for year_value_list in self.year_values))
+        self.sum_prefix = [0.0] + list(accumulate(math.fsum(year_value_list) for year_value_list in self.year_values))
+        self.log_sum_prefix = [0.0] + list(accumulate(math.fsum(math.log(value) for value in year_value_list if value > 0) for year_value_list in self.year_values))
+        self.nonpositive_prefix = [0] + list(accumulate(sum(1 for value in year_value_list if value <= 0) for year_value_list in self.year_values))
+        self.sorted_windows = OrderedDict()
+
+    def get_bounds(self, start: float, end: float) -> tuple[int, int]:
+        """
+        Converts an inclusive window of years to a slice of the per year arrays, start and end can be -inf and inf
+        """
+        lower = max(start, self.year_lower) - self.year_lower
+        upper = min(end, self.year_upper) - self.year_lower + 1
+        lower, upper = int(math.ceil(lower)), int(math.floor(upper))
+        return lower, max(lower, upper)
+
+    def sorted_values(self, start: float, end: float) -> list[float]:
+        """
+        Values with a year in the inclusive window [start, end] in ascending order. The years of a window are merged on its first call, under the lock of
+        the aggregate, and later calls share the merged list, so it must not be modified
+        """
+        window = self.get_bounds(start, end)
+        # aggregates pickled before the windows were memoized have no sorted_windows
+        sorted_windows = self.__dict__.get('sorted_windows')
+        if sorted_windows is None or window not in sorted_windows:
+            with instance_lock(self):
+                sorted_windows = self.__dict__.setdefault('sorted_windows', OrderedDict())
+                if window not in sorted_windows:
+                    sorted_windows[window] = list(heapq.merge(*self.year_values[window[0]:window[1]]))
+        return sorted_windows[window]
+
+    def count(self, start: float, end: float) -> int:
+        lower, upper = self.get_bounds(start, end)
+        return self.count_prefix[upper] - self.count_prefix[lower]
+
+    def aggregate(self, start: float, end: float, function: str = 'mean') -> float:
+        """
+        Averages the values with a year in the inclusive window [start, end]
+        Args:
+            start: first year of the window
+            end: last year of the window
+            function: 'mean', 'median', 'geomean' or a quantile such as 'p90', anything else is treated as mean like SubQueryList.average
+        Returns:
+            average of the window, None if the window has no values
+        """
+        lower, upper = self.get_bounds(start, end)
+        count = self.count_prefix[upper] - self.count_prefix[lower]
+        if count == 0:
+            return None
+        if function == 'median':
+            return statistics.median(self.sorted_values(start, end))
+        if read_quantile(function) is not None:
+            return quantile(self.sorted_values(start, end), read_quantile(function))
+        if function == 'geomean':
+            if self.nonpositive_prefix[upper] - self.nonpositive_prefix[lower]:
+                raise statistics.StatisticsError('geometric mean requires a non-empty dataset containing positive numbers')
+            return math.exp((self.log_sum_prefix[upper] - self.log_sum_prefix[lower]) / count)
+        return (self.sum_prefix[upper] - self.sum_prefix[lower]) / count
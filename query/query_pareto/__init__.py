@@ -0,0 +1 @@
+from .query_pareto import pareto, pareto_front, read_objectives, PARETO_KEYS, PARETO_OBJECTIVES
\ No newline at end of file
@@ -0,0 +1,101 @@
+from query.utils.utils import OUTPUT_KEYS
+from collections import OrderedDict
+import numpy as np
+
+PARETO_KEYS = ['chip_type', 'numerical_format', 'parallel_strategy', 'optimizer']
+PARETO_OBJECTIVES = ['runtime (GPUH)', 'average model size (TB)']
+
+def read_objectives(objectives) -> OrderedDict:
+    """
+    Validates the objectives of a pareto search
+    Args:
+        objectives: list of output keys to minimize, or dictionary of output key to 'min' or 'max', None for PARETO_OBJECTIVES
+    Returns:
+        dictionary of output key to 'min' or 'max'
+    """
+    if objectives is None:
+        objectives = PARETO_OBJECTIVES
+    if isinstance(objectives, str):
+        objectives = [objectives]
+    if not isinstance(objectives, dict):
+        objectives = OrderedDict((objective, 'min') for objective in objectives)
+    if not objectives:
+        raise ValueError('At least one objective is required')
+    for objective, direction in objectives.items():
+        if objective not in OUTPUT_KEYS:
+            raise ValueError(f'Invalid objective: {objective}, options: {OUTPUT_KEYS}')
+        if direction not in ['min', 'max']:
+            raise ValueError(f'Invalid direction for {objective}: {direction}, options: min, max')
+    return OrderedDict(objectives)
+
+def pareto_front(values: np.ndarray) -> np.ndarray:
+    """
+    Finds the points that no other point dominates (no worse in every objective and better in at least one), all objectives are minimized.
+    The points are sorted lexicographically, so a point can only be dominated by the points before it. With two objectives the front is a running
+    minimum of the second objective, with more each point is compared against the front found so far
+    Args:
+        values: array of shape (n_points, n_objectives) without NaN
+    Returns:
+        sorted indices of the non-dominated points, duplicates of a non-dominated point are all kept
+    """
+    n_points, n_objectives = values.shape
+    if n_points == 0:
+        return np.zeros(0, dtype=int)
+    order = np.lexsort(values.T[::-1])
+    ordered = values[order]
+    if n_objectives == 1:
+        return np.sort(order[ordered[:, 0] == ordered[0, 0]])
+    if n_objectives == 2:
+        first, second = ordered[:, 0], ordered[:, 1]
+        # best second objective of the points before each point, and of the points with a strictly better first objective
+        previous_min = np.concatenate([[np.inf], np.minimum.accumulate(second)[:-1]])
+        group_start = np.searchsorted(first, first, side='left')
+        strict_min = previous_min[group_start]
+        dominated = (previous_min < second) | (strict_min <= second)
+        return np.sort(order[~dominated])
+    front = []
+    for i, point in enumerate(ordered):
+        if front:
+            candidates = ordered[front]
+            if ((candidates <= point).all(axis=1) & (candidates < point).any(axis=1)).any():
+                continue
+        front.append(i)
+    return np.sort(order[front])
+
+def pareto(query_obj, year: int, phase: str, objectives = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> 'pd.DataFrame':
+    """
+    Non-dominated configurations of a year and phase. Every chip type, numerical format, parallel strategy and, in training, optimizer combination is evaluated
+    with one sweep_product, combinations that raise or have no runtime are left out. Inference rows have no optimizer
+    Args:
+        query_obj: loaded Query object
+        year: query year
+        phase: 'inference' or 'training'
+        objectives: list of output keys to minimize, or dictionary of output key to 'min' or 'max', default runtime (GPUH) and average model size (TB)
+    Returns:
+        DataFrame of the non-dominated configurations with their outputs, sorted by the objectives
+    """
+    import pandas as pd
+    objectives = read_objectives(objectives)
+    axes = OrderedDict({
+        'year': [year],
+        'phase': [phase],
+        'chip_type': list(query_obj.hardware_comparison_list.min_year),
+        'numerical_format': sorted(query_obj.numerical_format_list.numerical_format_set),
+        'parallel_strategy': list(query_obj.parallel_strategy_list.parallel_strategy_dict),
+        # the optimizer only changes training memory, inference fronts would hold one copy of every row per optimizer
+        'optimizer': list(query_obj.optimizer_dict) if phase == 'training' else [None],
+    })
+    output_dict = query_obj.sweep_product(axes, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, errors='coerce')
+
+    shape = tuple(len(values) for values in axes.values())
+    table = OrderedDict(
+        (key, np.array(axes[key], dtype=object)[index].reshape(-1)) for key, index in zip(PARETO_KEYS, np.indices(shape)[2:])
+    )
+    for key in OUTPUT_KEYS:
+        table[key] = np.broadcast_to(np.asarray(output_dict[key], dtype=float), shape).reshape(-1)
+
+    values = np.stack([table[objective] if direction == 'min' else -table[objective] for objective, direction in objectives.items()], axis=1)
+    valid = np.flatnonzero(np.isfinite(values).all(axis=1) & np.isfinite(table['runtime (GPUH)']))
+    front = valid[pareto_front(values[valid])]
+    front = front[np.lexsort(values[front].T[::-1])]
+    return pd.DataFrame(OrderedDict((key, pd.Series(column[front], dtype=object) if key in PARETO_KEYS else column[front]) for key, column in table.items()))
@@ -0,0 +1 @@
+from .query_search import search, read_where, read_condition, top_k_order, SEARCH_OPERATORS
\ No newline at end of file
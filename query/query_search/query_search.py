@@ -0,0 +1,135 @@
+from query.query_batch import query_batch
+from query.query_cube.query_cube import parameter_space
+from query.utils.utils import QUERY_KEYS, OUTPUT_KEYS, parse_sweep_axis
+from collections import OrderedDict
+import numpy as np
+import re
+
+SEARCH_OPERATORS = OrderedDict({
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '>': np.greater,
+})
+
+def read_condition(key: str, condition) -> list[tuple]:
+    """
+    Reads the conditions on one output key
+    Args:
+        key: output key
+        condition: (operator, value) tuple, string such as '< 500', or list of them
+    Returns:
+        list of (key, operator function, value) conditions
+    """
+    if isinstance(condition, (str, tuple)):
+        condition = [condition]
+    conditions = []
+    for item in condition:
+        if isinstance(item, str):
+            match = re.fullmatch(r'\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*', item)
+            if match is None:
+                raise ValueError(f'Invalid condition for {key}: {item}, expected an operator ({list(SEARCH_OPERATORS)}) and a value')
+            item = (match.group(1), float(match.group(2)))
+        if len(item) != 2 or item[0] not in SEARCH_OPERATORS:
+            raise ValueError(f'Invalid condition for {key}: {item}, options: {list(SEARCH_OPERATORS)}')
+        conditions.append((key, SEARCH_OPERATORS[item[0]], float(item[1])))
+    return conditions
+
+def read_where(where: OrderedDict) -> tuple[OrderedDict, list[tuple]]:
+    """
+    Splits a search predicate into the query parameter values to enumerate and the conditions on the outputs
+    Args:
+        where: dictionary of query key to the accepted values (value, list, range or 'start..end' string),
+            and of output key to conditions (('<', 500), '< 500' or a list of them)
+    Returns:
+        (dictionary of query key to accepted values, list of (output key, operator function, value) conditions)
+    """
+    filters = OrderedDict()
+    conditions = []
+    for key, condition in (where or {}).items():
+        if key in QUERY_KEYS:
+            filters[key] = list(parse_sweep_axis(condition))
+        elif key in OUTPUT_KEYS:
+            conditions += read_condition(key, condition)
+        else:
+            raise ValueError(f'Invalid key: {key}, options: {QUERY_KEYS + OUTPUT_KEYS}')
+    return filters, conditions
+
+def take_axis(array, index: np.ndarray, axis: int):
+    """
+    Selects index along an axis of an array (or dictionary of arrays) that may be broadcast along it
+    """
+    return query_batch.map_output(array, lambda values: values if np.shape(values)[axis] == 1 else np.take(values, index, axis=axis))
+
+def top_k_order(values: np.ndarray, top_k: int = None) -> np.ndarray:
+    """
+    Stable ascending order of values with NaN last, only the first top_k positions are sorted when top_k is given
+    """
+    values = np.where(np.isnan(values), np.inf, values)
+    candidates = np.arange(len(values))
+    if top_k is not None and top_k < len(values):
+        # every value up to the k-th smallest is kept, so ties at the cut are resolved by position like a full stable sort
+        candidates = np.flatnonzero(values <= np.partition(values, top_k - 1)[top_k - 1])
+    order = candidates[np.argsort(values[candidates], kind='stable')]
+    return order if top_k is None else order[:top_k]
+
+def search(query_obj, where: OrderedDict = None, sort_by: str = 'runtime (GPUH)', ascending: bool = True, top_k: int = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> 'pd.DataFrame':
+    """
+    Finds the configurations of the parameter space (see query_cube.parameter_space) that satisfy a predicate. The internal lists are evaluated once per combination
+    of their own inputs, conditions on every output but the runtime are checked on those factor arrays, and parameter values that no combination can satisfy
+    are dropped before the runtime is computed over the product of the remaining values
+    Args:
+        query_obj: loaded Query object
+        where: predicate, see read_where, None matches every configuration with a runtime
+        sort_by: output key to sort by, None keeps the enumeration order
+        ascending: sort order
+        top_k: number of configurations to return, None for all
+    Returns:
+        DataFrame of the matching configurations, the query keys and the outputs
+    """
+    import pandas as pd
+    filters, conditions = read_where(where)
+    if sort_by is not None and sort_by not in OUTPUT_KEYS:
+        raise ValueError(f'Invalid sort_by: {sort_by}, options: {OUTPUT_KEYS}')
+    if top_k is not None and (not isinstance(top_k, (int, np.integer)) or top_k < 1):
+        raise ValueError('top_k must be a positive integer')
+
+    axes = parameter_space(query_obj)
+    axes.update(filters)
+    factors, error, shape = query_batch.sweep_factors(query_obj, axes, errors='coerce')
+
+    # conditions that do not involve the runtime prune the parameter values before the full product is formed
+    keep = ~error
+    factor_dict = query_batch.factor_outputs(*factors)
+    for key, operator, value in conditions:
+        if key != 'runtime (GPUH)':
+            keep = keep & operator(factor_dict[key], value)
+    keep = np.broadcast_to(keep, shape)
+    for axis in range(len(shape)):
+        index = np.flatnonzero(keep.any(axis=tuple(other for other in range(len(shape)) if other != axis)))
+        if len(index) < shape[axis]:
+            factors = tuple(take_axis(factor, index, axis) for factor in factors)
+            error = take_axis(error, index, axis)
+            keep = np.take(keep, index, axis=axis)
+            axes[QUERY_KEYS[axis]] = [axes[QUERY_KEYS[axis]][i] for i in index]
+    shape = keep.shape
+
+    output_dict = query_batch.compute_outputs(query_obj.baseline_model, *factors, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+    match = keep & ~output_dict['mask']
+    for key, operator, value in conditions:
+        match = match & operator(output_dict[key], value)
+    rows = np.flatnonzero(match)
+    if sort_by is not None:
+        rows = rows[top_k_order(output_dict[sort_by].reshape(-1)[rows] * (1 if ascending else -1), top_k)]
+    elif top_k is not None:
+        rows = rows[:top_k]
+
+    table = OrderedDict()
+    for key, index in zip(QUERY_KEYS, np.unravel_index(rows, shape)):
+        values = np.array(axes[key], dtype=object)[index]
+        table[key] = values.astype(int) if key == 'year' else pd.Series(values, dtype=object)
+    for key in OUTPUT_KEYS:
+        table[key] = output_dict[key].reshape(-1)[rows]
+    return pd.DataFrame(table)
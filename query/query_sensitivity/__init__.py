@@ -0,0 +1 @@
+from .query_sensitivity import sensitivity, SENSITIVITY_FACTORS
\ No newline at end of file
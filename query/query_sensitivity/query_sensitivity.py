@@ -0,0 +1,58 @@
+from query.query_batch import query_batch
+from query.utils.utils import validate_query_keys, read_sweep_spec
+from collections import OrderedDict
+import numpy as np
+
+SENSITIVITY_FACTORS = ['numerical_format', 'parallel_strategy', 'hardware_configuration', 'model_size']
+
+def sensitivity(query_obj, grid: OrderedDict, errors: str = 'raise') -> 'pd.DataFrame':
+    """
+    Runtime sensitivity of every grid point to each factor. The internal lists are queried once for the whole grid (see query_batch.sweep_factors),
+    and the runtime is recombined with each scaling flag turned off, and with the model size of the baseline model for model growth
+    Args:
+        query_obj: loaded Query object
+        grid: sweep spec dictionary of query key to the values of that key, see read_sweep_spec, year is required
+        errors: 'raise' to propagate errors raised by the internal lists, 'coerce' to return NaN for those grid points
+    Returns:
+        DataFrame with one row per grid point and factor: the grid keys, factor, runtime (GPUH), runtime without factor (GPUH),
+        elasticity (change of log runtime when the factor is applied, ln(runtime / runtime without factor), negative if it lowers runtime)
+        and share (fraction of the absolute elasticities of the grid point taken by the factor)
+    """
+    import pandas as pd
+    validate_query_keys(grid, 'query_sensitivity.sensitivity()')
+    axes = read_sweep_spec(grid)
+    factors, error, shape = query_batch.sweep_factors(query_obj, axes, errors)
+    phase, numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query = factors
+    baseline_model = query_obj.baseline_model
+
+    def runtime(*scaling_flags: bool, model_size_query: OrderedDict = model_size_query) -> np.ndarray:
+        output_dict = query_batch.compute_outputs(baseline_model, phase, numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query, *scaling_flags)
+        return query_batch.mask_outputs(output_dict, error, shape, errors)['runtime (GPUH)'].reshape(-1)
+
+    # a factor is removed by turning its scaling flag off, and model growth by scaling the baseline model instead of the surveyed models
+    baseline_size_query = OrderedDict(model_size_query, parameters=baseline_model['parameters'], seq_length=baseline_model['sequence_length'])
+    full_runtime = runtime(True, True, True)
+    factor_runtimes = np.stack([
+        runtime(False, True, True),
+        runtime(True, False, True),
+        runtime(True, True, False),
+        runtime(True, True, True, model_size_query=baseline_size_query),
+    ], axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        elasticity = np.log(full_runtime[:, None] / factor_runtimes)
+        share = np.abs(elasticity) / np.abs(elasticity).sum(axis=1, keepdims=True)
+
+    n_factors = len(SENSITIVITY_FACTORS)
+    point_index = np.indices(shape).reshape(len(shape), -1)
+    # categories stay object columns so None is not read as a missing value
+    table = OrderedDict(
+        (key, np.repeat(np.asarray(values)[index], n_factors) if key == 'year' else pd.Series(np.repeat(np.array(values, dtype=object)[index], n_factors), dtype=object))
+        for (key, values), index in zip(axes.items(), point_index)
+    )
+    table['factor'] = np.tile(SENSITIVITY_FACTORS, point_index.shape[1])
+    table['runtime (GPUH)'] = np.repeat(full_runtime, n_factors)
+    table['runtime without factor (GPUH)'] = factor_runtimes.reshape(-1)
+    table['elasticity'] = elasticity.reshape(-1)
+    table['share'] = share.reshape(-1)
+    return pd.DataFrame(table)
@@ -0,0 +1 @@
+from .query_simulate import simulate, simulate_group, simulate_product, bootstrap_average, lognormal_average, resample_counts, SIMULATION_METHODS
\ No newline at end of file
@@ -0,0 +1,187 @@
+from query.query_batch import query_batch
+from query.query_interface import read_quantile
+from query.utils.utils import OUTPUT_KEYS
+from collections import OrderedDict
+import numpy as np
+
+SIMULATION_METHODS = ['bootstrap', 'lognormal']
+CHUNK_SIZE = 2**16 # samples simulated at a time, bounds the memory of the resampling counts
+
+def resample_counts(rng: np.random.Generator, n_rows: int, n_samples: int) -> np.ndarray:
+    """
+    Draws n_samples bootstrap resamples of n_rows rows as the number of times each row is picked
+    Returns:
+        integer array of shape (n_rows, n_samples), every column sums to n_rows
+    """
+    rows = rng.integers(0, n_rows, (n_samples, n_rows)) * n_samples + np.arange(n_samples)[:, None]
+    return np.bincount(rows.ravel(), minlength=n_rows * n_samples).reshape(n_rows, n_samples)
+
+def enumerate_counts(n_rows: int) -> np.ndarray:
+    """
+    Row counts of every ordered resample of n_rows rows, the whole bootstrap distribution of a small group
+    Returns:
+        integer array of shape (n_rows, n_rows ** n_rows)
+    """
+    resamples = np.indices((n_rows,) * n_rows).reshape(n_rows, -1)
+    return np.stack([(resamples == row).sum(axis=0) for row in range(n_rows)])
+
+def bootstrap_average(values: np.ndarray, counts: np.ndarray, function, cumulative_counts: dict = None) -> np.ndarray:
+    """
+    Averages every bootstrap resample from its row counts, without building the resamples
+    Args:
+        values: values of the rows
+        counts: row counts of each resample, see resample_counts
+        function: 'mean', 'median', 'geomean' or a quantile such as 'p90', anything else is treated as mean like SubQueryList.average
+        cumulative_counts: cache of the cumulative counts of each row order, shared by columns resampled with the same counts
+    Returns:
+        average of each resample
+    """
+    n_rows = len(values)
+    q = 0.5 if function == 'median' else read_quantile(function)
+    if q is not None:
+        # the k-th smallest value of a resample is the first sorted row whose cumulative count exceeds k
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+        cumulative_counts = {} if cumulative_counts is None else cumulative_counts
+        if order.tobytes() not in cumulative_counts:
+            cumulative_counts[order.tobytes()] = np.cumsum(counts[order], axis=0)
+        cumulative = cumulative_counts[order.tobytes()]
+        position = q * (n_rows - 1)
+        index = int(position)
+        lower = sorted_values[(cumulative <= index).sum(axis=0)]
+        if position == index:
+            return lower
+        upper = sorted_values[(cumulative <= index + 1).sum(axis=0)]
+        return lower + (upper - lower) * (position - index)
+    if function == 'geomean':
+        if (values <= 0).any():
+            raise ValueError('geometric mean requires positive values')
+        return np.exp(np.log(values) @ counts / n_rows)
+    return values @ counts / n_rows
+
+def lognormal_average(values: np.ndarray, z: np.ndarray, function) -> np.ndarray:
+    """
+    Samples the average of the rows from a log-normal fitted to them: centred on their average, with the standard error of their logs
+    Args:
+        values: values of the rows
+        z: standard normal draws, one per sample
+        function: average function, see bootstrap_average
+    Returns:
+        sampled averages
+    """
+    average = bootstrap_average(values, np.ones((len(values), 1), dtype=int), function)[0]
+    if average == 0 and not values.any():
+        return np.zeros(len(z))
+    if (values <= 0).any():
+        raise ValueError('lognormal sampling requires positive values')
+    if len(values) < 2:
+        return np.full(len(z), average)
+    standard_error = np.std(np.log(values), ddof=1) / np.sqrt(len(values))
+    return average * np.exp(standard_error * z)
+
+def simulate_group(columns: list, n_samples: int, function, method: str, rng: np.random.Generator) -> list[np.ndarray]:
+    """
+    Samples the average of every column of one group of rows. The columns share the resampled rows (or normal draws), so fields of the same rows move together
+    Args:
+        columns: list of equal length value lists
+        n_samples: number of samples
+        function: average function, see bootstrap_average
+        method: 'bootstrap' or 'lognormal'
+        rng: NumPy random generator
+    Returns:
+        list of sampled averages, one array per column
+    """
+    columns = [np.asarray(column, dtype=float) for column in columns]
+    if method == 'bootstrap':
+        n_rows = len(columns[0])
+        cumulative_counts = {}
+        if n_rows ** n_rows <= CHUNK_SIZE:
+            # every ordered resample of a small group is averaged once, then a sample is a single draw of the resample
+            counts = enumerate_counts(n_rows)
+            resamples = rng.integers(0, counts.shape[1], n_samples)
+            return [bootstrap_average(column, counts, function, cumulative_counts)[resamples] for column in columns]
+        counts = resample_counts(rng, n_rows, n_samples)
+        return [bootstrap_average(column, counts, function, cumulative_counts) for column in columns]
+    z = rng.standard_normal(n_samples)
+    return [lognormal_average(column, z, function) for column in columns]
+
+def simulate_product(groups: list[list[float]], n_samples: int, function, method: str, rng: np.random.Generator) -> np.ndarray:
+    """
+    Samples a compounded speedup, the product of the averages of its groups, see NumericalFormatList.query_groups
+    """
+    product = np.ones(n_samples)
+    for group in groups:
+        product = product * simulate_group([group], n_samples, function, method, rng)[0]
+    return product
+
+def simulate(snapshot, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, n_samples: int = 10000, method: str = 'bootstrap', seed: int = None, confidence: float = 0.95, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> OrderedDict:
+    """
+    Propagates the sampling uncertainty of every factor of a query through the runtime and model size formulas. Each average of survey rows is resampled
+    independently (a compounded speedup resamples each of its groups), and the samples are combined with query_batch.compute_outputs
+    Args:
+        snapshot: QuerySnapshot to read the internal lists from
+        n_samples: number of samples
+        method: 'bootstrap' resamples the rows with replacement, 'lognormal' samples each average from a log-normal fitted to the rows
+        seed: seed of the random generator, None for a random seed
+        confidence: coverage of the confidence intervals
+    Returns:
+        output_dict: samples, mean, median and confidence interval dictionaries keyed like the output of Query.query
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f'Invalid method: {method}, options: {SIMULATION_METHODS}')
+    if not isinstance(n_samples, (int, np.integer)) or n_samples < 1:
+        raise ValueError('n_samples must be a positive integer')
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1')
+
+    numerical_format_list = snapshot.numerical_format_list
+    numerical_format_query = snapshot._query_numerical_format(year, numerical_format, phase)
+    if numerical_format_query is None:
+        raise ValueError('No numerical_format data for this query')
+    groups = OrderedDict({
+        'numerical_format': numerical_format_list.query_groups(year, numerical_format, phase),
+        'parallel_strategy': snapshot.parallel_strategy_list.query_groups(year, parallel_strategy, phase),
+        'model_size': snapshot.model_size_list.query_rows(year, phase, optimizer) or None,
+        'hardware_comparison': snapshot.hardware_comparison_list.query_groups(year, chip_type, numerical_format_query['activation_numerical_format']),
+    })
+    for table, table_groups in groups.items():
+        if table_groups is None:
+            raise ValueError(f'No {table} data for this query')
+    model_size_columns = [[row[field] for row in groups['model_size']] for field in ['activation_size', 'weight_size', 'optimizer_size', 'parameters', 'seq_length']]
+
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, n_samples, CHUNK_SIZE):
+        chunk_size = min(CHUNK_SIZE, n_samples - start)
+        speedup = simulate_product(groups['numerical_format'], chunk_size, numerical_format_list.function, method, rng)
+        parallel_strategy_query = simulate_product(groups['parallel_strategy'], chunk_size, snapshot.parallel_strategy_list.function, method, rng)
+        model_size_query = OrderedDict(zip(['activation_size', 'weight_size', 'optimizer_size', 'parameters', 'seq_length'], simulate_group(model_size_columns, chunk_size, snapshot.function or 'median', method, rng)))
+        hardware_comparison_query = simulate_product(groups['hardware_comparison'], chunk_size, snapshot.function or 'mean', method, rng)
+        chunks.append(query_batch.compute_outputs(
+            snapshot.baseline_model, phase, OrderedDict(numerical_format_query, speedup=speedup), parallel_strategy_query, model_size_query, hardware_comparison_query,
+            numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling
+        ))
+
+    samples = OrderedDict((key, np.concatenate([chunk[key] for chunk in chunks])) for key in OUTPUT_KEYS)
+    summaries = OrderedDict((key, summarize(values, confidence)) for key, values in samples.items())
+    return OrderedDict({
+        'samples': samples,
+        'mean': OrderedDict((key, summary[0]) for key, summary in summaries.items()),
+        'median': OrderedDict((key, summary[1]) for key, summary in summaries.items()),
+        'confidence interval': OrderedDict((key, summary[2]) for key, summary in summaries.items()),
+    })
+
+def summarize(values: np.ndarray, confidence: float) -> tuple:
+    """
+    Summarizes the finite samples (the runtime of a query without a phase has none)
+    Returns:
+        (mean, median, (low, high) confidence interval), all None if no sample is finite
+    """
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return None, None, None
+    if finite.min() == finite.max():
+        return float(finite[0]), float(finite[0]), (float(finite[0]), float(finite[0]))
+    alpha = (1 - confidence) / 2
+    median, low, high = np.quantile(finite, [0.5, alpha, 1 - alpha]).tolist()
+    return float(np.mean(finite)), median, (low, high)
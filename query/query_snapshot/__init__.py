@@ -0,0 +1 @@
+from .query_snapshot import QuerySnapshot, SNAPSHOT_LISTS, required_tables
\ No newline at end of file
@@ -0,0 +1,325 @@
+from query.query_batch import query_batch
+from query.query_cache import QueryCache
+from query.query_dataset import QueryDataset, LazyAttribute
+from query.model_size import ModelSize, get_model_max_size_arrays
+from query.utils.utils import OUTPUT_KEYS, read_statistics
+from collections import OrderedDict
+import numpy as np
+
+SNAPSHOT_LISTS = ['model_size_list', 'numerical_format_list', 'parallel_strategy_list', 'hardware_comparison_list']
+
+class QuerySnapshot:
+    """
+    Immutable state of a Query: the parsed data, its configuration, the internal lists built from them, and the query cube and result cache that belong to them.
+    Query reads everything for a query from one snapshot and publishes a new snapshot on reload with a single reference swap, so readers never wait for a reload and never see a half loaded state.
+    The data and configuration are never modified. Internal lists are built on first access, which only locks until the list exists, and the result cache is the one mutable part,
+    it locks around each lookup and update
+    Args:
+        dataset: parsed QueryDataset
+        configuration: year_ranges, optimizers and baseline_model of the snapshot
+        function: internal average function
+        cache_size: maximum number of cached query results, 0 disables caching
+        lists: internal lists that are already built, keyed by attribute name
+        query_cube: precomputed QueryCube, None if there is no cube
+        query_cache: result cache to start with, an empty cache of cache_size by default
+    """
+    def __init__(self, dataset: QueryDataset, configuration: OrderedDict, function = None, cache_size: int = 1024, lists: OrderedDict = None, query_cube = None, query_cache: QueryCache = None):
+        self.dataset = dataset
+        self.input_dict = dataset.input_dict
+        self.year_ranges_dict = configuration['year_ranges']
+        self.optimizer_dict = configuration['optimizers']
+        self.baseline_model = configuration['baseline_model']
+        self.function = function
+        self.cache_size = cache_size
+        self.query_cache = QueryCache(cache_size) if query_cache is None else query_cache
+        self.query_cube = query_cube
+        self.function_snapshots = OrderedDict()
+        self.__dict__.update(lists or {})
+        self.frozen = True
+
+    def __setattr__(self, name: str, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f'QuerySnapshot is immutable, cannot set {name}')
+        super().__setattr__(name, value)
+
+    @LazyAttribute
+    def model_size_list(self):
+        return self.dataset.get_model_size_list(self.year_ranges_dict['model_size'], self.optimizer_dict)
+
+    @LazyAttribute
+    def numerical_format_list(self):
+        return self.dataset.get_numerical_format_list(self.year_ranges_dict['numerical_format'], self.function)
+
+    @LazyAttribute
+    def parallel_strategy_list(self):
+        return self.dataset.get_parallel_strategy_list(self.year_ranges_dict['parallel_strategy'], self.function)
+
+    @LazyAttribute
+    def hardware_comparison_list(self):
+        return self.dataset.get_hardware_comparison_list()
+
+    def get_configuration(self) -> OrderedDict:
+        """
+        Returns the year ranges, optimizers and baseline model of this snapshot
+        """
+        return OrderedDict({'year_ranges': self.year_ranges_dict, 'optimizers': self.optimizer_dict, 'baseline_model': self.baseline_model})
+
+    def get_lists(self) -> OrderedDict:
+        """
+        Returns the internal lists that are already built
+        """
+        return OrderedDict((name, self.__dict__[name]) for name in SNAPSHOT_LISTS if name in self.__dict__)
+
+    def replace(self, cache_size: int = None, query_cube = None, dataset: QueryDataset = None, lists: OrderedDict = None, query_cache: QueryCache = None):
+        """
+        Returns a new snapshot with the same configuration and some of its parts replaced
+        Args:
+            cache_size: maximum number of cached query results, defaults to the cache size of this snapshot
+            query_cube: precomputed QueryCube of the new snapshot
+            dataset: dataset of the new snapshot, defaults to the dataset of this snapshot
+            lists: internal lists of the new snapshot, defaults to the lists of this snapshot that are already built
+            query_cache: result cache of the new snapshot, defaults to an empty cache
+        """
+        cache_size = self.cache_size if cache_size is None else cache_size
+        dataset = self.dataset if dataset is None else dataset
+        lists = self.get_lists() if lists is None else lists
+        return QuerySnapshot(dataset, self.get_configuration(), self.function, cache_size, lists, query_cube, query_cache)
+
+    def compute_query(self, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, year_windows: OrderedDict = None, fields: tuple = None, architecture: tuple = None) -> OrderedDict:
+        """
+        Queries each internal list and combines the results into the runtime and model size estimates returned by query.
+        With fields, only the internal lists the fields need are queried, and only the fields are returned.
+        With an architecture tuple (see read_architecture), its maximum memory replaces the model size list average
+        """
+        tables = required_tables(fields, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+        factors = self.query_factors(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, tables, year_windows, architecture)
+        return self.combine_factors(phase, *factors, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, fields)
+
+    def query_factors(self, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, tables: frozenset, year_windows: OrderedDict = None, architecture: tuple = None) -> tuple:
+        """
+        Queries the internal lists in tables (see required_tables), the others are None
+        Returns:
+            (numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query)
+        """
+        year_windows = year_windows or OrderedDict()
+        numerical_format_query = self._query_numerical_format(year, numerical_format, phase, year_windows.get('numerical_format')) if 'numerical_format' in tables else None
+        parallel_strategy_query = self._query_parallel_strategy(year, parallel_strategy, phase, year_windows.get('parallel_strategy')) if 'parallel_strategy' in tables else None
+        if architecture is not None:
+            model_size_query = self._query_architecture(phase, optimizer, architecture) if 'model_size' in tables else None
+        else:
+            model_size_query = self._query_model_size(year, phase, optimizer, year_windows.get('model_size')) if 'model_size' in tables else None
+        hardware_comparison_query = self._query_hardware_comparison(year, chip_type, numerical_format_query['activation_numerical_format']) if 'hardware_comparison' in tables else None
+        return numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query
+
+    def combine_factors(self, phase: str, numerical_format_query: OrderedDict, parallel_strategy_query: float, model_size_query: OrderedDict, hardware_comparison_query: float, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, fields: tuple = None) -> OrderedDict:
+        """
+        Combines the results of query_factors into the runtime and model size estimates returned by query
+        """
+        output_fields = fields or OUTPUT_KEYS
+
+        runtime = None
+        if 'runtime (GPUH)' in output_fields:
+            if phase == 'inference': 
+                baseline_runtime = (self.baseline_model['inference_runtime'] / (1000 * 60 * 60)) * (model_size_query['seq_length'] / self.baseline_model['sequence_length'])
+                baseline_tflops = self.baseline_model['inference_tflops']  
+            elif phase == 'training':
+                baseline_runtime = self.baseline_model['training_runtime']
+                baseline_tflops = self.baseline_model['training_tflops']
+
+            try:
+                runtime = baseline_runtime * (model_size_query['parameters'] / self.baseline_model['parameters'])
+                runtime *= (baseline_tflops / hardware_comparison_query) if hardware_configuration_scaling else 1
+                runtime *= (1 / numerical_format_query['speedup']) if numerical_format_scaling else 1
+                runtime *= (1 / parallel_strategy_query) if parallel_strategy_scaling else 1
+            except:
+                runtime = None
+
+            if not (isinstance(runtime, float) or isinstance(runtime, int)):
+                runtime = None
+
+        billion = 10**9 # Billion
+        terabyte = 2**43 # Terabyte
+        conversion = billion/terabyte 
+
+        model_size = None
+        if 'average model size (TB)' in output_fields:
+            model_size_query['activation_size'] *= numerical_format_query['activation_numerical_format'] * conversion
+            model_size_query['weight_size'] *= numerical_format_query['weight_numerical_format'] * conversion if phase == 'inference' else numerical_format_query['activation_numerical_format'] * conversion
+            model_size_query['optimizer_size'] = model_size_query['optimizer_size'] * 32 * conversion # assume optimizer is always in fp32
+            model_size = model_size_query['activation_size'] + model_size_query['weight_size'] + model_size_query['optimizer_size']
+
+        #runtime = (models_params/baseline_params) * (baseline_tflops/chip_tflops) * (1/numerical_format_speedup) * (1/parallel_strategy_speedup) * baseline_runtime
+
+        output_dict = OrderedDict({
+            'average model size (TB)': model_size,
+            'numerical format speedup': numerical_format_query['speedup'] if numerical_format_query is not None else None,
+            'parallel strategy speedup': parallel_strategy_query,
+            'hardware (TFLOPS)': hardware_comparison_query,
+            'runtime (GPUH)': runtime,
+            'parameters': model_size_query['parameters'] if model_size_query is not None else None,
+        })
+
+        if fields is not None:
+            return OrderedDict((field, output_dict[field]) for field in fields)
+        return output_dict
+
+    def compute_quantiles(self, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, quantiles: tuple = (), year_windows: OrderedDict = None, fields: tuple = None, architecture: tuple = None) -> OrderedDict:
+        """
+        Quantiles of each factor and of the runtime. A factor quantile is the factor computed with the quantile in place of the average function.
+        The runtime grows with the parameters and shrinks with every speedup and the tflops, so its p quantile combines the parameters at p with the other factors at 1 - p
+        (the comonotone runtime quantile, all factors moving together. It is not a bound on the runtime quantile of independent factors, see query_simulate for those)
+        Args:
+            quantiles: tuple of quantile names, see read_quantiles
+        Returns:
+            OrderedDict of quantile name to a dictionary keyed like the output of query
+        """
+        output_fields = fields or OUTPUT_KEYS
+        tables = required_tables(fields, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+        scaling_flags = (numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling)
+
+        quantile_dict = OrderedDict()
+        for function in quantiles:
+            lower_snapshot = self.function_snapshot(function)
+            factors = lower_snapshot.query_factors(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, tables, year_windows, architecture)
+            runtime = None
+            if 'runtime (GPUH)' in output_fields:
+                upper_snapshot = self.function_snapshot(f'p{100 - float(function[1:]):g}')
+                upper_factors = upper_snapshot.query_factors(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, tables - {'model_size'}, year_windows, architecture)
+                model_size_query = OrderedDict(factors[2]) if factors[2] is not None else None
+                runtime = self.combine_factors(phase, upper_factors[0], upper_factors[1], model_size_query, upper_factors[3], *scaling_flags, ('runtime (GPUH)',))['runtime (GPUH)']
+            quantile_dict[function] = self.combine_factors(phase, *factors, *scaling_flags, fields)
+            if 'runtime (GPUH)' in output_fields:
+                quantile_dict[function]['runtime (GPUH)'] = runtime
+        return quantile_dict
+
+    def compute_statistics(self, year: int, phase: str, numerical_format: str, parallel_strategy: str, optimizer: str, chip_type: str, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, statistics: tuple = (), year_windows: OrderedDict = None, fields: tuple = None, architecture: tuple = None) -> OrderedDict:
+        """
+        The query computed with each average function in statistics, from the same parsed data (see function_snapshot)
+        Args:
+            statistics: tuple of average functions, see read_statistics
+        Returns:
+            OrderedDict of average function to a dictionary keyed like the output of query
+        """
+        return OrderedDict(
+            (function, self.function_snapshot(function).compute_query(year, phase, numerical_format, parallel_strategy, optimizer, chip_type, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, year_windows, fields, architecture))
+            for function in statistics
+        )
+
+    def function_snapshot(self, function: str):
+        """
+        Returns a snapshot of the same data and configuration that uses another average function, such as a quantile. Its internal lists come from the dataset's list cache,
+        so the model size and hardware lists are shared and only the numerical format and parallel strategy averages are computed again.
+        Raises ValueError if function is not 'mean', 'median', 'geomean' or a quantile such as 'p90'
+        """
+        if function == self.function:
+            return self
+        snapshot = self.function_snapshots.get(function)
+        if snapshot is None:
+            # a snapshot is kept per name, so only the average functions of read_statistics are accepted, each under its canonical name
+            name, = read_statistics(function)
+            if name != function:
+                return self.function_snapshot(name)
+            with self.dataset.lock:
+                if function not in self.function_snapshots:
+                    self.function_snapshots[function] = QuerySnapshot(self.dataset, self.get_configuration(), function, 0)
+                snapshot = self.function_snapshots[function]
+        return snapshot
+
+    def query_columns(self, columns: OrderedDict, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise', architecture_columns: OrderedDict = None) -> OrderedDict:
+        """
+        query_batch over columns already encoded by query_batch.read_columns. With architecture_columns (see query_batch.read_architecture_columns),
+        the maximum memory of every row's architecture is computed in one array pass and replaces the model size list average
+        """
+        year, phase = columns['year'], columns['phase']
+        error = np.zeros(len(year[0]), dtype=bool)
+
+        def evaluate(function, encoded_columns, keys = None):
+            nonlocal error
+            output = query_batch.evaluate_factor(function, encoded_columns, keys, errors)
+            if errors == 'raise':
+                return output
+            error = error | output[1]
+            return output[0]
+
+        numerical_format_query = evaluate(self._query_numerical_format, [year, columns['numerical_format'], phase], ['speedup', 'activation_numerical_format', 'weight_numerical_format'])
+        parallel_strategy_query = evaluate(self._query_parallel_strategy, [year, columns['parallel_strategy'], phase])
+        if architecture_columns is not None:
+            optimizer = evaluate(lambda phase, optimizer: 0 if phase == 'inference' else self.optimizer_dict['adam' if optimizer is None else optimizer], [phase, columns['optimizer']])
+            model_size_query = get_model_max_size_arrays(architecture_columns, np.array(phase[1], dtype=object)[phase[0]], optimizer)
+        else:
+            model_size_query = evaluate(self._query_model_size, [year, phase, columns['optimizer']], ['activation_size', 'weight_size', 'optimizer_size', 'parameters', 'seq_length'])
+        activation_format = query_batch.encode_column(np.nan_to_num(numerical_format_query['activation_numerical_format']).astype(int))
+        hardware_comparison_query = evaluate(self._query_hardware_comparison, [year, columns['chip_type'], activation_format])
+
+        phase_codes, phase_categories = phase
+        output_dict = query_batch.compute_outputs(
+            self.baseline_model, np.array(phase_categories, dtype=object)[phase_codes], numerical_format_query, parallel_strategy_query, model_size_query, hardware_comparison_query,
+            numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling
+        )
+        if errors != 'raise':
+            for key in output_dict:
+                if key != 'mask':
+                    output_dict[key][error] = np.nan
+            output_dict['mask'] |= error
+            output_dict['error'] = error
+        return output_dict
+
+    def sweep_product(self, axes: OrderedDict, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True, errors: str = 'raise') -> OrderedDict:
+        return query_batch.sweep_product(self, axes, numerical_format_scaling, parallel_strategy_scaling, hardware_configuration_scaling, errors)
+
+    def get_year_bounds(self) -> tuple[int, int]:
+        """
+        Returns the first and last year covered by the configured year ranges and the hardware data. Queries outside of these years are clamped to them
+        """
+        year_ranges = [year_range for year_range_list in self.year_ranges_dict.values() for year_range in year_range_list]
+        year_lower = min([year_range[0] for year_range in year_ranges] + list(self.hardware_comparison_list.min_year.values()))
+        year_upper = max([year_range[1] for year_range in year_ranges] + list(self.hardware_comparison_list.max_year.values()))
+        return int(year_lower), int(year_upper)
+
+    def _query_numerical_format(self, year: int, numerical_format: str, phase: str, year_ranges: tuple = None) -> OrderedDict:
+        if year_ranges:
+            return self.numerical_format_list.query_window(year, numerical_format, phase, year_ranges)
+        return self.numerical_format_list.query(year, numerical_format, phase)
+
+    def _query_parallel_strategy(self, year: int, parallel_strategy: str, phase: str, year_ranges: tuple = None) -> float:
+        if year_ranges:
+            return self.parallel_strategy_list.query_window(year, parallel_strategy, phase, year_ranges)
+        return self.parallel_strategy_list.query(year, parallel_strategy, phase)
+
+    def _query_model_size(self, year: int, phase: str, optimizer: str, year_ranges: tuple = None) -> OrderedDict:
+        if year_ranges:
+            if self.function:
+                return self.model_size_list.query_window(year, phase, optimizer, self.function, year_ranges)
+            return self.model_size_list.query_window(year, phase, optimizer, year_ranges=year_ranges)
+        if self.function:
+            return self.model_size_list.query(year, phase, optimizer, self.function)
+        return self.model_size_list.query(year, phase, optimizer)
+
+    def _query_architecture(self, phase: str, optimizer: str, architecture: tuple) -> OrderedDict:
+        model_size_object = ModelSize(None, None, None, None, *architecture, None, None, self.optimizer_dict)
+        if phase == 'inference':
+            return OrderedDict(model_size_object.get_inference_max_memory())
+        return OrderedDict(model_size_object.get_training_max_memory('adam' if optimizer is None else optimizer))
+
+    def _query_hardware_comparison(self, year: int, chip_type: str, activation_format: int) -> float:
+        if self.function:
+            return self.hardware_comparison_list.query(year, chip_type, activation_format, self.function)
+        return self.hardware_comparison_list.query(year, chip_type, activation_format)
+
+def required_tables(fields: tuple = None, numerical_format_scaling: bool = True, parallel_strategy_scaling: bool = True, hardware_configuration_scaling: bool = True) -> frozenset:
+    """
+    Returns the data tables, and so the internal lists, that a query result with these output fields and scaling flags is computed from
+    Args:
+        fields: output keys of the query, None for every output key
+    Returns:
+        frozenset of table names ('model_size', 'numerical_format', 'parallel_strategy', 'hardware_comparison')
+    """
+    fields = fields or OUTPUT_KEYS
+    runtime_needed = 'runtime (GPUH)' in fields
+    hardware_needed = 'hardware (TFLOPS)' in fields or (runtime_needed and hardware_configuration_scaling)
+    numerical_format_needed = hardware_needed or 'numerical format speedup' in fields or 'average model size (TB)' in fields or (runtime_needed and numerical_format_scaling)
+    parallel_strategy_needed = 'parallel strategy speedup' in fields or (runtime_needed and parallel_strategy_scaling)
+    model_size_needed = runtime_needed or 'average model size (TB)' in fields or 'parameters' in fields
+
+    needed = zip(['model_size', 'numerical_format', 'parallel_strategy', 'hardware_comparison'], [model_size_needed, numerical_format_needed, parallel_strategy_needed, hardware_needed])
+    return frozenset(table for table, table_needed in needed if table_needed)
@@ -0,0 +1 @@
+from .query_solve import bisect_max, scale_parameters
\ No newline at end of file
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+import math
+
+MAX_BISECT_VALUE = 2.0**64 # upper bound of the bracket search, budgets that are never exceeded below this are unbounded
+
+def bisect_max(function, budget: float, initial_high: float = 1.0, tolerance: float = 1e-9) -> float:
+    """
+    Finds the largest x >= 0 with function(x) <= budget for a monotone increasing function. The bracket is grown by doubling and then bisected
+    Args:
+        function: monotone increasing function of x
+        budget: upper bound on function(x)
+        initial_high: first upper end of the bracket
+        tolerance: relative width of the bracket to stop at
+    Returns:
+        largest feasible x (within tolerance), None if function(0) exceeds the budget, inf if the budget is never exceeded
+    """
+    if function(0.0) > budget:
+        return None
+    low, high = 0.0, initial_high
+    while function(high) <= budget:
+        low, high = high, high * 2
+        if high > MAX_BISECT_VALUE:
+            return math.inf
+    while high - low > tolerance * high:
+        middle = (low + high) / 2
+        if function(middle) <= budget:
+            low = middle
+        else:
+            high = middle
+    return low
+
+def scale_parameters(output_dict: OrderedDict, parameters) -> OrderedDict:
+    """
+    Scales a query result to a model with a different parameter count. The runtime scales linearly with parameters in Query.query,
+    and the weight and optimizer memory is scaled by the same ratio while the activation memory of the average architecture is kept
+    Args:
+        output_dict: query result with 'runtime (GPUH)', 'average model size (TB)' and 'parameters', plus 'activation size (TB)' for the unscaled activation memory
+        parameters: parameter count (B), a float or a NumPy array
+    Returns:
+        dictionary with the scaled 'runtime (GPUH)', 'average model size (TB)' and 'parameters'
+    """
+    ratio = parameters / output_dict['parameters']
+    runtime = output_dict['runtime (GPUH)']
+    activation_size = output_dict['activation size (TB)']
+    return OrderedDict({
+        'runtime (GPUH)': runtime * ratio if runtime is not None else None,
+        'average model size (TB)': activation_size + (output_dict['average model size (TB)'] - activation_size) * ratio,
+        'parameters': parameters,
+    })
@@ -0,0 +1 @@
+from .query_source import read_table_dir, read_table_file, read_arrow_frame, convert_csv_dir, write_table, ingest_workbook, read_workbook_tables, TABLE_FORMATS, WORKBOOK_FORMATS, WORKBOOK_STATE
\ No newline at end of file
@@ -0,0 +1,167 @@
+from query.utils.utils import list_table_files, read_csv_file, read_frame_rows, read_file_state, create_dir
+from collections import OrderedDict
+import importlib
+import json
+import os
+
+TABLE_FORMATS = OrderedDict({'feather': '.feather', 'parquet': '.parquet'})
+WORKBOOK_FORMATS = OrderedDict({'csv': '.csv', **TABLE_FORMATS})
+WORKBOOK_STATE = '.workbook_state.json' # written next to the ingested tables, records the workbook they were extracted from
+
+def import_pyarrow(module: str, path: str):
+    """
+    Imports a pyarrow module when the first parquet or feather file is read or written, parquet and feather sources are optional and csv directories do not need pyarrow
+    Args:
+        module: 'feather' or 'parquet'
+        path: file that needs the module, for the error message
+    Returns:
+        pyarrow.feather or pyarrow.parquet module
+    """
+    try:
+        return importlib.import_module(f'pyarrow.{module}')
+    except ImportError:
+        raise ImportError(f'pyarrow is required to read or write {path}, install it or use csv tables') from None
+
+def read_table_dir(dir: str) -> OrderedDict:
+    """
+    Read all table files (csv, parquet or feather) in a directory, the role read_csv_dir has for csv directories
+    Args:
+        dir: path to directory
+    Returns:
+        dictionary of table name to rows, see read_table_file
+    """
+    return OrderedDict((name, read_table_file(file_path)) for name, file_path in list_table_files(dir).items())
+
+def read_table_file(path: str) -> OrderedDict:
+    """
+    Read a csv, parquet or feather (Arrow IPC, .feather or .arrow) file into cleaned rows, the same rows read_csv_file returns for the csv file
+    Args:
+        path: path to table file
+    Returns:
+        dictionary of row index to a dictionary of cleaned lower case header to value
+    """
+    if path.endswith('.csv'):
+        return read_csv_file(path)
+    return read_frame_rows(read_arrow_frame(path))
+
+def read_arrow_frame(path: str) -> 'pd.DataFrame':
+    """
+    Reads a parquet or feather file into a DataFrame. Files are memory mapped, so uncompressed feather columns are read without parsing or copying the file
+    Args:
+        path: path to a .parquet, .feather or .arrow file
+    Returns:
+        DataFrame with missing values as NaN, like pd.read_csv
+    """
+    if path.endswith('.parquet'):
+        table = import_pyarrow('parquet', path).read_table(path, memory_map=True)
+    else:
+        table = import_pyarrow('feather', path).read_table(path, memory_map=True)
+    df = table.to_pandas()
+    return df.where(df.notna(), float('nan'))
+
+def convert_csv_dir(csv_dir: str, out_dir: str, table_format: str = 'feather') -> OrderedDict:
+    """
+    Converts every csv file of a directory into a parquet or feather file with the same table name. The tables are written as pd.read_csv reads them,
+    so the converted directory is cleaned with the same rules when it is read. Feather files are written uncompressed so they can be memory mapped
+    Args:
+        csv_dir: csv directory, e.g. 'csv/'
+        out_dir: directory to write the converted files to, the path of a configuration can then point to it
+        table_format: 'feather' or 'parquet'
+    Returns:
+        dictionary of table name to converted file path
+    """
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f'Invalid table_format: {table_format}, options: {list(TABLE_FORMATS)}')
+    import pandas as pd
+    import_pyarrow(table_format, out_dir)
+    create_dir(out_dir)
+    converted = OrderedDict()
+    for file in sorted(os.listdir(csv_dir)):
+        name, extension = os.path.splitext(file)
+        if extension != '.csv':
+            continue
+        converted[name] = write_table(pd.read_csv(os.path.join(csv_dir, file)), os.path.join(out_dir, name), table_format)
+    return converted
+
+def write_table(df: 'pd.DataFrame', path: str, table_format: str) -> str:
+    """
+    Writes a DataFrame as a csv, feather (uncompressed, so it can be memory mapped) or parquet file
+    Args:
+        df: table to write
+        path: file path without extension
+        table_format: 'csv', 'feather' or 'parquet'
+    Returns:
+        written file path
+    """
+    path = path + WORKBOOK_FORMATS[table_format]
+    if table_format != 'csv':
+        import_pyarrow(table_format, path)
+    if table_format == 'csv':
+        df.to_csv(path, index=False)
+    elif table_format == 'feather':
+        df.to_feather(path, compression='uncompressed')
+    else:
+        df.to_parquet(path, index=False)
+    return path
+
+def ingest_workbook(path: str, out_dir: str, table_format: str = 'csv', force: bool = False) -> OrderedDict:
+    """
+    Extracts the survey sheets of a workbook (every sheet before 'reference') into a data directory, one table per sheet named like the csv/ files
+    (e.g. 'model size' is written to model_size.csv). The workbook is opened once and each sheet is parsed once. Each table stops at its first empty row
+    like read_sheet, and unnamed columns keep an empty header. The modification time and content hash of the workbook are saved in WORKBOOK_STATE,
+    so an unchanged workbook is not parsed again, and a workbook that was only touched is hashed but not parsed
+    Args:
+        path: path to the workbook, e.g. 'LLM survey.xlsx'
+        out_dir: data directory to write the tables to, the path of a configuration can then point to it
+        table_format: 'csv', 'feather' or 'parquet'
+        force: parse the workbook even if it did not change
+    Returns:
+        dictionary of table name to written file path
+    """
+    if table_format not in WORKBOOK_FORMATS:
+        raise ValueError(f'Invalid table_format: {table_format}, options: {list(WORKBOOK_FORMATS)}')
+    state_path = os.path.join(out_dir, WORKBOOK_STATE)
+    previous = OrderedDict()
+    if os.path.exists(state_path):
+        with open(state_path) as state_file:
+            previous = json.load(state_file, object_pairs_hook=OrderedDict)
+
+    # the workbook is only hashed when its mtime or size changed, and only parsed when its content or the requested format changed
+    same_source = previous.get('workbook') == os.path.abspath(path) and previous.get('table_format') == table_format
+    file_state = read_file_state(path, previous.get('file_state') if same_source else None)
+    tables = previous.get('tables', OrderedDict())
+    unchanged = not force and same_source and file_state[2] == previous['file_state'][2] and all(os.path.exists(table_path) for table_path in tables.values())
+    if unchanged and list(file_state) == list(previous['file_state']):
+        return tables
+    if not unchanged:
+        tables = read_workbook_tables(path, out_dir, table_format)
+        # files of an earlier ingestion in another format would be read before the new ones, see list_table_files
+        for table_path in previous.get('tables', OrderedDict()).values():
+            if table_path not in tables.values() and os.path.exists(table_path):
+                os.remove(table_path)
+
+    with open(state_path, 'w') as state_file:
+        json.dump(OrderedDict({'workbook': os.path.abspath(path), 'file_state': file_state, 'table_format': table_format, 'tables': tables}), state_file, indent=4)
+    return tables
+
+def read_workbook_tables(path: str, out_dir: str, table_format: str) -> OrderedDict:
+    """
+    Opens a workbook once and writes every sheet before 'reference' to out_dir, see ingest_workbook
+    Returns:
+        dictionary of table name to written file path
+    """
+    import pandas as pd
+    create_dir(out_dir)
+    tables = OrderedDict()
+    with pd.ExcelFile(path, engine='openpyxl') as workbook:
+        for sheet in workbook.sheet_names:
+            if sheet == 'reference':
+                break
+            df = workbook.parse(sheet)
+            empty_rows = df.isna().all(axis=1).to_numpy()
+            if empty_rows.any():
+                df = df.iloc[:int(empty_rows.argmax())]
+            df.columns = ['' if str(column).startswith('Unnamed:') else column for column in df.columns]
+            name = sheet.strip().lower().replace(' ', '_')
+            tables[name] = write_table(df, os.path.join(out_dir, name), table_format)
+    return tables
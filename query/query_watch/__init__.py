@@ -0,0 +1 @@
+from .query_watch import QueryWatcher
\ No newline at end of file
@@ -0,0 +1,37 @@
+import threading
+
+class QueryWatcher(threading.Thread):
+    """
+    Background thread that polls the csv files of a Query and reloads the ones that changed, see Query.refresh
+    Args:
+        query_obj: Query loaded from a csv directory
+        interval: seconds between polls
+        callback: called with the list of changed tables after each reload
+    """
+    def __init__(self, query_obj, interval: float = 1.0, callback = None):
+        super().__init__(daemon=True)
+        self.query_obj = query_obj
+        self.interval = interval
+        self.callback = callback
+        self.stop_event = threading.Event()
+        self.error = None
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                changed = self.query_obj.refresh()
+            except Exception as error:
+                # e.g. a csv file read while it is being written, the previous snapshot stays published and the next poll tries again
+                self.error = error
+                continue
+            self.error = None
+            if changed and self.callback:
+                self.callback(changed)
+
+    def stop(self):
+        """
+        Stops polling and waits for the thread to exit
+        """
+        self.stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
@@ -1,13 +1,92 @@
-import os, yaml, sys, re, datetime, pickle
-import pandas as pd
-from itertools import product
+import os, sys, re, datetime, pickle, json, hashlib, csv, importlib.util, contextlib, tempfile, threading, weakref
 from collections import OrderedDict
-from yamlordereddictloader import SafeDumper
-from yamlordereddictloader import SafeLoader
+# pandas and yaml are imported by the functions that use them, so importing the package and querying a checkpoint does not load them
+
+QUERY_KEYS = ['year', 'phase', 'numerical_format', 'parallel_strategy', 'optimizer', 'chip_type']
+YEAR_WINDOW_KEYS = ['model_size', 'numerical_format', 'parallel_strategy']
+OUTPUT_KEYS = ['average model size (TB)', 'numerical format speedup', 'parallel strategy speedup', 'hardware (TFLOPS)', 'runtime (GPUH)', 'parameters']
+STATISTICS = ['mean', 'median', 'geomean']
+TABLE_EXTENSIONS = ['.feather', '.arrow', '.parquet', '.csv'] # file formats of a data directory, a table saved in several formats is read from the first
+ARCHITECTURE_KEYS = ['params', 'seq_length', 'layers', 'd_model', 'd_ff', 'n_head', 'n_kv_head', 'max_kv_cache']
+CSV_FALLBACK_BYTES = 1 << 20 # csv files up to this size are parsed with the csv module instead of importing pandas
+CSV_NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'} # pd.read_csv defaults
+CSV_INT_PATTERN = re.compile(r'[+-]?\d+')
+CSV_FLOAT_PATTERN = re.compile(r'[+-]?(\d*)\.?(\d*)(?:[eE]([+-]?\d+))?')
+CSV_DEFERRED_PATTERN = re.compile(r'true|false|\s*[+-]?(inf|infinity|nan|[\d.]+([eE][+-]?\d*)?)\s*', re.IGNORECASE) # values left to pd.read_csv
 
 def read_yaml(file: str) -> OrderedDict:
+    import yaml
+    from yamlordereddictloader import SafeLoader
     return yaml.load(open(file), Loader=SafeLoader)
 
+def iter_jsonl_queries(stream) -> iter:
+    """
+    Lazily reads queries from a JSONL stream, one JSON object of query parameters per line. An optional 'key' field names the query, otherwise queries are named query_<line number>
+    Args:
+        stream: file object opened in text mode
+    Returns:
+        iterator of (key, query parameters) tuples
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        query_params_dict = json.loads(line, object_pairs_hook=OrderedDict)
+        key = query_params_dict.pop('key', f'query_{line_number}')
+        yield key, query_params_dict
+
+def iter_yaml_queries(stream) -> iter:
+    """
+    Lazily reads queries from a queries yaml stream with the yaml event parser, so only one query is held in memory at a time
+    Args:
+        stream: file object or string in the queries yaml format
+    Returns:
+        iterator of (key, value) tuples where value is a dictionary of query parameters or a path to a query yaml.
+        Raises ValueError on sequences, aliases and query parameters that are mappings
+    """
+    import yaml
+    from yamlordereddictloader import SafeLoader
+    resolver = yaml.resolver.Resolver()
+    constructor = yaml.constructor.SafeConstructor()
+
+    def construct_scalar(event):
+        tag = event.tag if event.tag not in (None, '!') else resolver.resolve(yaml.ScalarNode, event.value, event.implicit)
+        value = constructor.construct_object(yaml.ScalarNode(tag, event.value, style=event.style))
+        constructor.constructed_objects.clear() # the constructor memoizes every node it builds
+        return value
+
+    pending_keys = [] # key of each open mapping that is waiting for its value, None while a key is expected
+    query_params_dict = None
+    for event in yaml.parse(stream, Loader=SafeLoader):
+        in_queries = len(pending_keys) > 1 and pending_keys[0] == 'queries'
+        if isinstance(event, yaml.ScalarEvent):
+            value = construct_scalar(event)
+            if pending_keys[-1] is None:
+                if len(pending_keys) == 1 and value == 'query':
+                    raise ValueError('Invalid query.yaml configuration. Did you mean to call self.query() instead?')
+                pending_keys[-1] = value
+                continue
+            if in_queries and len(pending_keys) == 2:
+                yield pending_keys[1], value
+            elif in_queries and len(pending_keys) == 3:
+                query_params_dict[pending_keys[2]] = value
+            pending_keys[-1] = None
+        elif isinstance(event, yaml.MappingStartEvent):
+            if in_queries and len(pending_keys) > 2:
+                raise ValueError(f'Invalid query {pending_keys[1]}: nested mappings are not supported as query parameters in a queries yaml stream')
+            if in_queries and len(pending_keys) == 2:
+                query_params_dict = OrderedDict()
+            pending_keys.append(None)
+        elif isinstance(event, yaml.MappingEndEvent):
+            pending_keys.pop()
+            if len(pending_keys) == 2 and pending_keys[0] == 'queries':
+                yield pending_keys[1], query_params_dict
+                query_params_dict = None
+            if pending_keys:
+                pending_keys[-1] = None
+        elif isinstance(event, (yaml.SequenceStartEvent, yaml.AliasEvent)):
+            raise ValueError('Sequences and aliases are not supported in a queries yaml stream')
+
 def write_yaml(file: str, content: str) -> None:
     """
     if file exists at filepath, overwite the file, if not, create a new file
@@ -15,6 +94,8 @@ def write_yaml(file: str, content: str) -> None:
     :param content: yaml string that needs to be written to the destination file
     :return: None
     """
+    import yaml
+    from yamlordereddictloader import SafeDumper
     if os.path.exists(file):
         os.remove(file)
     create_dir(os.path.dirname(file))
@@ -95,11 +176,12 @@ def read_sheet(path: str, sheet_name: str) -> OrderedDict:
     """
     Depricated function used to read from an excel file sheet
     Args:
-        path: path to excel file
+        path: path to excel file, or an opened pd.ExcelFile
         sheet_name: name of sheet to read
     Returns:
         dictionary of sheet values
     """
+    import pandas as pd
     df = pd.read_excel(path, engine='openpyxl', sheet_name=sheet_name)
 
     sheet_dict = OrderedDict()
@@ -115,6 +197,7 @@ def read_sheet(path: str, sheet_name: str) -> OrderedDict:
     return sheet_dict
 
 def read_sheet_names(path: str) -> str:
+    import pandas as pd
     return pd.ExcelFile(path).sheet_names
 
 def read_excel(path: str) -> OrderedDict:
@@ -125,14 +208,15 @@ def read_excel(path: str) -> OrderedDict:
     Returns:
         dictionary of parameters
     """
+    import pandas as pd
     file_dict = OrderedDict()
 
-    sheets = pd.ExcelFile(path).sheet_names
-
-    for sheet in sheets:
-        if sheet == 'reference':
-            break
-        file_dict[sheet] = read_sheet(path, sheet)
+    # the workbook is opened once and every sheet is parsed from it, see query_source.ingest_workbook to extract the sheets into csv files
+    with pd.ExcelFile(path, engine='openpyxl') as workbook:
+        for sheet in workbook.sheet_names:
+            if sheet == 'reference':
+                break
+            file_dict[sheet] = read_sheet(workbook, sheet)
 
     return file_dict
 
@@ -198,20 +282,50 @@ def create_log():
 
 def create_checkpoint():
     """
-    Creates a new checkpoint file (pkl) if one does not exist
+    Creates a new checkpoint file (ckpt) if one does not exist, numbered after the checkpoints (and pkl checkpoints of earlier versions) in the directory
     """
     dir = 'checkpoints'
     if not os.path.exists(dir):
         os.makedirs(dir)
-    files = os.listdir(dir)
-    file_list = [file for file in files if os.path.isfile(os.path.join(dir, file))]
-    if file_list == []:
-        return dir + '/checkpoint_0.pkl'
+    pattern = re.compile(r'^checkpoint_(\d+)\.(ckpt|pkl)$')
+    indices = [int(match.group(1)) for match in map(pattern.match, os.listdir(dir)) if match is not None]
+    return dir + '/checkpoint_' + str(max(indices, default=-1) + 1) + '.ckpt'
 
-    pattern = re.compile(r'^checkpoint_\d+\.pkl$')
-    matching_files = [file for file in file_list if pattern.match(file)]
-    index = max([int(re.sub(r'checkpoint_', '', re.sub(r'.pkl', '', file))) for file in matching_files])
-    return dir + '/checkpoint_' + str((index) + 1) + '.pkl'
+@contextlib.contextmanager
+def atomic_write(file: str):
+    """
+    Opens a temporary file next to file for binary writing, and renames it over file once the block finishes, so readers see either the old or the new file, never a partial one.
+    The temporary file is removed if the block raises
+    Args:
+        file: path to write file
+    """
+    directory = os.path.dirname(file)
+    if directory:
+        create_dir(directory)
+    handle, temp_path = tempfile.mkstemp(dir=directory or '.', prefix='.' + os.path.basename(file) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as out_file:
+            yield out_file
+            out_file.flush()
+            os.fsync(out_file.fileno())
+        # mkstemp creates the file readable by its owner only, the written file keeps the mode of the file it replaces
+        os.chmod(temp_path, os.stat(file).st_mode & 0o777 if os.path.exists(file) else 0o644)
+        os.replace(temp_path, file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+INSTANCE_LOCKS = weakref.WeakKeyDictionary() # object to its lock, see instance_lock
+INSTANCE_LOCKS_LOCK = threading.Lock()
+
+def instance_lock(obj: object) -> threading.RLock:
+    """
+    Returns the lock of an object, created on first use. Lazily built attributes of the object (see LazyAttribute, and the aggregates of the internal lists)
+    are built under it, so different objects never wait for each other. The lock is kept outside of the object, so it is not pickled with it
+    """
+    with INSTANCE_LOCKS_LOCK:
+        return INSTANCE_LOCKS.setdefault(obj, threading.RLock())
 
 def write_pkl(content :object, file: str):
     """
@@ -220,47 +334,202 @@ def write_pkl(content :object, file: str):
         content: object to write to file
         file: path to write file
     """
-    if os.path.exists(file):
-        os.remove(file)
-    create_dir(os.path.dirname(file))
-    out_file = open(file, 'wb')
-    pickle.dump(content, out_file)
+    with atomic_write(file) as out_file:
+        pickle.dump(content, out_file)
 
 def read_pkl(file: str) -> object:
     """
-    Reads content from a pkl file
+    Reads content from a pkl file. Unpickling can run arbitrary code, only read files you trust
     Args:
         file: path to read file
     """
-    in_file = open(file, 'rb')
-    return pickle.load(in_file)
+    with open(file, 'rb') as in_file:
+        return pickle.load(in_file)
+
+def validate_query_keys(query_dict: OrderedDict, caller: str):
+    """
+    Raises a ValueError if a dictionary has a key that is not accepted by the api
+    Args:
+        query_dict: dictionary keyed by query parameter
+        caller: name of the calling function for the error message
+    """
+    for key in query_dict:
+        if key not in QUERY_KEYS:
+            raise ValueError(f'Invalid key: {key} {caller}')
+
+def read_fields(fields: list[str]) -> tuple:
+    """
+    Validates a field projection of the query output
+    Args:
+        fields: list of output keys, or None for every output key
+    Returns:
+        tuple of output keys, None if fields is None
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [fields]
+    for field in fields:
+        if field not in OUTPUT_KEYS:
+            raise ValueError(f'Invalid field: {field}')
+    return tuple(fields)
+
+def read_architecture(architecture: OrderedDict) -> tuple:
+    """
+    Validates an explicit model architecture, n_kv_head defaults to n_head and max_kv_cache defaults to 0
+    Args:
+        architecture: dictionary of architecture parameter (params, seq_length, layers, d_model, d_ff, n_head, n_kv_head, max_kv_cache) to value, params in billions
+    Returns:
+        tuple of architecture values in ARCHITECTURE_KEYS order, None if architecture is None
+    """
+    if architecture is None:
+        return None
+    for key in architecture:
+        if key not in ARCHITECTURE_KEYS:
+            raise ValueError(f'Invalid architecture key: {key}')
+    architecture = OrderedDict(architecture)
+    architecture.setdefault('n_kv_head', architecture.get('n_head'))
+    architecture.setdefault('max_kv_cache', 0)
+    for key in ARCHITECTURE_KEYS:
+        if architecture.get(key) is None:
+            raise ValueError(f'{key} is a required architecture input')
+    return tuple(architecture[key] for key in ARCHITECTURE_KEYS)
+
+def read_quantiles(quantiles) -> tuple:
+    """
+    Reads the quantiles to return with a query
+    Args:
+        quantiles: list of quantiles between 0 and 1, or of quantile names such as 'p90'
+    Returns:
+        tuple of quantile names ('p' followed by the percentile, e.g. 'p10'), None if quantiles is None
+    """
+    if quantiles is None:
+        return None
+    if isinstance(quantiles, (str, int, float)):
+        quantiles = [quantiles]
+    names = []
+    for q in quantiles:
+        if isinstance(q, str) and q.startswith('p'):
+            try:
+                q = float(q[1:]) / 100
+            except ValueError:
+                raise ValueError(f'Invalid quantile: {q}')
+        if isinstance(q, bool) or not isinstance(q, (int, float)) or not 0 <= q <= 1:
+            raise ValueError(f'Invalid quantile: {q}')
+        names.append(f'p{q * 100:g}')
+    return tuple(names)
+
+def read_statistics(statistics) -> tuple:
+    """
+    Reads the average functions to evaluate side by side with a query
+    Args:
+        statistics: list of 'mean', 'median' and 'geomean', or quantile names such as 'p90'
+    Returns:
+        tuple of average functions, None if statistics is None
+    """
+    if statistics is None:
+        return None
+    if isinstance(statistics, str):
+        statistics = [statistics]
+    names = []
+    for statistic in statistics:
+        if statistic in STATISTICS:
+            names.append(statistic)
+        elif isinstance(statistic, str) and statistic.startswith('p'):
+            names += read_quantiles(statistic)
+        else:
+            raise ValueError(f'Invalid statistic: {statistic}, options: {STATISTICS} or a quantile such as p90')
+    return tuple(names)
+
+def read_year_windows(year_windows: OrderedDict) -> OrderedDict:
+    """
+    Reads the per query year windows, each internal list accepts a single (start, end) window or a list of windows used in place of its configured year ranges
+    Args:
+        year_windows: dictionary of internal list name ('model_size', 'numerical_format', 'parallel_strategy') to year windows
+    Returns:
+        OrderedDict of internal list name to a sorted tuple of (start, end) tuples
+    """
+    windows_dict = OrderedDict()
+    for key, windows in (year_windows or {}).items():
+        if key not in YEAR_WINDOW_KEYS:
+            raise ValueError(f'Invalid year window key: {key}')
+        if len(windows) == 2 and not isinstance(windows[0], (list, tuple)):
+            windows = [windows]
+        windows = tuple(sorted((int(window[0]), int(window[1])) for window in windows))
+        for window in windows:
+            if window[0] > window[1]:
+                raise ValueError(f'Invalid year window for {key}: {window}')
+        windows_dict[key] = windows
+    return windows_dict
+
+def parse_sweep_axis(values) -> list:
+    """
+    Parses the values of one sweep axis. Lists, tuples and ranges are used as they are, a string 'start..end' is an inclusive integer range and any other value is a single value
+    Args:
+        values: axis values
+    Returns:
+        list or range of axis values
+    """
+    if isinstance(values, str) and '..' in values:
+        start, end = values.split('..')
+        return range(int(start), int(end) + 1)
+    if isinstance(values, (list, tuple, range)):
+        return values
+    return [values]
+
+def read_sweep_spec(sweep_spec) -> OrderedDict:
+    """
+    Reads a sweep spec, a dictionary of query key to the values of that key (e.g. {'year': '2017..2035', 'phase': ['inference', 'training']})
+    Args:
+        sweep_spec: sweep spec dictionary, or path to a yaml file with a sweep spec under the 'sweep' key
+    Returns:
+        dictionary of query key to a list or range of values
+    """
+    if isinstance(sweep_spec, str):
+        sweep_spec = read_yaml(sweep_spec)['sweep']
+    validate_query_keys(sweep_spec, 'utils.read_sweep_spec()')
+    return OrderedDict((key, parse_sweep_axis(values)) for key, values in sweep_spec.items())
+
+def iter_sweep_queries(sweep_spec) -> iter:
+    """
+    Lazily expands a sweep spec into every combination of its values, in the same order and with the same keys as build_test, without building the list of combinations
+    Args:
+        sweep_spec: sweep spec dictionary or path, see read_sweep_spec
+    Returns:
+        iterator of (key, query parameters) tuples
+    """
+    sweep_spec = read_sweep_spec(sweep_spec)
+    keys = list(sweep_spec)
+    for i, combination in enumerate(iter_product(list(sweep_spec.values()))):
+        yield f'query_{i+1}', OrderedDict(zip(keys, combination))
+
+def iter_product(axes: list) -> iter:
+    """
+    Same order as itertools.product, but iterates the axes in place instead of copying each one into a tuple, so ranges of any length stay lazy
+    Args:
+        axes: list of re-iterable axes (lists, tuples or ranges)
+    Returns:
+        iterator of combination tuples
+    """
+    if not axes:
+        yield ()
+        return
+    for value in axes[0]:
+        for combination in iter_product(axes[1:]):
+            yield (value,) + combination
 
 def build_test(test_dict: OrderedDict, path: str = 'example_queries/test.yaml'):
     """
     Builds a test yaml file from a dictionary of test parameters
     Args:
-        test_dict: dictionary of test parameters
+        test_dict: dictionary of test parameters, axis values can be anything accepted by read_sweep_spec
         path: path to write yaml file
     """
-    key_options = ['year', 'phase', 'numerical_format', 'parallel_strategy', 'optimizer', 'chip_type']
-
     # Validate keys
-    for key in test_dict:
-        if key not in key_options:
-            raise ValueError(f'Invalid key: {key} utils.build_test()')
-
-    # Generate all combinations
-    keys = test_dict.keys()
-    values = test_dict.values()
-    combinations = list(product(*values))
-
-    # Create queries dictionary
-    queries = OrderedDict({'queries': OrderedDict()})
-    for i, combination in enumerate(combinations):
-        query_dict = OrderedDict()
-        for key, value in zip(keys, combination):
-            query_dict[key] = value
-        queries['queries'][f'query_{i+1}'] = query_dict
+    validate_query_keys(test_dict, 'utils.build_test()')
+
+    # Create queries dictionary from every combination
+    queries = OrderedDict({'queries': OrderedDict(iter_sweep_queries(test_dict))})
 
     # Write to yaml file
     write_yaml(path, queries)
@@ -271,27 +540,186 @@ def read_csv_dir(dir: str) -> OrderedDict:
     Args:
         dir: path to directory
     Returns:
-        dictionary of csv contents
+        dictionary of table name (file name without .csv) to rows, see read_csv_file
     """
     files = os.listdir(dir)
     file_list = [file for file in files if os.path.isfile(os.path.join(dir, file)) and file.endswith('.csv')]
-    
-    csv_dict = OrderedDict()
+    return OrderedDict((os.path.splitext(file)[0], read_csv_file(os.path.join(dir, file))) for file in file_list)
 
-    for file in file_list:
-        df = pd.read_csv(os.path.join(dir, file))
-        sub_dict = OrderedDict({})
+def list_table_files(dir: str) -> OrderedDict:
+    """
+    Lists the table files (csv, parquet or feather) in a directory
+    Args:
+        dir: path to directory
+    Returns:
+        dictionary of table name (file name without extension) to file path, a table saved in several formats maps to the first format in TABLE_EXTENSIONS
+    """
+    table_files = OrderedDict()
+    for file in os.listdir(dir):
+        name, extension = os.path.splitext(file)
+        if extension not in TABLE_EXTENSIONS or not os.path.isfile(os.path.join(dir, file)):
+            continue
+        if name not in table_files or TABLE_EXTENSIONS.index(extension) < TABLE_EXTENSIONS.index(os.path.splitext(table_files[name])[1]):
+            table_files[name] = os.path.join(dir, file)
+    return table_files
 
-        for index, row in df.iterrows():
-            if row.isna().all():
-                break
-            if index not in sub_dict:
-                sub_dict[index] = OrderedDict()
-            for header in df.columns:
-                header_lower = header.lower()
-                if 'Unnamed' in header:
-                    continue
-                if header_lower not in sub_dict[index]:
-                    sub_dict[index][header_lower] = row[header].lower() if isinstance(row[header], str) else row[header]
-        csv_dict[file.strip('.csv')] = sub_dict
-    return csv_dict
\ No newline at end of file
+def read_csv_file(path: str) -> OrderedDict:
+    """
+    Read a csv file into a dictionary of rows, reading stops at the first empty row. Headers are cleaned once per file (see clean_headers) and string
+    columns are lower cased once per column instead of once per row, but each row is still built as its own dictionary, the form the internal lists are built from
+    Args:
+        path: path to csv file
+    Returns:
+        dictionary of row index to a dictionary of cleaned lower case header to value, the rows clean_dictionary_keys would produce.
+        Small files, and every file when pandas is not installed, are read by read_csv_rows
+    """
+    pandas_installed = importlib.util.find_spec('pandas') is not None
+    if not pandas_installed or os.path.getsize(path) <= CSV_FALLBACK_BYTES:
+        rows = read_csv_rows(path, exact=pandas_installed)
+        if rows is not None:
+            return rows
+    import pandas as pd
+    return read_frame_rows(pd.read_csv(path))
+
+def read_csv_rows(path: str, exact: bool = True) -> OrderedDict:
+    """
+    Reads a csv file of string, int and float columns with the csv module into the rows read_csv_file returns, typed like pd.read_csv types them.
+    Files it cannot read row for row and type for type like read_frame_rows(pd.read_csv(path)) are left to pandas, see tests/test_csv_fallback.py
+    Args:
+        path: path to csv file
+        exact: only parse floats that pd.read_csv rounds the same way as float(), False to parse every float when pandas is not installed
+    Returns:
+        dictionary of row index to a dictionary of cleaned lower case header to value, None when the file needs pd.read_csv
+        (no string column, duplicated headers, rows longer than the header, or values other than strings, ints, floats and missing values, see read_csv_column)
+    """
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        lines = [line for line in csv.reader(file) if len(line) > 1 or line and line[0].strip()] # pd.read_csv skips blank lines
+    if not lines:
+        return None
+    headers = [header or f'Unnamed: {position}' for position, header in enumerate(lines[0])]
+    lines = lines[1:]
+    if len(set(headers)) < len(headers) or any(len(line) > len(headers) for line in lines):
+        return None
+
+    columns = []
+    for position in range(len(headers)):
+        column = read_csv_column([line[position] if position < len(line) else '' for line in lines], exact)
+        if column is None:
+            return None
+        columns.append(column)
+    # without a string column the values are interleaved into a numpy array and would not keep their python types
+    if not any(is_string for is_string, values in columns):
+        return None
+
+    keys = clean_headers(headers)
+    rows = OrderedDict()
+    for index, row in enumerate(zip(*(values for is_string, values in columns))):
+        if all(value != value for value in row):
+            break
+        rows[index] = OrderedDict((key, row[position]) for key, position in keys.items())
+    return rows
+
+def read_csv_column(tokens: list[str], exact: bool = True) -> tuple:
+    """
+    Reads a csv column of strings, ints or floats with missing values, with the types pd.read_csv infers for them. Booleans, inf and nan spellings
+    and numbers float() does not round like pd.read_csv are left to pd.read_csv
+    Args:
+        tokens: raw values of the column
+        exact: see read_csv_rows
+    Returns:
+        (True if the column is a string column, list of values with NaN for missing values), None if the column needs pd.read_csv
+    """
+    nan = float('nan')
+    present = [token for token in tokens if token not in CSV_NA_VALUES]
+    kinds = set()
+    for token in present:
+        if CSV_INT_PATTERN.fullmatch(token):
+            kinds.add('int')
+        elif read_csv_float(token, exact) is not None:
+            kinds.add('float')
+        elif CSV_DEFERRED_PATTERN.fullmatch(token):
+            kinds.add(None)
+        else:
+            kinds.add('string')
+
+    if 'string' in kinds:
+        return True, [nan if token in CSV_NA_VALUES else token.lower() for token in tokens]
+    if None in kinds:
+        return None
+    if kinds == {'int'} and len(present) == len(tokens):
+        values = [int(token) for token in tokens]
+        return None if any(not -2 ** 63 <= value < 2 ** 63 for value in values) else (False, values)
+    values = [nan if token in CSV_NA_VALUES else read_csv_float(token, exact) for token in tokens]
+    return None if any(value is None for value in values) else (False, values)
+
+def read_csv_float(token: str, exact: bool = True) -> float:
+    """
+    Parses a csv number, exact limits it to at most 15 digits and a power of ten of at most 22, where pd.read_csv and float() round the same way
+    Returns:
+        float value, None if the token is not parsed
+    """
+    match = CSV_FLOAT_PATTERN.fullmatch(token)
+    if match is None or not (match.group(1) or match.group(2)):
+        return None
+    digits, decimals = len(match.group(1)) + len(match.group(2)), len(match.group(2))
+    if exact and (digits > 15 or abs(int(match.group(3) or 0) - decimals) > 22):
+        return None
+    return float(token)
+
+def read_frame_rows(df: 'pd.DataFrame') -> OrderedDict:
+    """
+    Converts a table read from a csv, parquet or feather file into cleaned rows, see read_csv_file
+    """
+    import pandas as pd
+    empty_rows = df.isna().all(axis=1).to_numpy()
+    if empty_rows.any():
+        df = df.iloc[:int(empty_rows.argmax())]
+
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'mixed', 'mixed-integer'):
+            lowered = values.str.lower()
+            df.isetitem(position, lowered.where(lowered.notna(), values))
+
+    # values are interleaved over every column like iterrows, so each cell keeps the type it had when rows were read one at a time
+    keys = clean_headers(list(df.columns))
+    values = df.to_numpy()[:, list(keys.values())]
+    return OrderedDict((index, OrderedDict(zip(keys, row))) for index, row in enumerate(values))
+
+def clean_headers(headers: list[str]) -> OrderedDict:
+    """
+    Cleans the headers of a csv file once, the same way clean_dictionary_keys cleans the keys of every row
+    Args:
+        headers: csv headers
+    Returns:
+        dictionary of cleaned header to the position of its column, in the key order of a cleaned row
+    """
+    header_dict = OrderedDict()
+    for position, header in enumerate(headers):
+        if 'Unnamed' in header or header.lower() in header_dict:
+            continue
+        header_dict[header.lower()] = position
+    return remove_parenthesis(remove_unnamed_keys(replace_key_spaces(header_dict)))
+
+def read_file_states(dir: str) -> OrderedDict:
+    """
+    Records the modification time, size and content hash of each table file in a directory, used to detect edited files
+    Args:
+        dir: path to directory
+    Returns:
+        dictionary of table name to (mtime in ns, size, sha256 hex digest)
+    """
+    return OrderedDict((name, read_file_state(file_path)) for name, file_path in list_table_files(dir).items())
+
+def read_file_state(path: str, previous_state: tuple = None) -> tuple:
+    """
+    Returns the (mtime in ns, size, sha256 hex digest) of a file. The file is only hashed when its mtime or size differ from previous_state
+    """
+    stat = os.stat(path)
+    if previous_state is not None and tuple(previous_state[:2]) == (stat.st_mtime_ns, stat.st_size):
+        return tuple(previous_state)
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as in_file:
+        for block in iter(lambda: in_file.read(1 << 20), b''):
+            file_hash.update(block)
+    return (stat.st_mtime_ns, stat.st_size, file_hash.hexdigest())
\ No newline at end of file
@@ -146,10 +146,8 @@ def plot_multiple(data_list, title="Model Size Trends", filename="combined_plot"
                 dpi=300, bbox_inches='tight')
     plt.close()
 
-def query_function(plot_dict: OrderedDict, function):
-    query_obj = query_api.Query('configurations/example_configuration.yaml', verbose = False, function=function)
-
-    year_query_function = 'year_query_' + function
+def query_functions(plot_dict: OrderedDict, functions: list[str]):
+    query_obj = query_api.Query('configurations/example_configuration.yaml', verbose = False, statistics=functions)
 
     queries_dict = OrderedDict({
         'queries': OrderedDict({})
@@ -161,12 +159,15 @@ def query_function(plot_dict: OrderedDict, function):
         queries_dict['queries'][average_year] = OrderedDict({
             'year': average_year,
         })
-        plot_dict[year_query_function][str(sum(year_range) / 2)] = None
+        for function in functions:
+            plot_dict['year_query_' + function][str(sum(year_range) / 2)] = None
 
     queries = query_obj.queries(queries_dict = queries_dict, log = False)
 
-    for year_key in plot_dict[year_query_function].keys():
-        plot_dict[year_query_function][year_key] = queries['queries'][int(float(year_key))]['parameters']
+    for function in functions:
+        year_query_function = 'year_query_' + function
+        for year_key in plot_dict[year_query_function].keys():
+            plot_dict[year_query_function][year_key] = queries['queries'][int(float(year_key))]['statistics'][function]['parameters']
     return plot_dict
 
 plot_dict = OrderedDict({
@@ -195,9 +196,7 @@ for index, row in model_size_df.iterrows():
 
 for year in plot_dict['average_year']:
     plot_dict['average_year'][year] = sum(plot_dict['average_year'][year]) / len(plot_dict['average_year'][year])
-plot_dict = query_function(plot_dict, 'mean')
-plot_dict = query_function(plot_dict, 'median')
-plot_dict = query_function(plot_dict, 'geomean')
+plot_dict = query_functions(plot_dict, ['mean', 'median', 'geomean'])
 
 plot_multiple([
     ('Raw Data', plot_dict['raw_data']),
@@ -21,7 +21,10 @@ def prev_parameter(param, param_options):
                 return None
             return param_options[i - 1]
 
-def validation(function, numerical_format_row, parallel_strategy_row):
+def function_results(queries: OrderedDict, function: str) -> OrderedDict:
+    return OrderedDict({'queries': OrderedDict((key, result['statistics'][function]) for key, result in queries['queries'].items())})
+
+def validation(query_object, function, numerical_format_row, parallel_strategy_row):
     nf_year = numerical_format_row['Year']
     ps_year = parallel_strategy_row['Year']
     numerical_format = numerical_format_row['Numerical Format']
@@ -84,10 +87,8 @@ def validation(function, numerical_format_row, parallel_strategy_row):
     nf_queries['queries'] = OrderedDict({k: v for k, v in nf_queries['queries'].items() if v is not None})
     ps_queries['queries'] = OrderedDict({k: v for k, v in ps_queries['queries'].items() if v is not None})
 
-    query_object = query_api.Query('configurations/example_configuration.yaml', function=function)
-
-    nf_queries = query_object.queries(queries_dict = nf_queries)
-    ps_queries = query_object.queries(queries_dict = ps_queries)
+    nf_queries = function_results(query_object.queries(queries_dict = nf_queries), function)
+    ps_queries = function_results(query_object.queries(queries_dict = ps_queries), function)
 
     nf_year_speedup = nf_speedup * (nf_queries['queries']['prev_query_1']['numerical format speedup'] if 'prev_query_1' in nf_queries['queries'] else 1)
     nf_speedup *= nf_queries['queries']['prev_query_2']['numerical format speedup'] if 'prev_query_2' in nf_queries['queries'] else 1
@@ -151,18 +152,21 @@ parallel_strategy_df = pd.read_csv('csv/parallel_strategy.csv')
 
 nf_ps_csv = pd.DataFrame(columns=['function', 'percent_error', 'standard_deviation', 'average_error'])
 
+# one Query evaluates every function from the same parsed csv data
+query_object = query_api.Query('configurations/example_configuration.yaml', statistics=['mean', 'median', 'geomean'])
+
 for function in ['mean', 'median', 'geomean']:
     nf_csv = pd.DataFrame(columns=['nf_speedup', 'nf_query_speedup', 'year_speedup', 'year_query_speedup', 'nf_pe', 'year_pe'])
     ps_csv = pd.DataFrame(columns=['ps_speedup', 'ps_query_speedup', 'year_speedup', 'year_query_speedup', 'ps_pe', 'year_pe'])
 
     # Process numerical format rows
     for _, nf_row in numerical_format_df.iterrows():
-        nf_dict, _ = validation(function, nf_row, parallel_strategy_df.iloc[0])  # Use any PS row as it won't affect NF results
+        nf_dict, _ = validation(query_object, function, nf_row, parallel_strategy_df.iloc[0])  # Use any PS row as it won't affect NF results
         nf_csv = pd.concat([nf_csv, pd.DataFrame([nf_dict])], ignore_index=True)
     
     # Process parallel strategy rows
     for _, ps_row in parallel_strategy_df.iterrows():
-        _, ps_dict = validation(function, numerical_format_df.iloc[0], ps_row)  # Use any NF row as it won't affect PS results
+        _, ps_dict = validation(query_object, function, numerical_format_df.iloc[0], ps_row)  # Use any NF row as it won't affect PS results
         ps_csv = pd.concat([ps_csv, pd.DataFrame([ps_dict])], ignore_index=True)
 
     nf_average_pe = nf_csv['nf_pe'].mean()
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from query.query_api import Query
+import subprocess
+import statistics
+import tempfile
+import time
+import json
+import sys
+import os
+
+# cold start budgets in seconds, from launching a fresh interpreter in the repository root until it exits. Each scenario took about 0.3s on a single core,
+# an interpreter that only imports pandas takes about 0.7s
+STARTUP_BUDGETS = OrderedDict({'import': 0.5, 'checkpoint query': 0.6, 'yaml query': 0.6})
+DEFERRED_MODULES = ['pandas', 'yaml', 'pyarrow']
+QUERY = OrderedDict({'year': 2020, 'phase': 'training', 'numerical_format': '32-16', 'parallel_strategy': 'pipeline', 'optimizer': 'adam', 'chip_type': 'gpu'})
+REPEATS = 5
+
+SCENARIOS = OrderedDict({
+    'import': ("from query.query_api import Query", DEFERRED_MODULES),
+    'checkpoint query': ("from query.query_api import Query\nQuery({checkpoint!r}).query(query_dict={query!r})", DEFERRED_MODULES),
+    'yaml query': ("from query.query_api import Query\nQuery('configurations/example_configuration.yaml').query(query_dict={query!r})", ['pandas', 'pyarrow']),
+})
+
+def run_scenario(code: str) -> tuple[float, list[str]]:
+    """
+    Runs code in a fresh interpreter
+    Returns:
+        (seconds from launching the interpreter until it exits, deferred modules that were imported)
+    """
+    script = f"import sys, json\n{code}\nprint(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(output.strip().splitlines()[-1])
+
+with tempfile.TemporaryDirectory() as directory:
+    checkpoint = Query('configurations/example_configuration.yaml').save_pkl(os.path.join(directory, 'checkpoint.ckpt'))
+
+    failures = []
+    for name, (code, absent) in SCENARIOS.items():
+        runs = [run_scenario(code.format(checkpoint=checkpoint, query=dict(QUERY))) for _ in range(REPEATS)]
+        elapsed = statistics.median(seconds for seconds, loaded in runs)
+        loaded = sorted(set(module for seconds, loaded in runs for module in loaded if module in absent))
+        print(f'{name}: {elapsed:.3f}s (budget {STARTUP_BUDGETS[name]:.3f}s)' + (f', imported {loaded}' if loaded else ''))
+        if elapsed > STARTUP_BUDGETS[name]:
+            failures.append(f'{name} took {elapsed:.3f}s, budget {STARTUP_BUDGETS[name]:.3f}s')
+        if loaded:
+            failures.append(f'{name} imported {loaded}')
+
+if failures:
+    print('startup regression: ' + '; '.join(failures))
+    sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,84 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+from query.utils.utils import read_yaml
+from collections import OrderedDict
+import numpy as np
+import itertools
+import pytest
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIGURATION_PATH = os.path.join(ROOT, 'configurations', 'example_configuration.yaml')
+CSV_PATH = os.path.join(ROOT, 'csv')
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    # queries and checkpoints write run logs to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture(scope='session')
+def configuration():
+    return read_yaml(CONFIGURATION_PATH)['configuration']
+
+@pytest.fixture(scope='session')
+def dataset(configuration):
+    return read_csv_dataset(CSV_PATH, configuration, CONFIGURATION_PATH)
+
+@pytest.fixture
+def query_obj(dataset):
+    return Query(dataset)
+
+@pytest.fixture(scope='session')
+def root():
+    return ROOT
+
+@pytest.fixture(scope='session')
+def csv_path():
+    return CSV_PATH
+
+def pytest_generate_tests(metafunc):
+    # tests that take csv_file run once per survey csv file
+    if 'csv_file' in metafunc.fixturenames:
+        metafunc.parametrize('csv_file', sorted(file for file in os.listdir(CSV_PATH) if file.endswith('.csv')))
+
+@pytest.fixture(scope='session')
+def assert_same_rows():
+    def assert_same_rows(rows: dict, expected: dict):
+        # row for row and type for type, NaN compares equal to NaN
+        assert list(rows) == list(expected)
+        for index, row in rows.items():
+            assert list(row) == list(expected[index])
+            for key, value in row.items():
+                assert type(value) is type(expected[index][key]), (index, key, value, expected[index][key])
+                assert value == expected[index][key] or value != value and expected[index][key] != expected[index][key], (index, key)
+    return assert_same_rows
+
+GRID = OrderedDict({
+    'year': [2016, 2020, 2024],
+    'phase': ['inference', 'training', None],
+    'numerical_format': ['32-16', None],
+    'parallel_strategy': ['pipeline', None],
+    'optimizer': ['sgd', 'adam', None],
+    'chip_type': ['gpu', 'wse', None],
+})
+
+@pytest.fixture
+def grid():
+    return OrderedDict((key, list(values)) for key, values in GRID.items())
+
+@pytest.fixture
+def grid_rows(grid):
+    # every combination of the grid, in the order of sweep_product
+    return [OrderedDict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+@pytest.fixture(scope='session')
+def assert_same_output():
+    def assert_same_output(output_dict: OrderedDict, arrays: OrderedDict, position):
+        # arrays hold NaN where query returns None
+        for key, value in output_dict.items():
+            if value is None:
+                assert np.isnan(arrays[key][position]), key
+            else:
+                assert np.isclose(arrays[key][position], value, rtol=1e-12, atol=0), key
+    return assert_same_output
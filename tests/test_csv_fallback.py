@@ -0,0 +1,40 @@
+from query.utils.utils import read_csv_rows, read_frame_rows
+import pandas as pd
+import pytest
+import os
+
+EDGE_CASES = {
+    'missing values': 'Name,Count,Ratio\nA,1,0.5\nb,,NA\nC,3,\n',
+    'int and float': 'Name,Value\na,1\nb,2.5\nc,1e3\nd,-.5\n',
+    'bool column': 'Name,Flag,Other\na,True,true\nb,FALSE,false\n',
+    'bool column with missing values': 'Name,Flag\na,True\nb,\n',
+    'mixed column': 'Name,Value\na,1\nb,x\nc,\n',
+    'empty row': 'Name,Value\na,1\n,\nb,2\n',
+    'blank line': 'Name,Value\na,1\n\nb,2\n',
+    'unnamed and parenthesis headers': 'Name,,Size (TB),Chip Type\na,1,2.0,GPU\nb,3,4.5,TPU\n',
+    'short rows': 'Name,Value,Other\na,1\nb,2,x\n',
+    'large and precise numbers': 'Name,Big,Precise\na,12345678901234567890,0.1234567890123456789\n',
+    'inf and nan spellings': 'Name,Value\na,inf\nb,-Infinity\nc,NaN\n',
+    'no string column': 'Value,Other\n1,2\n3,4\n',
+    'duplicated headers': 'Name,Value,Value\na,1,2\n',
+}
+# cases read_csv_rows leaves to pd.read_csv, it only reads string, int and float columns
+DEFERRED_CASES = ['bool column', 'bool column with missing values', 'large and precise numbers', 'inf and nan spellings', 'no string column', 'duplicated headers']
+
+def test_survey_csv_files_match_pandas(csv_file, csv_path, assert_same_rows):
+    path = os.path.join(csv_path, csv_file)
+    rows = read_csv_rows(path)
+    # the survey tables are small enough to always be read without pandas
+    assert rows is not None
+    assert_same_rows(rows, read_frame_rows(pd.read_csv(path)))
+
+@pytest.mark.parametrize('case', list(EDGE_CASES))
+def test_edge_cases_match_pandas(case, work_dir, assert_same_rows):
+    path = str(work_dir / 'table.csv')
+    with open(path, 'w') as file:
+        file.write(EDGE_CASES[case])
+    rows = read_csv_rows(path)
+    if case in DEFERRED_CASES:
+        assert rows is None
+    else:
+        assert_same_rows(rows, read_frame_rows(pd.read_csv(path)))
@@ -0,0 +1,42 @@
+from query.query_api import Query
+from query.query_dataset import LazyAttribute, read_csv_dataset
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+class Counter:
+    def __init__(self, started: threading.Event = None, release: threading.Event = None):
+        self.calls = 0
+        self.started = started
+        self.release = release
+
+    @LazyAttribute
+    def value(self):
+        self.calls += 1
+        if self.started is not None:
+            self.started.set()
+            assert self.release.wait(5)
+        return self.calls
+
+def test_built_once_per_instance():
+    counter = Counter()
+    with ThreadPoolExecutor(8) as executor:
+        values = list(executor.map(lambda _: counter.value, range(64)))
+    assert values == [1] * 64 and counter.calls == 1
+    assert 'value' in counter.__dict__
+
+def test_instances_do_not_wait_for_each_other():
+    started, release = threading.Event(), threading.Event()
+    slow = Counter(started, release)
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(lambda: slow.value)
+        assert started.wait(5)
+        # the slow instance holds its own lock, another instance is built meanwhile
+        assert Counter().value == 1
+        release.set()
+        assert future.result() == 1
+
+def test_queries_only_build_the_lists_they_need(configuration, query_obj, csv_path):
+    lazy = Query(read_csv_dataset(csv_path, configuration))
+    query_dict = {'year': 2022, 'phase': 'training'}
+    assert lazy.query(query_dict=dict(query_dict), fields=['parameters'])['parameters'] == query_obj.query(query_dict=dict(query_dict))['parameters']
+    assert [name for name in lazy.snapshot.__dict__ if name.endswith('_list')] == ['model_size_list']
@@ -0,0 +1,26 @@
+import pytest
+
+LLAMA = {'params': 70, 'seq_length': 4096, 'layers': 80, 'd_model': 8192, 'd_ff': 28672, 'n_head': 64, 'n_kv_head': 8}
+ARCHITECTURES = [LLAMA, dict(LLAMA, n_kv_head=64), {'params': 7, 'seq_length': 2048, 'layers': 32, 'd_model': 4096, 'd_ff': 11008, 'n_head': 32, 'max_kv_cache': 4096}]
+
+@pytest.mark.parametrize('phase', ['inference', 'training'])
+def test_architecture_columns_match_architecture_queries(query_obj, phase, assert_same_output):
+    columns = {'year': [2023] * len(ARCHITECTURES), 'phase': [phase] * len(ARCHITECTURES)}
+    for key in ('params', 'seq_length', 'layers', 'd_model', 'd_ff', 'n_head', 'n_kv_head', 'max_kv_cache'):
+        columns[key] = [architecture.get(key, architecture['n_head'] if key == 'n_kv_head' else 0) for architecture in ARCHITECTURES]
+    output_dict = query_obj.query_batch(columns)
+    for position, architecture in enumerate(ARCHITECTURES):
+        assert_same_output(query_obj.query(query_dict={'year': 2023, 'phase': phase}, architecture=architecture), output_dict, position)
+
+def test_architecture_replaces_the_average_model(query_obj):
+    query_dict = {'year': 2023, 'phase': 'inference'}
+    average = query_obj.query(query_dict=dict(query_dict))
+    result = query_obj.query(query_dict=dict(query_dict), architecture=LLAMA)
+    assert result['average model size (TB)'] != average['average model size (TB)']
+    assert result['average model size (TB)'] < query_obj.query(query_dict=dict(query_dict), architecture=dict(LLAMA, params=140))['average model size (TB)']
+
+def test_architecture_is_validated(query_obj):
+    with pytest.raises(ValueError):
+        query_obj.query(query_dict={'year': 2023}, architecture=dict(LLAMA, experts=8))
+    with pytest.raises(ValueError):
+        query_obj.query(query_dict={'year': 2023}, architecture={'params': 70})
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+def test_query_batch_matches_query(query_obj, grid_rows, assert_same_output):
+    rows = grid_rows
+    output_dict = query_obj.query_batch({key: [row[key] for row in rows] for key in rows[0]})
+    for position, row in enumerate(rows):
+        result = query_obj.query(query_dict=dict(row))
+        assert_same_output(result, output_dict, position)
+        assert output_dict['mask'][position] == (result['runtime (GPUH)'] is None)
+
+def test_query_batch_coerces_errors(query_obj):
+    # query raises a KeyError for an unknown optimizer
+    output_dict = query_obj.query_batch({'year': [2020, 2020], 'phase': ['training', 'training'], 'optimizer': ['adam', 'not an optimizer']}, errors='coerce')
+    assert output_dict['error'].tolist() == [False, True]
+    assert np.isnan(output_dict['runtime (GPUH)'][1])
+    with pytest.raises(KeyError):
+        query_obj.query_batch({'year': [2020], 'optimizer': ['not an optimizer']})
@@ -0,0 +1,60 @@
+from query.query_api import Query
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+QUERY = {'year': 2022, 'phase': 'training', 'optimizer': 'adam', 'chip_type': 'gpu'}
+
+def test_equivalent_queries_share_a_cached_result(dataset):
+    query_obj = Query(dataset)
+    result = query_obj.query(query_dict=dict(QUERY))
+    # optimizer and chip type default to adam and gpu
+    assert query_obj.query(query_dict={'year': 2022, 'phase': 'training'}) == result
+    info = query_obj.cache_info()
+    assert (info['hits'], info['misses'], info['size']) == (1, 1, 1)
+
+def test_cached_results_are_not_shared_with_callers(dataset):
+    query_obj = Query(dataset)
+    query_obj.query(query_dict=dict(QUERY))['runtime (GPUH)'] = -1
+    assert query_obj.query(query_dict=dict(QUERY))['runtime (GPUH)'] != -1
+
+def test_nested_results_are_not_shared_with_callers(dataset):
+    query_obj = Query(dataset)
+    kwargs = {'query_dict': dict(QUERY), 'quantiles': [0.5], 'statistics': ['median']}
+    expected = Query(dataset, cache_size=0).query(**kwargs)
+    for _ in range(2):
+        result = query_obj.query(**kwargs)
+        assert result == expected
+        result['quantiles']['p50']['runtime (GPUH)'] = -1
+        result['statistics']['median']['parameters'] = -1
+    assert query_obj.cache_info()['hits'] == 1
+
+def test_least_recently_used_results_are_evicted(dataset):
+    query_obj = Query(dataset, cache_size=2)
+    for year in (2020, 2021, 2020, 2022):
+        query_obj.query(query_dict=dict(QUERY, year=year))
+    info = query_obj.cache_info()
+    assert (info['hits'], info['evictions'], info['size']) == (1, 1, 2)
+    query_obj.query(query_dict=dict(QUERY, year=2020))
+    assert query_obj.cache_info()['hits'] == 2
+
+def test_cache_can_be_disabled(dataset):
+    query_obj = Query(dataset, cache_size=0)
+    for _ in range(2):
+        query_obj.query(query_dict=dict(QUERY))
+    assert query_obj.cache_info()['hits'] == 0 and query_obj.cache_info()['size'] == 0
+
+def test_concurrent_queries_share_the_cache(dataset):
+    # a small cache evicts keys while other threads look them up, and threads switch often so lookups interleave with evictions
+    query_obj = Query(dataset, cache_size=4)
+    queries = [dict(QUERY, year=2016 + i % 9) for i in range(2000)]
+    expected = {year: Query(dataset, cache_size=0).query(query_dict=dict(QUERY, year=year)) for year in range(2016, 2025)}
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda query_dict: query_obj.query(query_dict=query_dict), queries))
+    finally:
+        sys.setswitchinterval(interval)
+    assert all(result == expected[query_dict['year']] for query_dict, result in zip(queries, results))
+    info = query_obj.cache_info()
+    assert info['hits'] + info['misses'] == len(queries) and info['size'] == 4
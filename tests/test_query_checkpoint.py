@@ -0,0 +1,59 @@
+from query.query_api import Query
+from query.query_checkpoint import read_checkpoint, is_checkpoint
+from query.query_dataset import read_csv_dataset
+from query.utils.utils import write_pkl
+import pytest
+
+@pytest.mark.parametrize('cube', [False, True])
+def test_checkpoint_round_trip(dataset, work_dir, cube, grid_rows, assert_same_rows):
+    query_obj = Query(dataset, function='mean', cube=cube)
+    path = query_obj.save_pkl(str(work_dir / 'checkpoint.ckpt'))
+    assert is_checkpoint(path)
+    loaded = Query(path)
+    assert loaded.function == 'mean'
+    assert (loaded.snapshot.query_cube is not None) == cube
+    for name, rows in query_obj.snapshot.input_dict.items():
+        assert_same_rows(loaded.snapshot.input_dict[name], rows)
+    for row in grid_rows:
+        assert loaded.query(query_dict=dict(row)) == query_obj.query(query_dict=dict(row))
+    # saving a loaded checkpoint writes the same data
+    resaved = loaded.save_pkl(str(work_dir / 'resaved.ckpt'))
+    assert read_checkpoint(resaved, verify=True)['hash'] == read_checkpoint(path)['hash']
+
+def test_default_checkpoint_paths(query_obj, work_dir):
+    first, second = query_obj.save_pkl(), query_obj.save_pkl()
+    assert first != second and first.startswith('checkpoints') and is_checkpoint(second)
+
+def test_corrupted_checkpoints_are_detected(query_obj, work_dir):
+    path = query_obj.save_pkl(str(work_dir / 'checkpoint.ckpt'))
+    data = bytearray(open(path, 'rb').read())
+    data[-1] ^= 0xff
+    open(path, 'wb').write(bytes(data))
+    with pytest.raises(ValueError, match='corrupted'):
+        read_checkpoint(path, verify=True)
+    # sections are checked when they are read, without verify
+    with pytest.raises(ValueError, match='corrupted'):
+        Query(path).query(query_dict={'year': 2022, 'phase': 'training'})
+    open(path, 'wb').write(bytes(data[:len(data) // 2]))
+    with pytest.raises(ValueError):
+        Query(path).query(query_dict={'year': 2022, 'phase': 'training'})
+
+def test_legacy_pickles_load(configuration, work_dir, csv_path, grid_rows):
+    # a separate dataset, pickling builds every internal list
+    query_obj = Query(read_csv_dataset(csv_path, configuration), function='median')
+    write_pkl(query_obj, str(work_dir / 'legacy.pkl'))
+    assert not is_checkpoint(str(work_dir / 'legacy.pkl'))
+    with pytest.raises(ValueError, match='allow_pickle'):
+        Query(str(work_dir / 'legacy.pkl'))
+    loaded = Query(str(work_dir / 'legacy.pkl'), allow_pickle=True)
+    assert loaded.function == 'median'
+    for row in grid_rows:
+        assert loaded.query(query_dict=dict(row)) == query_obj.query(query_dict=dict(row))
+
+def test_checkpoints_do_not_create_a_log(dataset, work_dir):
+    path = Query(dataset).save_pkl(str(work_dir / 'checkpoint.ckpt'))
+    Query(path).query(query_dict={'year': 2022, 'phase': 'training'})
+    assert not (work_dir / 'runs').exists()
+    logged = Query(dataset)
+    logged.query(query_dict={'year': 2022, 'phase': 'training'}, log=True)
+    assert Query(logged.save_pkl(str(work_dir / 'logged.ckpt'))).log_file == logged.log_file
@@ -0,0 +1,13 @@
+from query.query_api import Query
+
+def test_cube_matches_query(dataset, grid_rows):
+    query_obj, cube_obj = Query(dataset, cache_size=0), Query(dataset, cache_size=0, cube=True)
+    assert cube_obj.snapshot.query_cube is not None
+    for row in grid_rows:
+        scaling = {'parallel_strategy_scaling': row['year'] != 2020}
+        assert cube_obj.query(query_dict=dict(row), **scaling) == query_obj.query(query_dict=dict(row), **scaling)
+
+def test_compile_cube_after_loading(query_obj):
+    assert query_obj.snapshot.query_cube is None
+    query_obj.compile_cube()
+    assert query_obj.snapshot.query_cube is not None
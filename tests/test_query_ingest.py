@@ -0,0 +1,31 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+from query.query_source import query_source
+import pytest
+import os
+
+def write_workbook(path: str, csv_path: str):
+    import pandas as pd
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for file in sorted(os.listdir(csv_path)):
+            pd.read_csv(os.path.join(csv_path, file)).to_excel(writer, sheet_name=os.path.splitext(file)[0].replace('_', ' '), index=False)
+        pd.DataFrame({'link': ['https://example.com']}).to_excel(writer, sheet_name='reference', index=False)
+
+def test_ingest_validates_the_table_format(work_dir):
+    with pytest.raises(ValueError):
+        query_source.ingest_workbook(str(work_dir / 'survey.xlsx'), str(work_dir / 'data'), 'xlsx')
+
+def test_ingested_workbook_matches_csv_directory(work_dir, configuration, query_obj, monkeypatch, csv_path, grid_rows):
+    pytest.importorskip('openpyxl')
+    write_workbook(str(work_dir / 'survey.xlsx'), csv_path)
+    tables = query_source.ingest_workbook(str(work_dir / 'survey.xlsx'), str(work_dir / 'data'))
+    assert sorted(tables) == sorted(os.path.splitext(file)[0] for file in os.listdir(csv_path))
+    ingested = Query(read_csv_dataset(str(work_dir / 'data'), configuration))
+    for row in grid_rows:
+        assert ingested.query(query_dict=dict(row)) == pytest.approx(query_obj.query(query_dict=dict(row)))
+
+    # an unchanged workbook is not parsed again
+    monkeypatch.setattr(query_source, 'read_workbook_tables', lambda *args: pytest.fail('workbook parsed again'))
+    assert query_source.ingest_workbook(str(work_dir / 'survey.xlsx'), str(work_dir / 'data')) == tables
+    os.utime(work_dir / 'survey.xlsx')
+    assert query_source.ingest_workbook(str(work_dir / 'survey.xlsx'), str(work_dir / 'data')) == tables
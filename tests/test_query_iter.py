@@ -0,0 +1,31 @@
+from query.utils.utils import build_test, iter_yaml_queries
+from collections import OrderedDict
+import pytest
+import json
+import io
+
+SWEEP = OrderedDict({'year': '2019..2021', 'phase': ['inference', 'training'], 'chip_type': ['gpu', None]})
+
+def test_iter_queries_streams_jsonl(query_obj, grid_rows):
+    rows = grid_rows[:20]
+    stream = io.StringIO('\n'.join(json.dumps(dict(row)) for row in rows) + '\n\n' + json.dumps({'key': 'last', 'year': 2022}))
+    results = query_obj.iter_queries(stream)
+    key, result = next(results)
+    # later lines are only read when their result is requested
+    assert key == 'query_1' and stream.tell() < len(stream.getvalue())
+    assert result == query_obj.query(query_dict=dict(rows[0]))
+    results = list(results)
+    assert [key for key, result in results[-2:]] == ['query_20', 'last']
+    assert results[-1][1] == query_obj.query(query_dict={'year': 2022})
+
+def test_iter_queries_reads_queries_yaml(query_obj, work_dir):
+    build_test(SWEEP, str(work_dir / 'test.yaml'))
+    assert OrderedDict(query_obj.iter_queries(str(work_dir / 'test.yaml'))) == query_obj.queries(str(work_dir / 'test.yaml'))['queries']
+
+def test_yaml_queries_reject_nested_parameters():
+    # a nested parameter used to be dropped silently, leaving the query without it
+    stream = 'queries:\n  query_1:\n    year: 2022\n    phase: training\n  query_2:\n    year: 2022\n    phase:\n      name: training\n'
+    queries = iter_yaml_queries(stream)
+    assert next(queries) == ('query_1', OrderedDict({'year': 2022, 'phase': 'training'}))
+    with pytest.raises(ValueError):
+        next(queries)
@@ -0,0 +1,16 @@
+from query.utils.utils import build_test, iter_sweep_queries
+from collections import OrderedDict
+import itertools
+
+SWEEP = OrderedDict({'year': '2019..2021', 'phase': ['inference', 'training'], 'chip_type': ['gpu', None]})
+
+def test_sweep_matches_build_test_queries(query_obj, work_dir):
+    build_test(SWEEP, str(work_dir / 'test.yaml'))
+    assert query_obj.sweep(SWEEP) == query_obj.queries(str(work_dir / 'test.yaml'))
+
+def test_sweep_is_expanded_lazily(query_obj):
+    # a product of 10^12 combinations is never built
+    sweep_spec = OrderedDict({'year': range(2000, 2000 + 10 ** 6), 'phase': ['inference'] * 10 ** 6})
+    assert next(iter_sweep_queries(sweep_spec)) == ('query_1', OrderedDict({'year': 2000, 'phase': 'inference'}))
+    keys = [key for key, result in itertools.islice(query_obj.iter_sweep(OrderedDict(SWEEP, year=range(2019, 10 ** 9))), 3)]
+    assert keys == ['query_1', 'query_2', 'query_3']
@@ -0,0 +1,33 @@
+from query.query_pareto.query_pareto import pareto_front, PARETO_KEYS
+import numpy as np
+import pytest
+
+def dominated(values: np.ndarray, point: np.ndarray) -> bool:
+    return bool(np.any(np.all(values <= point, axis=1) & np.any(values < point, axis=1)))
+
+@pytest.mark.parametrize('n_objectives', [2, 3])
+def test_pareto_front_matches_pairwise_comparison(n_objectives):
+    # few distinct values, so ties and duplicates are common
+    values = np.random.default_rng(0).integers(0, 6, size=(300, n_objectives)).astype(float)
+    expected = [index for index, point in enumerate(values) if not dominated(values, point)]
+    assert sorted(pareto_front(values).tolist()) == expected
+
+def test_pareto_rows_are_not_dominated(query_obj):
+    table = query_obj.pareto(2022, 'training', {'runtime (GPUH)': 'min', 'parameters': 'max'})
+    assert len(table)
+    values = table[['runtime (GPUH)', 'parameters']].to_numpy() * [1, -1]
+    for position, row in enumerate(table.to_dict('records')):
+        assert not dominated(values, values[position])
+        query_dict = dict({key: row[key] for key in PARETO_KEYS}, year=2022, phase='training')
+        result = query_obj.query(query_dict=query_dict)
+        assert row['runtime (GPUH)'] == pytest.approx(result['runtime (GPUH)']) and row['parameters'] == pytest.approx(result['parameters'])
+
+def test_pareto_validates_objectives(query_obj):
+    with pytest.raises(ValueError):
+        query_obj.pareto(2022, 'training', ['cost'])
+
+def test_inference_front_has_no_optimizer_copies(query_obj):
+    # the optimizer does not change inference outputs, so every configuration appears once
+    table = query_obj.pareto(2022, 'inference')
+    assert len(table) and table['optimizer'].isna().all()
+    assert not table.duplicated(subset=PARETO_KEYS).any()
@@ -0,0 +1,33 @@
+from query.query_api import Query
+
+QUERY = {'year': 2022, 'phase': 'training', 'optimizer': 'adam', 'chip_type': 'gpu'}
+
+def test_median_quantile_is_the_median_query(dataset):
+    # at p50 the parameters and the other factors are all taken at their median, as in a Query averaging with p50
+    result = Query(dataset).query(query_dict=dict(QUERY), quantiles=[0.5])
+    expected = Query(dataset, function='p50').query(query_dict=dict(QUERY))
+    assert result['quantiles']['p50'] == expected
+
+def test_runtime_quantiles_move_every_factor_together(dataset):
+    # the comonotone runtime quantile pairs the parameters at p with the speedups and tflops at 1 - p
+    quantiles = Query(dataset).query(query_dict=dict(QUERY), quantiles=[0.1, 0.9])['quantiles']
+    assert quantiles['p10']['parameters'] <= quantiles['p90']['parameters']
+    assert quantiles['p10']['runtime (GPUH)'] <= quantiles['p90']['runtime (GPUH)']
+
+def test_groups_are_sorted_once_across_threads(dataset, monkeypatch):
+    # the sorted groups are memoized on first use, concurrent quantile queries must not build a group twice
+    from query.query_interface import year_aggregate
+    from concurrent.futures import ThreadPoolExecutor
+    import heapq, time, types
+    merges = []
+    def merge(*iterables):
+        merges.append(1)
+        time.sleep(0.01)
+        return heapq.merge(*iterables)
+    monkeypatch.setattr(year_aggregate, 'heapq', types.SimpleNamespace(merge = merge))
+    model_size_list = dataset.get_model_size_list([(2018, 2020), (2021, 2023)], {'adam': 4})
+    fields = len(model_size_list._get_year_aggregates('inference'))
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda q: model_size_list.quantile('inference', 2018, 2023, q), [0.5] * 16))
+    assert len(merges) == fields
+    assert all(result == results[0] for result in results)
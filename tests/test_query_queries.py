@@ -0,0 +1,13 @@
+from query.query_api import Query, query_api
+from collections import OrderedDict
+
+def test_workers_match_serial_queries(dataset, monkeypatch, grid_rows):
+    # workers are capped at the number of cpus
+    monkeypatch.setattr(query_api.os, 'cpu_count', lambda: 2)
+    rows = grid_rows
+    # enough queries for two workers
+    queries_dict = OrderedDict({'queries': OrderedDict((f'query_{i}', dict(rows[i % len(rows)])) for i in range(2 * query_api.MIN_QUERIES_PER_WORKER))})
+    query_obj = Query(dataset, function='mean')
+    serial = query_obj.queries(queries_dict=queries_dict)
+    assert query_obj.queries(queries_dict=queries_dict, workers=2) == serial
+    assert list(serial['queries']) == list(queries_dict['queries'])
@@ -0,0 +1,33 @@
+from query.query_cube.query_cube import parameter_space
+from query.utils.utils import QUERY_KEYS
+from collections import OrderedDict
+import itertools
+import pytest
+
+WHERE = OrderedDict({'year': '2021..2022', 'phase': 'training', 'runtime (GPUH)': '< 1e5', 'parameters': [('>=', 100), ('<', 500)]})
+
+def test_search_matches_filtered_queries(query_obj):
+    space = parameter_space(query_obj.snapshot)
+    space.update(year=[2021, 2022], phase=['training'])
+    expected = []
+    for values in itertools.product(*space.values()):
+        result = query_obj.query(query_dict=dict(zip(space, values)))
+        if result['runtime (GPUH)'] is not None and result['runtime (GPUH)'] < 1e5 and 100 <= result['parameters'] < 500:
+            expected.append((values, result['runtime (GPUH)']))
+    table = query_obj.search(WHERE)
+    assert len(table) == len(expected) > 0
+    assert table['runtime (GPUH)'].is_monotonic_increasing
+    matches = {tuple(row[key] for key in QUERY_KEYS): row['runtime (GPUH)'] for row in table.to_dict('records')}
+    for values, runtime in expected:
+        assert matches[values] == pytest.approx(runtime)
+
+def test_search_top_k(query_obj):
+    table = query_obj.search(WHERE, sort_by='parameters', ascending=False, top_k=3)
+    assert len(table) == 3
+    assert table['parameters'].tolist() == query_obj.search(WHERE, sort_by='parameters', ascending=False)['parameters'].tolist()[:3]
+
+def test_search_validates_the_predicate(query_obj):
+    with pytest.raises(ValueError):
+        query_obj.search({'cost': '< 5'})
+    with pytest.raises(ValueError):
+        query_obj.search({'runtime (GPUH)': '~ 5'})
@@ -0,0 +1,18 @@
+from collections import OrderedDict
+import numpy as np
+import pytest
+
+GRID = OrderedDict({'year': [2021, 2022, 2023], 'phase': ['inference', 'training'], 'chip_type': ['gpu']})
+FLAGS = OrderedDict({'numerical_format': 'numerical_format_scaling', 'parallel_strategy': 'parallel_strategy_scaling', 'hardware_configuration': 'hardware_configuration_scaling'})
+
+def test_sensitivity_matches_queries_without_each_factor(query_obj):
+    table = query_obj.sensitivity(GRID)
+    assert len(table) == 3 * 2 * 4
+    for row in table.to_dict('records'):
+        query_dict = {'year': int(row['year']), 'phase': row['phase'], 'chip_type': row['chip_type']}
+        assert row['runtime (GPUH)'] == pytest.approx(query_obj.query(query_dict=dict(query_dict))['runtime (GPUH)'])
+        if row['factor'] in FLAGS:
+            without = query_obj.query(query_dict=dict(query_dict), **{FLAGS[row['factor']]: False})['runtime (GPUH)']
+            assert row['runtime without factor (GPUH)'] == pytest.approx(without)
+        assert row['elasticity'] == pytest.approx(np.log(row['runtime (GPUH)'] / row['runtime without factor (GPUH)']))
+    assert table.groupby(['year', 'phase'])['share'].sum().to_numpy() == pytest.approx(1)
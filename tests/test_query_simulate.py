@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+QUERY = {'year': 2022, 'phase': 'training'}
+
+@pytest.mark.parametrize('method', ['bootstrap', 'lognormal'])
+def test_simulate_is_reproducible_and_covers_the_query(query_obj, method):
+    result = query_obj.simulate(dict(QUERY), n_samples=2000, method=method, seed=0)
+    again = query_obj.simulate(dict(QUERY), n_samples=2000, method=method, seed=0)
+    for key, samples in result['samples'].items():
+        assert samples.shape == (2000,)
+        assert np.array_equal(samples, again['samples'][key])
+        low, high = result['confidence interval'][key]
+        assert low <= result['median'][key] <= high
+    low, high = result['confidence interval']['runtime (GPUH)']
+    assert low <= query_obj.query(query_dict=dict(QUERY))['runtime (GPUH)'] <= high
+
+def test_simulate_validates_inputs(query_obj):
+    with pytest.raises(ValueError):
+        query_obj.simulate({'phase': 'training'})
+    with pytest.raises(ValueError):
+        query_obj.simulate(dict(QUERY), method='normal')
@@ -0,0 +1,39 @@
+from query.query_api import Query
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+QUERY = {'year': 2022, 'phase': 'training'}
+OVERRIDE = OrderedDict({'year_ranges': OrderedDict({'model_size': [[2017, 2020], [2021, 2024]]})})
+
+def test_reload_swaps_the_snapshot(dataset):
+    query_obj = Query(dataset)
+    snapshot = query_obj.snapshot
+    before = query_obj.query(query_dict=dict(QUERY))
+    query_obj.load_dataset(dataset, OVERRIDE)
+    assert query_obj.snapshot is not snapshot
+    # the previous snapshot is unchanged, a reader holding it finishes on the data it started with
+    assert snapshot.compute_query(2022, 'training', None, None, None, None) == before
+    assert query_obj.query(query_dict=dict(QUERY)) == query_obj.view().query(query_dict=dict(QUERY)) != before
+    assert query_obj.cache_info()['size'] == 1
+
+def test_readers_see_one_snapshot_or_the_other(dataset):
+    query_obj = Query(dataset, cache_size=0)
+    results = {query_obj.query(query_dict=dict(QUERY))['parameters']}
+    query_obj.load_dataset(dataset, OVERRIDE)
+    results.add(query_obj.query(query_dict=dict(QUERY))['parameters'])
+    assert len(results) == 2
+    query_obj.load_dataset(dataset)
+    stop = threading.Event()
+
+    def reload():
+        while not stop.is_set():
+            query_obj.load_dataset(dataset, OVERRIDE)
+            query_obj.load_dataset(dataset)
+
+    with ThreadPoolExecutor(4) as executor:
+        reloader = executor.submit(reload)
+        observed = set(executor.map(lambda _: query_obj.query(query_dict=dict(QUERY))['parameters'], range(500)))
+        stop.set()
+        reloader.result()
+    assert observed <= results
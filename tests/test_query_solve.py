@@ -0,0 +1,27 @@
+from collections import OrderedDict
+import pytest
+
+def test_solve_parameters_fits_budget(query_obj):
+    solution = query_obj.solve({'year': 2022, 'phase': 'training'}, runtime_budget=1e5)
+    assert solution['runtime (GPUH)'] <= 1e5
+    assert solution['runtime (GPUH)'] == pytest.approx(1e5, rel=1e-6)
+
+def test_solve_year_returns_first_feasible_year(query_obj):
+    query_dict = OrderedDict({'phase': 'training', 'chip_type': 'gpu'})
+    solution = query_obj.solve(query_dict, runtime_budget=1e6, parameters=500)
+    assert solution['parameters'] == 500 and solution['runtime (GPUH)'] <= 1e6
+    for year in range(query_obj.get_year_bounds()[0], solution['year']):
+        largest = query_obj.solve(OrderedDict(query_dict, year=year), runtime_budget=1e6)
+        assert largest is None or largest['parameters'] < 500
+
+def test_solve_year_skips_years_without_runtime(query_obj):
+    # no acc chip exists before 2020, and the first acc years do not meet the budget
+    solution = query_obj.solve({'phase': 'training', 'chip_type': 'acc'}, runtime_budget=10000, parameters=500)
+    assert solution['year'] > 2020 and solution['runtime (GPUH)'] <= 10000
+
+def test_solve_year_memory_budget_without_runtime(query_obj):
+    solution = query_obj.solve({'phase': 'training', 'chip_type': 'acc'}, memory_budget=100, parameters=50)
+    assert solution['average model size (TB)'] <= 100 and solution['runtime (GPUH)'] is None
+
+def test_solve_year_infeasible(query_obj):
+    assert query_obj.solve({'phase': 'training'}, runtime_budget=1e-9, parameters=500) is None
@@ -0,0 +1,29 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+from query.query_source.query_source import convert_csv_dir, read_table_dir, read_table_file
+from query.utils.utils import list_table_files, read_csv_dir
+import importlib.util
+import pytest
+
+def test_tables_are_read_from_the_first_format(work_dir):
+    for file in ('a.csv', 'a.parquet', 'b.csv', 'b.feather', 'b.parquet', 'c.csv', 'notes.txt'):
+        (work_dir / file).write_text('')
+    assert {name: path.rsplit('/', 1)[1] for name, path in list_table_files(str(work_dir)).items()} == {'a': 'a.parquet', 'b': 'b.feather', 'c': 'c.csv'}
+
+@pytest.mark.skipif(importlib.util.find_spec('pyarrow') is not None, reason='pyarrow is installed')
+def test_arrow_tables_need_pyarrow(work_dir):
+    (work_dir / 'table.parquet').write_bytes(b'')
+    with pytest.raises(ImportError, match='pyarrow'):
+        read_table_file(str(work_dir / 'table.parquet'))
+
+@pytest.mark.parametrize('table_format', ['feather', 'parquet'])
+def test_arrow_tables_match_csv_tables(table_format, work_dir, configuration, query_obj, csv_path, assert_same_rows, grid_rows):
+    pytest.importorskip('pyarrow')
+    convert_csv_dir(csv_path, str(work_dir / table_format), table_format)
+    tables, csv_tables = read_table_dir(str(work_dir / table_format)), read_csv_dir(csv_path)
+    assert sorted(tables) == sorted(csv_tables)
+    for name, rows in tables.items():
+        assert_same_rows(rows, csv_tables[name])
+    arrow_obj = Query(read_csv_dataset(str(work_dir / table_format), configuration))
+    for row in grid_rows:
+        assert arrow_obj.query(query_dict=dict(row)) == query_obj.query(query_dict=dict(row))
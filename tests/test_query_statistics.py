@@ -0,0 +1,24 @@
+from query.query_api import Query
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+QUERY = {'year': 2022, 'phase': 'training', 'optimizer': 'adam', 'chip_type': 'gpu'}
+
+def test_statistics_match_queries_of_each_function(dataset):
+    result = Query(dataset, function='mean').query(query_dict=dict(QUERY), statistics=['mean', 'median', 'geomean'])
+    for function, output_dict in result['statistics'].items():
+        assert output_dict == Query(dataset, function=function).query(query_dict=dict(QUERY))
+
+def test_function_snapshot_is_shared_between_threads(dataset):
+    snapshot = Query(dataset, function='mean').snapshot
+    with ThreadPoolExecutor(8) as executor:
+        snapshots = list(executor.map(lambda _: snapshot.function_snapshot('p90'), range(64)))
+    assert all(function_snapshot is snapshots[0] for function_snapshot in snapshots)
+
+def test_function_snapshot_only_accepts_average_functions(dataset):
+    snapshot = Query(dataset, function='mean').snapshot
+    with pytest.raises(ValueError):
+        snapshot.function_snapshot('mode')
+    # another spelling of a quantile shares the snapshot of its canonical name
+    assert snapshot.function_snapshot('p90.0') is snapshot.function_snapshot('p90')
+    assert list(snapshot.function_snapshots) == ['p90']
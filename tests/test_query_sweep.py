@@ -0,0 +1,12 @@
+import numpy as np
+
+def test_sweep_product_matches_query(query_obj, grid, grid_rows, assert_same_output):
+    output_dict = query_obj.sweep_product(grid)
+    shape = tuple(len(values) for values in grid.values())
+    assert output_dict['runtime (GPUH)'].shape == shape
+    for position, row in zip(np.ndindex(shape), grid_rows):
+        assert_same_output(query_obj.query(query_dict=dict(row)), output_dict, position)
+
+def test_sweep_product_reads_year_ranges(query_obj):
+    output_dict = query_obj.sweep_product({'year': '2016..2018', 'phase': ['training']})
+    assert output_dict['runtime (GPUH)'].shape == (3, 1)
@@ -0,0 +1,30 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+from collections import OrderedDict
+import copy
+
+OVERRIDE = OrderedDict({'year_ranges': OrderedDict({'model_size': [[2017, 2020], [2021, 2024]]})})
+
+def test_view_matches_a_query_loaded_with_the_configuration(query_obj, configuration, csv_path, grid_rows):
+    view = query_obj.view(OVERRIDE)
+    merged = copy.deepcopy(configuration)
+    merged['year_ranges']['model_size'] = OVERRIDE['year_ranges']['model_size']
+    loaded = Query(read_csv_dataset(csv_path, merged))
+    for row in grid_rows:
+        assert view.query(query_dict=dict(row)) == loaded.query(query_dict=dict(row))
+
+def test_view_shares_unchanged_lists(query_obj):
+    view = query_obj.view(OVERRIDE)
+    assert view.snapshot.dataset is query_obj.snapshot.dataset
+    assert view.snapshot.numerical_format_list is query_obj.snapshot.numerical_format_list
+    assert view.snapshot.model_size_list is not query_obj.snapshot.model_size_list
+
+def test_query_matrix_stacks_views(query_obj, grid_rows, assert_same_output):
+    rows = grid_rows
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    output_dict = query_obj.query_matrix(columns, [None, OVERRIDE])
+    assert output_dict['runtime (GPUH)'].shape == (2, len(rows))
+    view = query_obj.view(OVERRIDE)
+    for position, row in enumerate(rows):
+        assert_same_output(query_obj.query(query_dict=dict(row)), output_dict, (0, position))
+        assert_same_output(view.query(query_dict=dict(row)), output_dict, (1, position))
@@ -0,0 +1,46 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+import threading
+import shutil
+import pytest
+
+QUERY = {'year': 2020, 'phase': 'training', 'chip_type': 'gpu'}
+
+@pytest.fixture
+def csv_query(work_dir, configuration, csv_path):
+    shutil.copytree(csv_path, work_dir / 'csv')
+    return Query(read_csv_dataset(str(work_dir / 'csv'), configuration))
+
+def edit_hardware(work_dir):
+    # the FP32 TFLOPS of the A100 from 19.5 to 39
+    path = work_dir / 'csv' / 'hardware_comparison.csv'
+    path.write_text(path.read_text().replace('2020,A100,NVIDIA,GPU,54.2,826,6912,,400,,,312,19.5,', '2020,A100,NVIDIA,GPU,54.2,826,6912,,400,,,312,39,'))
+
+def test_refresh_reloads_changed_tables(csv_query, work_dir):
+    before = csv_query.query(query_dict=dict(QUERY))
+    model_size_list = csv_query.snapshot.model_size_list
+    assert csv_query.refresh() == []
+    edit_hardware(work_dir)
+    assert csv_query.refresh() == ['hardware_comparison']
+    after = csv_query.query(query_dict=dict(QUERY))
+    assert after['hardware (TFLOPS)'] == 2 * before['hardware (TFLOPS)']
+    assert after['runtime (GPUH)'] == pytest.approx(before['runtime (GPUH)'] / 2)
+    # lists built from other tables are kept
+    assert csv_query.snapshot.model_size_list is model_size_list
+
+def test_watch_calls_back_with_changed_tables(csv_query, work_dir):
+    changed = []
+    called = threading.Event()
+    watcher = csv_query.watch(interval=0.01, callback=lambda tables: (changed.append(tables), called.set()))
+    try:
+        edit_hardware(work_dir)
+        assert called.wait(5)
+    finally:
+        watcher.stop()
+    assert changed == [['hardware_comparison']]
+    assert csv_query.query(query_dict=dict(QUERY))['hardware (TFLOPS)'] == 39
+
+def test_watch_needs_a_csv_directory(query_obj, work_dir):
+    checkpoint = Query(query_obj.save_pkl(str(work_dir / 'checkpoint.ckpt')))
+    with pytest.raises(ValueError):
+        checkpoint.watch()
@@ -0,0 +1,40 @@
+from query.query_api import Query
+from query.query_dataset import read_csv_dataset
+from query.utils.utils import write_pkl
+
+QUERY = {'year': 2022, 'phase': 'training', 'numerical_format': '32-16', 'parallel_strategy': 'pipeline'}
+
+def test_year_windows_match_configured_ranges(query_obj):
+    # a window equal to the configured range of the query year gives the configured result
+    windows = {'numerical_format': (2022, 2023), 'parallel_strategy': (2020, 2022), 'model_size': (2022, 2022)}
+    assert query_obj.query(query_dict=dict(QUERY), year_windows=windows) == query_obj.query(query_dict=dict(QUERY))
+
+def test_year_windows_on_legacy_pickle(dataset, configuration, work_dir, csv_path):
+    # explicit formats and strategies do not depend on year windows, the averages of the lists are only taken without them
+    query_dict = {'year': 2023, 'phase': 'inference'}
+    windows = {'numerical_format': [(2018, 2020), (2021, 2023)], 'parallel_strategy': [(2018, 2020), (2021, 2023)]}
+    # lists pickled before the series did not store their average function, a separate dataset keeps the lists of the fixture intact
+    legacy = Query(read_csv_dataset(csv_path, configuration), function='mean')
+    for name in ('numerical_format_list', 'parallel_strategy_list'):
+        del getattr(legacy, name).__dict__['function']
+    write_pkl(legacy, str(work_dir / 'legacy.pkl'))
+    expected = Query(dataset, function='mean').query(query_dict=dict(query_dict), year_windows=windows)
+    assert Query(str(work_dir / 'legacy.pkl'), allow_pickle=True).query(query_dict=dict(query_dict), year_windows=windows) == expected
+
+def test_year_aggregates_are_built_once_across_threads(configuration, monkeypatch, csv_path):
+    # the first window queries of a list race to build its year aggregate, the others wait and see it with the formats of each year
+    from query.numerical_format import numerical_format
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+    builds = []
+    class SlowYearAggregate(numerical_format.YearAggregate):
+        def __init__(self, years, values):
+            builds.append(1)
+            time.sleep(0.01)
+            super().__init__(years, values)
+    monkeypatch.setattr(numerical_format, 'YearAggregate', SlowYearAggregate)
+    numerical_format_list = read_csv_dataset(csv_path, configuration).get_numerical_format_list(configuration['year_ranges']['numerical_format'])
+    with ThreadPoolExecutor(8) as executor:
+        formats = list(executor.map(lambda _: numerical_format_list._get_window_numerical_formats((2018, 2023)), range(16)))
+    assert len(builds) == 1
+    assert all(window_formats == formats[0] for window_formats in formats)
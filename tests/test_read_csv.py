@@ -0,0 +1,32 @@
+from query.utils.utils import read_csv_dir, read_frame_rows, clean_dictionary_keys
+from collections import OrderedDict
+import pandas as pd
+import shutil
+import os
+
+def read_csv_iterrows(path: str) -> OrderedDict:
+    # the row by row reader read_csv_dir used before the columnar loader
+    df = pd.read_csv(path)
+    rows = OrderedDict()
+    for index, row in df.iterrows():
+        if row.isna().all():
+            break
+        rows[index] = OrderedDict()
+        for header in df.columns:
+            if 'Unnamed' in header or header.lower() in rows[index]:
+                continue
+            rows[index][header.lower()] = row[header].lower() if isinstance(row[header], str) else row[header]
+    return clean_dictionary_keys(OrderedDict({'table': rows}))['table']
+
+def test_columnar_rows_match_iterrows(csv_path, assert_same_rows):
+    for file in os.listdir(csv_path):
+        path = os.path.join(csv_path, file)
+        assert_same_rows(read_frame_rows(pd.read_csv(path)), read_csv_iterrows(path))
+
+def test_read_csv_dir_names_tables_by_file_name(work_dir, csv_path, assert_same_rows):
+    # names ending in letters of '.csv' keep them
+    shutil.copy(os.path.join(csv_path, 'model_size.csv'), work_dir / 'costs.csv')
+    shutil.copy(os.path.join(csv_path, 'hardware_comparison.csv'), work_dir / 'vcs.csv')
+    tables = read_csv_dir(str(work_dir))
+    assert sorted(tables) == ['costs', 'vcs']
+    assert_same_rows(tables['costs'], read_csv_iterrows(os.path.join(csv_path, 'model_size.csv')))
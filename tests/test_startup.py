@@ -0,0 +1,17 @@
+import subprocess
+import json
+import sys
+
+def imported_modules(code: str, cwd, root: str) -> list[str]:
+    script = f"import sys, json\nsys.path.insert(0, {root!r})\n{code}\nprint(json.dumps([module for module in ['pandas', 'yaml', 'pyarrow'] if module in sys.modules]))"
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, cwd=cwd).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_import_and_checkpoint_queries_defer_imports(query_obj, work_dir, root):
+    checkpoint = query_obj.save_pkl(str(work_dir / 'checkpoint.ckpt'))
+    assert imported_modules('import query.query_api', work_dir, root) == []
+    assert imported_modules(f"from query.query_api import Query\nQuery({checkpoint!r}).query(query_dict={{'year': 2022, 'phase': 'training'}})", work_dir, root) == []
+
+def test_small_csv_files_are_read_without_pandas(configuration, work_dir, root, csv_path):
+    code = f"from query.query_api import Query\nfrom query.query_dataset import read_csv_dataset\nQuery(read_csv_dataset({csv_path!r}, json.loads({json.dumps(configuration)!r}))).query(query_dict={{'year': 2022, 'phase': 'training'}})"
+    assert imported_modules(code, work_dir, root) == []